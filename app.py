@@ -3,6 +3,7 @@
 Avito Seller Parser - главная точка входа в приложение
 """
 
+import multiprocessing
 import sys
 import os
 from pathlib import Path
@@ -13,6 +14,12 @@ src_dir = current_dir / "src"
 if str(src_dir) not in sys.path:
     sys.path.insert(0, str(src_dir))
 
+# Первым: отсюда отсчитывается время запуска (см. bootstrap.report)
+try:
+    from src import bootstrap
+except ImportError:
+    import bootstrap
+
 try:
     from src.gui import main
 except ImportError:
@@ -20,4 +27,6 @@ except ImportError:
     from gui import main
 
 if __name__ == "__main__":
+    # Процессы-разборщики (pipeline.py) в собранном PyInstaller exe
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Синтетические страницы продавца в разметке Avito для бенчмарков.
+
+Разметка повторяет то, на что опираются парсеры: карточки ``data-marker="item"``
+с хэшированными классами, ``item-title``, ``meta[itemprop=price]``, ``geo-root``,
+``item-date``, шапку продавца и пагинацию. Генерация детерминирована, так что
+результаты разных запусков сравнимы. Записанные реальные страницы можно положить
+в каталог и передать через ``--fixtures`` (см. run.py).
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+SIZES = (50, 500, 5000)
+PAGE_SIZE = 50
+
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск"]
+DISTRICTS = ["р-н Тверской", "р-н Хамовники", "Центральный р-н", "р-н Арбат", ""]
+DATES = ["Сегодня в 12:30", "вчера", "2 дня назад", "5 дней назад", "1 неделю назад", "3 недели назад"]
+WORDS = ["Ремонт", "квартир", "под", "ключ", "Сантехник", "Электрик", "Отделка", "плитки", "недорого", "быстро"]
+
+SVG = '<svg width="16" height="16" viewBox="0 0 16 16"><path d="M8 0L10 6H16L11 10L13 16L8 12L3 16L5 10L0 6H6Z"/></svg>'
+
+
+def make_items(count: int, seed: int = 1) -> List[Dict]:
+    """``count`` объявлений в виде элементов встроенного состояния страницы.
+
+    ID зависят от ``seed``: у разных продавцов объявления не склеиваются при дедупликации.
+    """
+    rng = random.Random(seed)
+    first_id = 3000000000 + seed * 1000000
+    items = []
+    for i in range(1, count + 1):
+        city = rng.choice(CITIES)
+        district = rng.choice(DISTRICTS)
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) + f" {i}"
+        items.append({
+            "id": first_id + i,
+            "urlPath": f"/moskva/predlozheniya_uslug/usluga_{i}_{first_id + i}",
+            "title": title,
+            "priceDetailed": {"value": rng.randint(5, 2000) * 100},
+            "geo": {"formattedAddress": f"{city}, {district}" if district else city},
+            "sortTimeStamp": 1760000000000 - i * 60000,
+            # Поля ниже есть только в разметке карточки
+            "date": rng.choice(DATES),
+            "hasMetaPrice": i % 4 != 0,
+        })
+    return items
+
+
+def card_html(item: Dict) -> str:
+    price = item["priceDetailed"]["value"]
+    price_text = f"{price:,}".replace(",", " ")
+    meta = f'<meta itemprop="price" content="{price}">' if item["hasMetaPrice"] else ""
+    address = item["geo"]["formattedAddress"].split(", ")
+    geo = ", ".join(f"<span>{part}</span>" for part in address)
+    photos = "".join(
+        f'<li class="photo-slider-list-item-r2YDC"><img src="/i/{item["id"]}_{n}.jpg" alt=""></li>'
+        for n in range(3)
+    )
+    return (
+        f'<div data-marker="item" data-item-id="{item["id"]}" class="iva-item-root-Nj_hb items-item-My3ih">'
+        f'<div class="iva-item-content-OWwoq"><div class="iva-item-slider-BOsti">'
+        f'<ul class="photo-slider-list-R0jle">{photos}</ul></div>'
+        f'<div class="iva-item-body-KLUuy"><div class="iva-item-titleStep-pdebR">'
+        f'<a data-marker="item-title" href="{item["urlPath"]}" title="{item["title"]} в {address[0]}" '
+        f'class="link-link-MbQDP"><h3 class="styles-module-root-GKtmM">{item["title"]}</h3></a></div>'
+        f'<div class="iva-item-priceStep-uq2CQ"><p data-marker="item-price" class="styles-module-root-LEIrw">{meta}'
+        f'<strong class="styles-module-root-LIAav"><span>{price_text}&nbsp;₽</span></strong>{SVG}</p></div>'
+        f'<div class="geo-root-zPwRk"><p class="styles-module-root-_KFFt">{geo}</p></div>'
+        f'<div class="iva-item-dateInfoStep-_acjp">'
+        f'<p data-marker="item-date" class="styles-module-root-_KFFt">{item["date"]}</p></div>'
+        f"</div></div></div>"
+    )
+
+
+def state_script(items: List[Dict]) -> str:
+    state = {"data": {"catalog": {"items": [
+        {k: v for k, v in it.items() if k not in ("date", "hasMetaPrice")} for it in items
+    ]}}}
+    return f'<script type="mime/invalid" data-mfe-state="true">{json.dumps(state, ensure_ascii=False)}</script>'
+
+
+def pagination_html(page: int, pages: int) -> str:
+    if pages <= 1:
+        return ""
+    current = ' aria-current="page"'
+    links = "".join(
+        f'<a href="?p={n}" data-marker="pagination-button/page({n})"{current if n == page else ""}>{n}</a>'
+        for n in range(1, pages + 1)
+    )
+    return f'<nav aria-label="Пагинация"><div data-marker="pagination-button">{links}</div></nav>'
+
+
+def page_html(
+    items: List[Dict],
+    seller: str = "ООО Ромашка",
+    page: int = 1,
+    pages: int = 1,
+    with_state: bool = False,
+    extra_head: str = "",
+    extra_body: str = "",
+) -> str:
+    """Страница продавца с карточками ``items``."""
+    head = state_script(items) if with_state else ""
+    cards = "\n".join(card_html(it) for it in items)
+    return (
+        "<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\"><title>Объявления продавца</title>"
+        f"<style>.iva-item-root-Nj_hb{{min-height:240px}}</style>{head}{extra_head}</head><body>"
+        '<header class="profile-header-Xs2"><div class="AvatarNameView-name-Fa3">'
+        f'<h1 class="styles-module-root-GKtmM">{seller}</h1></div>'
+        '<span data-marker="profile/score">4,8</span>'
+        '<span data-marker="profile/summary">Отзывы: 128</span></header>'
+        f'<main><div class="items-items-pZX46" data-marker="catalog-serp">{cards}</div>'
+        f"{pagination_html(page, pages)}</main>{extra_body}</body></html>"
+    )
+
+
+def listing_fixture(count: int, with_state: bool = False) -> str:
+    """Одна страница с ``count`` карточками — как после полной прокрутки ленты."""
+    return page_html(make_items(count), with_state=with_state)
+
+
+def load_recorded(directory) -> Dict[str, str]:
+    """Записанные страницы ``*.html`` из каталога: {имя файла: HTML}."""
+    return {p.name: p.read_text(encoding="utf-8") for p in sorted(Path(directory).glob("*.html"))}
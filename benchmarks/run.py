@@ -0,0 +1,244 @@
+"""Офлайн-бенчмарки парсера и краулера.
+
+    python -m benchmarks.run                       # micro, вывод JSON в stdout
+    python -m benchmarks.run --suite all -o bench.json
+    python -m benchmarks.run --baseline old.json --tolerance 0.25
+
+micro — _parse_listing_page (все установленные бэкенды и встроенное состояние),
+main.extract_from_html и save_to_csv на страницах из 50/500/5000 карточек;
+e2e — _fetch_html_playwright и fetch_products_for_seller против локального
+сервера с бесконечной прокруткой (нужен установленный Chromium).
+С ``--baseline`` код выхода 1, если медиана какого-либо замера выросла больше
+чем на ``--tolerance`` относительно прошлого результата и при этом больше чем на
+``--min-delta`` миллисекунд: на коротких замерах (save_to_csv на 50 карточках)
+шум диска и планировщика больше самого замера. Медианы базы сначала
+умножаются на отношение калибровочных замеров (чисто питоновская нагрузка), если
+эта машина медленнее, так что базу, снятую на другой машине, можно сравнивать с
+запуском в CI.
+Эталон для CI лежит в benchmarks/baseline.json; обновить:
+
+    python -m benchmarks.run --suite micro --repeat 5 -o benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks import fixtures  # noqa: E402
+from benchmarks.server import LocalServer, SellerSite  # noqa: E402
+from src import html_backend  # noqa: E402
+from src import parser as avito_parser  # noqa: E402
+
+PACKAGES = ("beautifulsoup4", "lxml", "selectolax", "soupsieve", "playwright", "requests")
+
+
+def _version(package: str) -> Optional[str]:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def measure(name: str, fn: Callable[[], int], repeat: int, warmup: int = 1, **params) -> Dict:
+    """Запускает ``fn`` (возвращает число объявлений) и собирает время в секундах."""
+    for _ in range(warmup):
+        fn()
+    runs = []
+    items = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = fn()
+        runs.append(time.perf_counter() - started)
+    result = {
+        "name": name,
+        "params": params,
+        "items": items,
+        "repeat": repeat,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+    }
+    print(f"{name:<40} {str(params):<40} median {result['median'] * 1000:9.2f} ms  items {items}", file=sys.stderr)
+    return result
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Медиана фиксированной нагрузки без C-расширений — мерило скорости машины."""
+    items = fixtures.make_items(2000)
+
+    def work():
+        decoded = json.loads(json.dumps(items))
+        return len(sorted(str(item) for item in decoded))
+
+    return measure("calibration", work, repeat)["median"]
+
+
+def micro(sizes: List[int], repeat: int, recorded_dir: Optional[str] = None) -> List[Dict]:
+    import main as legacy_main
+
+    results = []
+    pages = {size: fixtures.listing_fixture(size) for size in sizes}
+    for size, html in pages.items():
+        for backend in html_backend.available_backends():
+            results.append(measure(
+                "parse_listing_page",
+                lambda: len(avito_parser._parse_listing_page(html, backend)["products"]),
+                repeat, backend=backend, cards=size,
+            ))
+        with_state = fixtures.listing_fixture(size, with_state=True)
+        results.append(measure(
+            "parse_listing_page",
+            lambda: len(avito_parser._parse_listing_page(with_state)["products"]),
+            repeat, backend="state", cards=size,
+        ))
+        results.append(measure(
+            "main.extract_from_html",
+            lambda: legacy_main.extract_from_html(html)["total_products"],
+            repeat, cards=size,
+        ))
+
+        data = avito_parser._parse_listing_page(html)
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "products.csv")
+
+            def save():
+                avito_parser.save_to_csv(data, target)
+                return len(data["products"])
+
+            results.append(measure("save_to_csv", save, repeat, cards=size))
+
+    if recorded_dir:
+        for fname, html in fixtures.load_recorded(recorded_dir).items():
+            for backend in html_backend.available_backends():
+                results.append(measure(
+                    "parse_listing_page",
+                    lambda: len(avito_parser._parse_listing_page(html, backend)["products"]),
+                    repeat, backend=backend, fixture=fname,
+                ))
+    return results
+
+
+def e2e(repeat: int, sellers: int = 2, items_per_seller: int = 130) -> List[Dict]:
+    site = SellerSite(items_per_seller=items_per_seller)
+    results = []
+    with LocalServer(site) as server, avito_parser.BrowserPool(size=3, headless=True) as pool:
+        counter = iter(range(10 ** 6))
+
+        def fetch_html():
+            # Новый продавец на каждый запуск, чтобы не мерить кэш браузера
+            html = avito_parser._fetch_html_playwright(
+                server.seller_url(next(counter)), headless=True, pool=pool, idle_timeout=0.5
+            )
+            return html.count('data-marker="item-title"')
+
+        results.append(measure("fetch_html_playwright", fetch_html, repeat, cards=fixtures.PAGE_SIZE))
+
+        for parallel in (1, 3):
+            def fetch_seller():
+                return sum(
+                    avito_parser.fetch_products_for_seller(
+                        server.seller_url(next(counter)), pool=pool, parallel_pages=parallel
+                    )["total_products"]
+                    for _ in range(sellers)
+                )
+
+            results.append(measure(
+                "fetch_products_for_seller", fetch_seller, repeat,
+                sellers=sellers, items_per_seller=items_per_seller, parallel_pages=parallel,
+            ))
+    return results
+
+
+def compare(
+    results: List[Dict], baseline: Dict, tolerance: float, scale: float = 1.0, min_delta: float = 0.0
+) -> List[str]:
+    """Описания замеров, чья медиана выросла больше чем на ``tolerance`` и на ``min_delta`` секунд.
+
+    ``scale`` — во сколько раз эта машина медленнее той, где снята база.
+    """
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))  # noqa: E731
+    before = {key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = before.get(key(r))
+        if not old:
+            continue
+        expected = old["median"] * scale
+        if r["median"] > expected * (1 + tolerance) and r["median"] - expected > min_delta:
+            regressions.append(
+                f"{r['name']} {r['params']}: {expected * 1000:.2f} → {r['median'] * 1000:.2f} ms"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Офлайн-бенчмарки Avito Seller Parser")
+    ap.add_argument("--suite", choices=("micro", "e2e", "all"), default="micro")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(fixtures.SIZES))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--fixtures", help="каталог с записанными страницами *.html")
+    ap.add_argument("-o", "--output", help="файл для JSON-результата (по умолчанию stdout)")
+    ap.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("--min-delta", type=float, default=5.0, help="рост медианы меньше стольких мс не считается регрессией")
+    args = ap.parse_args(argv)
+
+    calibration = calibrate(args.repeat)
+    results: List[Dict] = []
+    skipped: Dict[str, str] = {}
+    if args.suite in ("micro", "all"):
+        results += micro(args.sizes, args.repeat, args.fixtures)
+    if args.suite in ("e2e", "all"):
+        try:
+            results += e2e(args.repeat)
+        except Exception as e:
+            print(f"e2e пропущены: {e}", file=sys.stderr)
+            skipped["e2e"] = str(e)
+
+    report = {
+        "schema": 1,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {name: _version(name) for name in PACKAGES},
+        "calibration": calibration,
+        "results": results,
+        "skipped": skipped,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        # База без калибровки (старый формат) сравнивается как есть. Калибровка —
+        # чистый Python, а замеры в основном C-расширения и диск, поэтому на
+        # машине быстрее базы ожидания не ужесточаются, только ослабляются
+        scale = calibration / baseline["calibration"] if baseline.get("calibration") else 1.0
+        print(f"Калибровка: эта машина медленнее базы в {scale:.2f} раза", file=sys.stderr)
+        scale = max(1.0, scale)
+        regressions = compare(results, baseline, args.tolerance, scale, args.min_delta / 1000)
+        for line in regressions:
+            print(f"Регрессия: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Локальный HTTP-сервер, который ведёт себя как страница продавца на Avito.
+
+``/seller/<имя>?p=N`` отдаёт страницу N (по PAGE_SIZE объявлений) с шапкой
+продавца и пагинацией, но в HTML сразу есть только первые ``chunk`` карточек —
+остальные подгружаются скриптом при прокрутке к низу страницы
+(``/seller/<имя>/cards?p=N&offset=K``) с задержкой ``delay`` секунд.
+"""
+
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from .fixtures import PAGE_SIZE, card_html, make_items, page_html
+except ImportError:
+    from fixtures import PAGE_SIZE, card_html, make_items, page_html
+
+SCROLL_JS = """
+<script>
+(() => {
+  const feed = document.querySelector('[data-marker="catalog-serp"]');
+  let offset = %(chunk)d;
+  let loading = false;
+  const more = async () => {
+    if (loading || offset >= %(on_page)d) return;
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 400) return;
+    loading = true;
+    const resp = await fetch(location.pathname + '/cards?p=%(page)d&offset=' + offset);
+    feed.insertAdjacentHTML('beforeend', await resp.text());
+    offset += %(chunk)d;
+    loading = false;
+    more();
+  };
+  window.addEventListener('scroll', more, {passive: true});
+  more();
+})();
+</script>
+"""
+
+
+class SellerSite:
+    """Продавцы ``seller-<n>`` с заданным числом объявлений."""
+
+    def __init__(self, items_per_seller: int = 130, chunk: int = 10, delay: float = 0.05):
+        self.items_per_seller = items_per_seller
+        self.chunk = chunk
+        self.delay = delay
+        self._items: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def items(self, seller: str) -> List[Dict]:
+        with self._lock:
+            if seller not in self._items:
+                # Сумма кодов символов совпала бы у seller-12 и seller-21
+                seed = zlib.crc32(seller.encode("utf-8"))
+                self._items[seller] = make_items(self.items_per_seller, seed=seed)
+            return self._items[seller]
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.items_per_seller // PAGE_SIZE))
+
+    def page_items(self, seller: str, page: int) -> List[Dict]:
+        start = (page - 1) * PAGE_SIZE
+        return self.items(seller)[start:start + PAGE_SIZE]
+
+    def render_page(self, seller: str, page: int) -> str:
+        on_page = self.page_items(seller, page)
+        script = SCROLL_JS % {"chunk": self.chunk, "on_page": len(on_page), "page": page}
+        return page_html(
+            on_page[:self.chunk],
+            seller=f"Продавец {seller}",
+            page=page,
+            pages=self.pages,
+            extra_body=script,
+        )
+
+    def render_cards(self, seller: str, page: int, offset: int) -> str:
+        time.sleep(self.delay)
+        on_page = self.page_items(seller, page)
+        return "\n".join(card_html(it) for it in on_page[offset:offset + self.chunk])
+
+
+def _handler(site: SellerSite):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            page = int(query.get("p", ["1"])[0])
+            parts = url.path.strip("/").split("/")
+            if len(parts) == 2 and parts[0] == "seller":
+                body = site.render_page(parts[1], page)
+            elif len(parts) == 3 and parts[0] == "seller" and parts[2] == "cards":
+                body = site.render_cards(parts[1], page, int(query.get("offset", ["0"])[0]))
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class LocalServer:
+    """Запускает SellerSite в фоновом потоке: ``with LocalServer(site) as server``."""
+
+    def __init__(self, site: SellerSite, host: str = "127.0.0.1", port: int = 0):
+        self.site = site
+        self._server = ThreadingHTTPServer((host, port), _handler(site))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def seller_url(self, n: int) -> str:
+        return f"{self.base_url}/seller/seller-{n}"
+
+    def __enter__(self) -> "LocalServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Avito Seller Parser - запуск без GUI (серверы без дисплея, cron)
+"""
+
+import multiprocessing
+import sys
+from pathlib import Path
+
+# Добавляем папку src в путь для правильного импорта модулей
+current_dir = Path(__file__).resolve().parent
+src_dir = current_dir / "src"
+if str(src_dir) not in sys.path:
+    sys.path.insert(0, str(src_dir))
+
+try:
+    from src.cli import main
+except ImportError:
+    from cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
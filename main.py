@@ -1,10 +1,12 @@
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import csv
 import re
 import time
 
+from src.html_backend import CARD_SELECTOR, default_soup_backend, make_soup
+from src.scroll_loader import scroll_until_loaded
+from src.sinks import CsvSink
+
 BASE_URL = "https://www.avito.ru"
 
 
@@ -28,29 +30,10 @@ def extract_seller_products(url):
 
         try:
             page.goto(url, timeout=60000, wait_until="domcontentloaded")
-            page.wait_for_timeout(3000)
-
-            # Очень быстрый скролинг для загрузки всех данных
-            scroll_attempts = 0
-            max_attempts = 50
-
-            while scroll_attempts < max_attempts:
-                current_items = len(page.query_selector_all('[data-marker="item"], div[class*="iva-item-root"]'))
-
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                page.wait_for_timeout(500)
-
-                new_items = len(page.query_selector_all('[data-marker="item"], div[class*="iva-item-root"]'))
-
-                if new_items == current_items:
-                    scroll_attempts += 1
-                else:
-                    scroll_attempts = 0
-
-                print(f"Загружено товаров: {new_items}")
 
-                if scroll_attempts >= 3:
-                    break
+            # Скроллим, пока лента растёт: ожидание событийное, без фиксированных пауз
+            loaded = scroll_until_loaded(page, idle_timeout=1.5)
+            print(f"Загружено товаров: {loaded['count']}")
 
             # пробуем раскрыть описание (если есть кнопка)
             try:
@@ -75,10 +58,11 @@ def extract_from_html(html_content: str):
     """
     Парсит страницу и собирает товары + инфо о продавце
     """
-    soup = BeautifulSoup(html_content, "html.parser")
+    # lxml + разбор только карточек и шапки продавца, если lxml установлен
+    soup = make_soup(html_content, default_soup_backend())
 
     products = []
-    item_cards = soup.select('[data-marker="item"], div[class*="iva-item-root"]')
+    item_cards = CARD_SELECTOR.select(soup)
 
     for i, card in enumerate(item_cards, start=1):
         title_a = card.select_one('a[data-marker="item-title"]')
@@ -192,31 +176,8 @@ def save_to_csv(data, filename="avito_products.csv"):
         print("Нет данных для сохранения")
         return
 
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        fieldnames = [
-            "index",
-            "name",
-            "url",
-            "title",
-            "price",
-            "location",
-            "date",
-            "seller_name",
-            "seller_rating",
-        ]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-
-        s = data.get("seller_info", {}) or {}
-        for row in data["products"]:
-            row_out = dict(row)
-            row_out.update(
-                {
-                    "seller_name": s.get("name", ""),
-                    "seller_rating": s.get("rating", ""),
-                }
-            )
-            writer.writerow(row_out)
+    with CsvSink(filename) as sink:
+        sink.write(data["products"], data.get("seller_info", {}) or {})
 
     print(f"Данные сохранены в {filename}")
 
@@ -0,0 +1,207 @@
+"""Быстрый старт: отложенный импорт тяжёлых модулей, разовая проверка браузеров
+и замер времени запуска.
+
+Модуль импортирует только стандартную библиотеку — его можно подключать первым.
+"""
+
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+STARTED = time.perf_counter()
+BROWSERS_STAMP = Path.home() / ".avito_parser" / "browsers.json"
+
+_SRC_DIR = Path(__file__).resolve().parent
+_marks: List[Tuple[str, float]] = []
+_marks_lock = threading.Lock()
+
+
+# ------------------ startup timing ------------------
+
+
+def mark(name: str):
+    """Отмечает этап запуска (время считается от импорта bootstrap)."""
+    with _marks_lock:
+        _marks.append((name, time.perf_counter()))
+
+
+def timings() -> Dict[str, float]:
+    """Этапы запуска в миллисекундах от импорта bootstrap."""
+    with _marks_lock:
+        return {name: round((at - STARTED) * 1000, 1) for name, at in _marks}
+
+
+def report() -> str:
+    parts = [f"{name} {ms:.0f} мс" for name, ms in timings().items()]
+    if psutil is not None:
+        # От старта процесса: в exe PyInstaller сюда входит распаковка архива
+        try:
+            age = time.time() - psutil.Process().create_time()
+            parts.append(f"с начала процесса {age * 1000:.0f} мс")
+        except Exception:
+            pass
+    line = "Время запуска: " + ", ".join(parts)
+    logger.info(line)
+    return line
+
+
+# ------------------ lazy imports ------------------
+
+
+def import_module(name: str) -> ModuleType:
+    """Модуль из src по короткому имени: как часть пакета src, как отдельный модуль
+    (запуск из src или из сборки PyInstaller) или после добавления src в sys.path."""
+    candidates = []
+    for candidate in (f"{__package__}.{name}" if __package__ else None, f"src.{name}", name):
+        if candidate and candidate not in candidates:
+            candidates.append(candidate)
+    for candidate in candidates:
+        if candidate in sys.modules:
+            return sys.modules[candidate]
+    for candidate in candidates:
+        try:
+            return importlib.import_module(candidate)
+        except ImportError as e:
+            # Не найден сам модуль — пробуем следующий вариант; ошибки внутри модуля пробрасываем
+            if e.name is None or not candidate.startswith(e.name):
+                raise
+    if str(_SRC_DIR) not in sys.path:
+        sys.path.insert(0, str(_SRC_DIR))
+    return importlib.import_module(name)
+
+
+class LazyModule(ModuleType):
+    """Заглушка модуля: настоящий импорт происходит при первом обращении к атрибуту."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_target"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def load(self) -> ModuleType:
+        target = self.__dict__["_target"]
+        if target is None:
+            with self.__dict__["_lock"]:
+                target = self.__dict__["_target"]
+                if target is None:
+                    target = import_module(self.__name__)
+                    self.__dict__["_target"] = target
+                    mark(f"импорт {self.__name__}")
+        return target
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __dir__(self):
+        return dir(self.load())
+
+
+def lazy(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def preload(*modules: LazyModule) -> threading.Thread:
+    """Импортирует модули в фоне, пока пользователь смотрит на уже открытое окно."""
+
+    def run():
+        for module in modules:
+            try:
+                module.load()
+            except Exception as e:
+                logger.warning(f"Фоновый импорт {module.__name__} не удался: {e}")
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+# ------------------ browsers ------------------
+
+_browsers_checked = False
+_browsers_lock = threading.Lock()
+
+
+def _playwright_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("playwright")
+    except Exception:
+        return ""
+
+
+def _read_stamp() -> Dict:
+    try:
+        with open(BROWSERS_STAMP, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_stamp(executable: str):
+    try:
+        BROWSERS_STAMP.parent.mkdir(parents=True, exist_ok=True)
+        with open(BROWSERS_STAMP, "w", encoding="utf-8") as f:
+            json.dump({"playwright": _playwright_version(), "executable": executable, "checked": time.time()}, f)
+    except OSError as e:
+        logger.warning(f"Не удалось записать {BROWSERS_STAMP}: {e}")
+
+
+def browsers_present(executable_path: Optional[str] = None) -> bool:
+    """Есть ли Chromium: по пути от Playwright, по встроенным браузерам сборки
+    или по отметке прошлой проверки (той же версии Playwright)."""
+    if executable_path:
+        return Path(executable_path).exists()
+    bundled = os.environ.get("PLAYWRIGHT_BROWSERS_PATH")
+    if bundled and Path(bundled).exists():
+        return True
+    stamp = _read_stamp()
+    return (
+        bool(stamp.get("executable"))
+        and stamp.get("playwright") == _playwright_version()
+        and Path(stamp["executable"]).exists()
+    )
+
+
+def ensure_browsers_installed(executable_path: Optional[str] = None):
+    """Проверяет Chromium один раз за процесс; при отсутствии ставит его.
+
+    Результат запоминается в BROWSERS_STAMP, так что следующий запуск программы
+    не запускает ``playwright install`` заново.
+    """
+    global _browsers_checked
+    with _browsers_lock:
+        if _browsers_checked:
+            return
+        _browsers_checked = True
+        if browsers_present(executable_path):
+            if executable_path and _read_stamp().get("executable") != executable_path:
+                _write_stamp(executable_path)
+            return
+        if getattr(sys, "frozen", False):
+            # В exe sys.executable — сама программа, а не Python
+            logger.warning("Браузеры Playwright не найдены в сборке")
+            return
+        try:
+            logger.info("Installing Playwright chromium browsers, please wait…")
+            subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
+        except Exception as e:
+            logger.warning("Failed to install Playwright browsers: %s", e)
+            return
+        if executable_path and Path(executable_path).exists():
+            _write_stamp(executable_path)
@@ -0,0 +1,290 @@
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    from . import bootstrap
+    from .metrics import Metrics
+    from .profiles import Profile, ProfileStore
+    from .request_filter import LISTING_PROFILE, RequestBlocker, RoutingProfile
+except ImportError:
+    import bootstrap
+    from metrics import Metrics
+    from profiles import Profile, ProfileStore
+    from request_filter import LISTING_PROFILE, RequestBlocker, RoutingProfile
+
+logger = logging.getLogger(__name__)
+
+# If running from PyInstaller bundle, point Playwright to embedded browsers
+if getattr(sys, "_MEIPASS", None):
+    embedded_dir = Path(sys._MEIPASS) / "ms-playwright"
+    os.environ["PLAYWRIGHT_BROWSERS_PATH"] = str(embedded_dir)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1280, "height": 800},
+    "user_agent": USER_AGENT,
+    "locale": "ru-RU",
+    "timezone_id": "Europe/Moscow",
+}
+
+# Avoid detection
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
+
+
+def playwright_error(message: str) -> Exception:
+    """playwright.sync_api.Error с сообщением ``message``.
+
+    Playwright импортируется только там, где запускается браузер, чтобы разбор
+    кэша, HTTP-путь и окно GUI не тянули его за собой.
+    """
+    from playwright.sync_api import Error
+
+    return Error(message)
+
+
+def ensure_browsers_installed(executable_path: Optional[str] = None):
+    """Check once per process (and once per install, see bootstrap) that chromium is present."""
+    bootstrap.ensure_browsers_installed(executable_path)
+
+
+class _Slot:
+    """Контекст браузера с одной вкладкой и счётчиком переходов."""
+
+    __slots__ = ("context", "page", "navigations")
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.navigations = 0
+
+
+class BrowserPool:
+    """Один долгоживущий Chromium и несколько переиспользуемых контекстов/вкладок.
+
+    Объекты sync API Playwright привязаны к потоку, в котором созданы, поэтому
+    пул нужно создавать и использовать в одном потоке (например, в ParserThread.run).
+    Контекст пересоздаётся после ``max_navigations`` переходов или после ошибки,
+    браузер перезапускается, если он упал или отключился. ``routing`` задаёт
+    правила отмены лишних запросов (картинки, шрифты, трекеры); None — без фильтра.
+
+    С ``profiles`` (profiles.ProfileStore) пул захватывает свой каталог профиля и
+    запускает Chromium через launch_persistent_context: все вкладки живут в одном
+    контексте, а cookies, токены антибота и дисковый кэш скриптов переживают
+    перезапуск. Вкладка пересоздаётся после ``max_navigations``, контекст — нет.
+    Лишние запросы в этом режиме режутся через CDP (RequestBlocker.install_blocklist),
+    потому что page.route отключил бы тот самый HTTP-кэш.
+
+    С ``metrics`` (metrics.Metrics) при закрытии пула туда добавляются счётчики
+    отменённых фильтром запросов и сэкономленных байт.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_navigations: int = 50,
+        headless: bool = False,
+        routing: Optional[RoutingProfile] = LISTING_PROFILE,
+        profiles: Optional[ProfileStore] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.size = max(1, size)
+        self.max_navigations = max(1, max_navigations)
+        self.headless = headless
+        self.blocker = RequestBlocker(routing) if routing is not None else None
+        self.metrics = metrics
+        self._playwright = None
+        self._browser = None
+        self.profiles = profiles
+        self._profile: Optional[Profile] = None
+        # Постоянный контекст вместо браузера (режим profiles)
+        self._context = None
+        self._context_closed = False
+        self._idle: List[_Slot] = []
+        self._busy = 0
+        self.launches = 0
+        self.recycled = 0
+
+    def __enter__(self) -> "BrowserPool":
+        # Браузер запускается при первой выданной вкладке (см. _acquire), так что
+        # пул, которому хватило HTTP-пути, Chromium не запускает вовсе.
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if self._playwright is None:
+            # Отметка прошлой проверки (bootstrap.BROWSERS_STAMP) читается до
+            # запуска драйвера; путь к Chromium у драйвера спрашиваем, только если её нет
+            from playwright.sync_api import sync_playwright
+
+            stamped = bootstrap.browsers_present()
+            self._playwright = sync_playwright().start()
+            if not stamped:
+                ensure_browsers_installed(self._playwright.chromium.executable_path)
+        if (self._context if self.profiles is not None else self._browser) is None:
+            self._launch_browser()
+
+    def close(self):
+        for slot in self._idle:
+            self._dispose(slot)
+        self._idle = []
+        self._close_browser()
+        if self._profile is not None:
+            self._profile.release()
+            self._profile = None
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+        if self.metrics is not None and self.blocker is not None:
+            self.metrics.add_requests(self.blocker.stats())
+            # Повторный close не должен посчитать те же запросы дважды
+            self.blocker = RequestBlocker(self.blocker.profile)
+
+    def _close_browser(self):
+        target = self._context if self.profiles is not None else self._browser
+        if target is not None:
+            try:
+                target.close()
+            except Exception:
+                pass
+        self._browser = None
+        self._context = None
+
+    def _launch_browser(self):
+        try:
+            if self.profiles is not None:
+                self._launch_persistent()
+            else:
+                self._browser = self._playwright.chromium.launch(headless=self.headless)
+        except Exception as e:
+            logger.warning(f"Ошибка запуска браузера: {e}")
+            raise playwright_error(f"Не удалось запустить браузер Chromium: {e}")
+        self.launches += 1
+
+    def _launch_persistent(self):
+        if self._profile is None:
+            self._profile = self.profiles.claim()
+        self._profile.prepare()
+        context = self._playwright.chromium.launch_persistent_context(
+            str(self._profile.path),
+            headless=self.headless,
+            args=self.profiles.launch_args(),
+            **CONTEXT_OPTIONS,
+        )
+        self._context_closed = False
+        context.on("close", lambda _: setattr(self, "_context_closed", True))
+        context.add_init_script(STEALTH_SCRIPT)
+        self._context = context
+        # Стартовая вкладка профиля становится первой вкладкой пула
+        for page in context.pages:
+            self._idle.append(self._prepare_slot(_Slot(None, page)))
+
+    def _healthy_browser(self) -> bool:
+        if self.profiles is not None:
+            return self._context is not None and not self._context_closed
+        return self._browser is not None and self._browser.is_connected()
+
+    def _restart_browser(self):
+        logger.warning("Браузер недоступен, перезапускаем…")
+        self._idle = []
+        self._close_browser()
+        self._launch_browser()
+
+    def _new_slot(self) -> _Slot:
+        if self.profiles is not None:
+            return self._prepare_slot(_Slot(None, self._context.new_page()))
+        context = self._browser.new_context(**CONTEXT_OPTIONS)
+        if self.blocker is not None:
+            self.blocker.install(context)
+        page = context.new_page()
+        page.add_init_script(STEALTH_SCRIPT)
+        return _Slot(context, page)
+
+    def _prepare_slot(self, slot: _Slot) -> _Slot:
+        if self.blocker is not None:
+            try:
+                self.blocker.install_blocklist(slot.page)
+            except Exception as e:
+                logger.warning(f"Не удалось включить фильтр запросов: {e}")
+        return slot
+
+    def _dispose(self, slot: _Slot):
+        # В постоянном профиле контекст общий — закрывается только вкладка
+        try:
+            if slot.context is not None:
+                slot.context.close()
+            else:
+                slot.page.close()
+        except Exception:
+            pass
+
+    def _acquire(self) -> _Slot:
+        self.start()
+        if not self._healthy_browser():
+            self._restart_browser()
+        while self._idle:
+            slot = self._idle.pop()
+            if not slot.page.is_closed():
+                return slot
+            self._dispose(slot)
+        if self._busy >= self.size:
+            raise playwright_error(f"Все вкладки пула заняты ({self.size})")
+        return self._new_slot()
+
+    def _release(self, slot: _Slot, broken: bool):
+        slot.navigations += 1
+        if broken or slot.navigations >= self.max_navigations or slot.page.is_closed():
+            self._dispose(slot)
+            self.recycled += 1
+            return
+        self._idle.append(slot)
+
+    @contextmanager
+    def page(self):
+        """Выдаёт вкладку из пула и возвращает её обратно после использования."""
+        slot = self._acquire()
+        self._busy += 1
+        broken = False
+        try:
+            yield slot.page
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self._busy -= 1
+            if broken and not self._healthy_browser():
+                self._idle = []
+            else:
+                self._release(slot, broken)
+
+    def stats(self) -> dict:
+        stats = {
+            "launches": self.launches,
+            "recycled": self.recycled,
+            "idle": len(self._idle),
+            "busy": self._busy,
+        }
+        if self._profile is not None:
+            stats["profile"] = self._profile.path.name
+        if self.blocker is not None:
+            stats["requests"] = self.blocker.stats()
+        return stats
+
+
+@contextmanager
+def borrow_pool(pool: Optional[BrowserPool] = None, headless: bool = False, size: int = 1, metrics: Optional[Metrics] = None):
+    """Использует переданный пул или создаёт временный на время блока."""
+    if pool is not None:
+        yield pool
+        return
+    with BrowserPool(size=size, headless=headless, metrics=metrics) as own_pool:
+        yield own_pool
@@ -0,0 +1,277 @@
+"""Консольный запуск без GUI: для серверов без дисплея и cron.
+
+    python cli.py links.txt -o products.jsonl --threads 4 --resume
+    cat links.txt | python cli.py - -o products.csv --log-format json
+    python cli.py links.txt -o products.csv --pipeline --parsers 4
+
+Ход работы и сообщения модулей (logging) пишутся в stderr (строки JSON с
+``--log-format json``), stdout не используется; результаты —
+в файл по мере обхода. Ссылки проходят через очередь заданий (job_queue), так что
+``--resume`` после падения или kill продолжает с недоделанных продавцов. PyQt не
+импортируется.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+try:
+    from . import job_queue
+    from . import pipeline
+    from .details import DetailStore
+    from .metrics import Metrics
+    from .page_cache import PageCache
+    from .profiles import ProfileStore
+    from .seen_index import SeenIndex
+    from .sinks import FORMATS, open_sink
+    from .throttle import AdaptiveLimiter
+except ImportError:
+    import job_queue
+    import pipeline
+    from details import DetailStore
+    from metrics import Metrics
+    from page_cache import PageCache
+    from profiles import ProfileStore
+    from seen_index import SeenIndex
+    from sinks import FORMATS, open_sink
+    from throttle import AdaptiveLimiter
+
+
+class EventLog:
+    """Структурированный журнал: по строке на событие, из любых потоков."""
+
+    def __init__(self, fmt: str = "text", stream: TextIO = sys.stderr):
+        self.fmt = fmt
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        if self.fmt == "json":
+            line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False)
+        else:
+            details = " ".join(f"{key}={value}" for key, value in fields.items())
+            line = f"{time.strftime('%H:%M:%S')} {event} {details}".rstrip()
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class EventLogHandler(logging.Handler):
+    """Сообщения модулей (logging) в журнал событий, чтобы stdout оставался чистым."""
+
+    def __init__(self, log: EventLog):
+        super().__init__()
+        self.log = log
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.log.emit("log", level=record.levelname.lower(), module=record.name, message=record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+def read_links(source: str) -> List[str]:
+    """Ссылки из файла или stdin ("-"), по одной в строке; пустые строки и # пропускаются."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with stream:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+
+
+def batch_name(links: List[str]) -> str:
+    """Префикс имён партий для списка ссылок: ``cli-<хэш списка>``."""
+    digest = hashlib.sha1("\n".join(sorted(set(links))).encode("utf-8")).hexdigest()[:12]
+    return f"cli-{digest}"
+
+
+def resolve_batch(jobs: job_queue.JobQueue, links: List[str], batch: Optional[str], resume: bool):
+    """Партия для запуска и признак того, что продолжается уже начатая.
+
+    Без ``batch`` каждый запуск получает новую партию ``cli-<хэш>-<время>``, а
+    ``resume`` берёт самую свежую незаконченную партию того же списка ссылок.
+    Явное имя ``batch`` продолжается, если такая партия уже есть в очереди — с
+    ``resume`` или без: готовые ссылки enqueue всё равно не вернёт в работу, и
+    их строки должны остаться в файле результатов.
+    """
+    if batch:
+        return batch, jobs.stats(batch)["total"] > 0
+    prefix = batch_name(links)
+    if resume:
+        unfinished = jobs.unfinished_batches(prefix, failed=True)
+        if unfinished:
+            return unfinished[0], True
+    return prefix + time.strftime("-%Y%m%d-%H%M%S"), False
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Сбор объявлений продавцов Avito без GUI")
+    ap.add_argument("links", help="файл со ссылками на продавцов или - для stdin")
+    ap.add_argument("-o", "--output", required=True, help=f"файл результатов ({', '.join(FORMATS)})")
+    ap.add_argument("--format", choices=sorted(set(FORMATS.values())), help="формат, если не по расширению")
+    ap.add_argument("--threads", type=int, default=3, help="продавцов одновременно")
+    ap.add_argument("--tabs", type=int, default=3, help="вкладок на продавца для листания страниц")
+    ap.add_argument("--max-pages", type=int, default=10)
+    ap.add_argument("--per-host", type=int, default=2, help="одновременных запросов к хосту")
+    ap.add_argument("--min-interval", type=float, default=1.0, help="начальный интервал между запросами, с")
+    ap.add_argument("--headed", action="store_true", help="показывать окно браузера (по умолчанию headless)")
+    ap.add_argument("--no-http", action="store_true", help="не пробовать страницы без браузера")
+    ap.add_argument("--cache", action="store_true", help="сохранять страницы в кэш")
+    ap.add_argument("--replay", action="store_true", help="разбирать только страницы из кэша")
+    ap.add_argument("--only-new", action="store_true", help="только новые и изменившиеся объявления")
+    ap.add_argument("--details", action="store_true", help="открывать карточки: описание, параметры, прайс-лист")
+    ap.add_argument("--detail-tabs", type=int, default=3, help="вкладок на поток для карточек")
+    ap.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="конвейер: потоки только загружают страницы, разбор идёт в отдельных процессах",
+    )
+    ap.add_argument("--parsers", type=int, help="процессов разбора для --pipeline (по умолчанию по числу ядер)")
+    ap.add_argument("--persistent-profile", action="store_true", help="постоянный профиль браузера")
+    ap.add_argument("--resume", action="store_true", help="продолжить прерванный запуск с теми же ссылками")
+    ap.add_argument("--batch", help="имя партии в очереди; существующая партия продолжается (по умолчанию — по ссылкам и времени)")
+    ap.add_argument("--db", default=str(job_queue.DEFAULT_QUEUE_PATH), help="файл очереди заданий")
+    ap.add_argument("--attempts", type=int, default=3, help="попыток на продавца")
+    ap.add_argument("--metrics", help="дописать метрики страниц в этот JSONL")
+    ap.add_argument("--prometheus", help="файл метрик для textfile-коллектора node_exporter")
+    ap.add_argument("--log-format", choices=("text", "json"), default="text")
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    log = EventLog(args.log_format)
+
+    if args.pipeline and (args.only_new or args.details):
+        log.emit("error", message="--pipeline не поддерживает --only-new и --details")
+        return 2
+
+    try:
+        links = read_links(args.links)
+    except OSError as e:
+        log.emit("error", message=f"не удалось прочитать ссылки: {e}")
+        return 2
+    if not links:
+        log.emit("error", message="нет ссылок")
+        return 2
+    with job_queue.JobQueue(args.db, max_attempts=args.attempts) as jobs:
+        batch, continuing = resolve_batch(jobs, links, args.batch, args.resume)
+    if args.resume and not continuing:
+        log.emit("warning", message="незаконченной партии с этими ссылками нет, запуск с начала", batch=batch)
+    elif continuing and not args.resume:
+        log.emit("warning", message="партия уже есть в очереди, продолжаем её и дописываем файл", batch=batch)
+
+    try:
+        # Дописываем файл только к продолжаемой партии, иначе строки задвоятся
+        sink = open_sink(
+            args.output,
+            args.format,
+            append=continuing and os.path.exists(args.output),
+            details=args.details,
+        )
+    except ValueError as e:
+        log.emit("error", message=str(e))
+        return 2
+
+    metrics = Metrics(args.metrics)
+    limiter = AdaptiveLimiter(per_host=args.per_host, min_interval=args.min_interval)
+    cache = PageCache() if args.cache or args.replay else None
+    seen = SeenIndex() if args.only_new else None
+    detail_store = DetailStore() if args.details else None
+    written = [0]
+    lock = threading.Lock()
+
+    def on_page(products: List[Dict], seller_info: Dict):
+        with lock:
+            written[0] += len(products)
+
+    def on_seller(done: int, total: int, link: str, data: Dict):
+        log.emit(
+            "seller",
+            done=done,
+            total=total,
+            link=link,
+            products=data.get("total_products", 0),
+            errors=len(data.get("errors") or []),
+            written=written[0],
+            limiter=limiter.stats(),
+        )
+
+    handler = EventLogHandler(log)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    started = time.monotonic()
+    code = 0
+    try:
+        with job_queue.JobQueue(args.db, max_attempts=args.attempts) as jobs:
+            jobs.enqueue(links, batch)
+            if continuing:
+                jobs.reclaim_dead(batch)
+                jobs.retry_failed(batch)
+            log.emit("start", batch=batch, output=args.output, **jobs.stats(batch))
+            options = dict(
+                max_pages=args.max_pages,
+                headless=not args.headed,
+                http_first=not args.no_http,
+                cache=cache,
+                replay=args.replay,
+                sink=sink,
+                on_page=on_page,
+                metrics=metrics,
+                collect=False,
+                limiter=limiter,
+                profiles=ProfileStore() if args.persistent_profile else None,
+            )
+            if args.pipeline:
+                options.update(crawl=pipeline.run_pipeline, fetchers=args.threads, parsers=args.parsers)
+            else:
+                options.update(
+                    max_in_flight=args.threads,
+                    parallel_pages=args.tabs,
+                    seen=seen,
+                    details=args.details,
+                    detail_store=detail_store,
+                    detail_tabs=args.detail_tabs,
+                )
+            result = job_queue.run_worker(jobs, batch=batch, on_seller=on_seller, **options)
+            stats = jobs.stats(batch)
+        if stats["failed"] or stats["pending"] or stats["in_progress"]:
+            code = 1
+        totals = metrics.totals()
+        log.emit(
+            "finish",
+            batch=batch,
+            seconds=round(time.monotonic() - started, 1),
+            products=result["total_products"],
+            written=sink.rows,
+            pages=totals["urls"],
+            retries=totals["retries"],
+            blocked_requests=totals["requests"]["blocked"],
+            bytes_saved=totals["requests"]["estimated_bytes_saved"],
+            **stats,
+        )
+    except KeyboardInterrupt:
+        log.emit("interrupted", batch=batch, written=sink.rows, hint="запустите с --resume")
+        code = 130
+    finally:
+        sink.close()
+        if cache is not None:
+            cache.close()
+        if seen is not None:
+            seen.close()
+        if detail_store is not None:
+            detail_store.close()
+        metrics.close()
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus)
+        root.removeHandler(handler)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+import queue
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional
+
+try:
+    from . import parser as avito_parser
+    from .browser_pool import BrowserPool
+    from .page_cache import PageCache
+    from .seen_index import SeenIndex
+    from .sinks import ResultSink
+    from .http_fetch import HttpFetcher
+    from .metrics import Metrics
+    from .dedup import DedupIndex
+    from .throttle import AdaptiveLimiter
+    from .profiles import ProfileStore
+    from .details import DetailEnricher, DetailStore
+    from .request_filter import DETAIL_PROFILE
+except ImportError:
+    import parser as avito_parser
+    from browser_pool import BrowserPool
+    from page_cache import PageCache
+    from seen_index import SeenIndex
+    from sinks import ResultSink
+    from http_fetch import HttpFetcher
+    from metrics import Metrics
+    from dedup import DedupIndex
+    from throttle import AdaptiveLimiter
+    from profiles import ProfileStore
+    from details import DetailEnricher, DetailStore
+    from request_filter import DETAIL_PROFILE
+
+logger = logging.getLogger(__name__)
+
+
+def crawl_sellers(
+    links: List[str],
+    max_in_flight: int = 3,
+    per_host: int = 2,
+    min_interval: float = 1.0,
+    max_pages: int = 10,
+    parallel_pages: int = 3,
+    headless: bool = False,
+    on_seller: Optional[Callable[[int, int, str, Dict], None]] = None,
+    cache: Optional[PageCache] = None,
+    replay: bool = False,
+    seen: Optional[SeenIndex] = None,
+    sink: Optional[ResultSink] = None,
+    on_page: Optional[Callable[[List[Dict], Dict], None]] = None,
+    http_first: bool = True,
+    metrics: Optional[Metrics] = None,
+    collect: bool = True,
+    limiter: Optional[AdaptiveLimiter] = None,
+    profiles: Optional[ProfileStore] = None,
+    details: bool = False,
+    detail_store: Optional[DetailStore] = None,
+    detail_tabs: int = 3,
+    dedup: Optional[DedupIndex] = None,
+) -> Dict:
+    """Обходит продавцов параллельно и возвращает результат в формате ParserThread.
+
+    Запускается ``max_in_flight`` рабочих потоков, у каждого свой BrowserPool
+    (sync API Playwright привязан к потоку). Запросы к одному хосту дополнительно
+    ограничиваются ``limiter`` (по умолчанию новый throttle.AdaptiveLimiter с
+    ``per_host``/``min_interval``): скорость подстраивается под ответы, а при
+    серии блокировок все потоки ждут. Общий limiter сохраняет это состояние между
+    вызовами. ``on_seller(done, total, link, data)`` вызывается
+    из рабочих потоков после каждого продавца. Страницы одного продавца
+    грузятся в ``parallel_pages`` вкладках пула рабочего потока.
+    ``cache``/``replay`` передаются в fetch_products_for_seller; в режиме replay
+    браузеры не запускаются. С ``http_first`` страницы сначала запрашиваются общей
+    HTTP-сессией, а браузер запускается, только если без него объявлений не видно.
+    С ``seen`` возвращаются только новые или изменившиеся объявления.
+    В ``sink`` каждая страница дописывается сразу после разбора, так что падение
+    на середине списка не теряет уже собранное. ``on_page(products, seller_info)``
+    тоже вызывается после каждой страницы (из рабочих потоков).
+    ``metrics`` общий для всех потоков и собирает время этапов по каждой странице.
+    С ``collect=False`` объявления не накапливаются в результате (только их число) —
+    для длинных обходов, где всё уходит в ``sink`` и память должна оставаться ровной.
+    Объявления склеиваются по ID между страницами и продавцами: в ``sink`` и
+    ``on_page`` каждое попадает один раз, а в результате — его самая свежая копия.
+    Переданный ``dedup`` (dedup.DedupIndex) продолжает склейку между вызовами —
+    например, между порциями job_queue.run_worker; тогда результат содержит все
+    объявления индекса, а не только этого вызова.
+    Продавцы, у которых страницы так и не загрузились, перечислены в ``errors``
+    результата (ссылка -> причины).
+    С ``profiles`` каждый рабочий поток запускает браузер в своём постоянном
+    профиле (см. BrowserPool), так что cookies и кэш переживают перезапуск.
+    С ``details`` новые объявления дополняются полями карточек (details.DetailEnricher):
+    у каждого рабочего потока второй пул на ``detail_tabs`` вкладок с
+    request_filter.DETAIL_PROFILE, а ``detail_store`` (общий) позволяет не
+    открывать карточки, не изменившиеся с прошлого запуска. В режиме replay поля
+    берутся только из ``detail_store``.
+    """
+    total = len(links)
+    fetched_at = time.time()
+    results: List[Optional[Dict]] = [None] * total
+    tasks: "queue.Queue[int]" = queue.Queue()
+    for idx in range(total):
+        tasks.put(idx)
+
+    if limiter is None:
+        limiter = AdaptiveLimiter(per_host=per_host, min_interval=min_interval)
+    lock = threading.Lock()
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    done = [0]
+    if dedup is None:
+        dedup = DedupIndex(keep_products=collect)
+    http = HttpFetcher(pool_size=max(1, max_in_flight)) if http_first and not replay else None
+
+    def page_done(products: List[Dict], seller_info: Dict):
+        products = dedup.add_many(products)
+        if not products:
+            return
+        if sink is not None:
+            sink.write(products, seller_info)
+        if on_page:
+            on_page(products, seller_info)
+
+    def worker():
+        try:
+            with ExitStack() as stack:
+                pool = None
+                if not replay:
+                    pool = stack.enter_context(
+                        BrowserPool(size=parallel_pages, headless=headless, profiles=profiles, metrics=metrics)
+                    )
+                enricher = None
+                if details:
+                    # Пул карточек ленивый: Chromium для него запускается при первой карточке
+                    detail_pool = None if replay else stack.enter_context(
+                        BrowserPool(
+                            size=detail_tabs,
+                            headless=headless,
+                            routing=DETAIL_PROFILE,
+                            profiles=profiles,
+                            metrics=metrics,
+                        )
+                    )
+                    enricher = DetailEnricher(
+                        detail_pool, tabs=detail_tabs, store=detail_store, limiter=limiter, metrics=metrics
+                    )
+                while not stop.is_set():
+                    try:
+                        idx = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    link = links[idx]
+                    data = avito_parser.fetch_products_for_seller(
+                        link,
+                        max_pages=max_pages,
+                        parallel_pages=parallel_pages,
+                        pool=pool,
+                        limiter=None if replay else limiter,
+                        cache=cache,
+                        replay=replay,
+                        seen=seen,
+                        on_page=page_done,
+                        http=http,
+                        metrics=metrics,
+                        details=enricher,
+                    )
+                    # Повторы внутри продавца до page_done не доходят — берём его свежие копии
+                    dedup.refresh(data["products"])
+                    results[idx] = {**data, "products": []}
+                    with lock:
+                        done[0] += 1
+                        finished = done[0]
+                    if on_seller:
+                        on_seller(finished, total, link, data)
+        except BaseException as e:
+            with lock:
+                errors.append(e)
+            stop.set()
+
+    workers = [
+        threading.Thread(target=worker, name=f"crawler-{n}", daemon=True)
+        for n in range(max(1, min(max_in_flight, total)))
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if http is not None:
+        http.close()
+
+    if errors:
+        raise errors[0]
+
+    all_products = dedup.products()
+    seller_info: Dict = {}
+    for data in results:
+        if not data:
+            continue
+        # Keep first seller info if available
+        if not seller_info and data.get("seller_info"):
+            seller_info = data["seller_info"]
+
+    errors_by_link = {
+        link: data["errors"] for link, data in zip(links, results) if data and data.get("errors")
+    }
+    if errors_by_link:
+        logger.warning(f"Не полностью загружено продавцов: {len(errors_by_link)} из {total}")
+
+    return {
+        "total_products": len(dedup),
+        "products": all_products,
+        "seller_info": seller_info,
+        "fetched_at": fetched_at,
+        "errors": errors_by_link,
+    }
@@ -0,0 +1,100 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .records import attach_details
+    from .seen_index import item_id_from_url
+except ImportError:
+    from records import attach_details
+    from seen_index import item_id_from_url
+
+
+def product_key(product: Dict) -> Optional[str]:
+    """Ключ объявления: ID из состояния страницы или числовой суффикс URL.
+
+    У Product без ``item_id`` он заполняется из URL, чтобы дальше не вычислять его заново.
+    """
+    item_id = product.get("item_id") or item_id_from_url(product.get("url", ""))
+    if item_id and not product.get("item_id"):
+        try:
+            product["item_id"] = item_id
+        except (KeyError, TypeError):
+            pass
+    return item_id
+
+
+class DedupIndex:
+    """Индекс объявлений по ID для потока строк: O(1) на строку.
+
+    ``add_many`` возвращает только впервые встреченные объявления — их можно
+    сразу отдавать в sink или таблицу. Повторная копия (та же карточка на
+    следующей странице ленты или тот же продавец второй раз во входном списке)
+    заменяет сохранённую на её месте, так что ``products()`` содержит самую свежую
+    копию каждого объявления в порядке первого появления (поля карточки, если у
+    свежей копии их нет, переходят к ней от прежней). Объявления без ID не
+    склеиваются. С ``keep_products=False`` хранятся только ID (для обходов, где
+    всё пишется в sink). Объект можно использовать из нескольких потоков.
+    """
+
+    def __init__(self, keep_products: bool = True):
+        self.keep_products = keep_products
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self._positions: Dict[str, int] = {}
+        self._products: List[Dict] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._products) if self.keep_products else len(self._positions)
+
+    def __contains__(self, item_id: str) -> bool:
+        with self._lock:
+            return item_id in self._positions
+
+    def add_many(self, products: Iterable[Dict]) -> List[Dict]:
+        fresh = []
+        keyed = [(product_key(p), p) for p in products]
+        with self._lock:
+            for key, product in keyed:
+                pos = self._positions.get(key) if key else None
+                if pos is not None:
+                    self.duplicates += 1
+                    self._replace(pos, product)
+                    continue
+                if key:
+                    self._positions[key] = len(self._products) if self.keep_products else 0
+                if self.keep_products:
+                    self._products.append(product)
+                fresh.append(product)
+        return fresh
+
+    def refresh(self, products: Iterable[Dict]):
+        """Заменяет сохранённые копии уже известных объявлений на ``products``.
+
+        Нужен, когда свежие копии не прошли через add_many: например, повтор
+        объявления на следующей странице того же продавца отсеивается ещё в
+        fetch_products_for_seller, а в его результате остаётся именно свежая копия.
+        """
+        if not self.keep_products:
+            return
+        keyed = [(product_key(p), p) for p in products]
+        with self._lock:
+            for key, product in keyed:
+                pos = self._positions.get(key) if key else None
+                if pos is not None:
+                    self._replace(pos, product)
+
+    def _replace(self, pos: int, product: Dict):
+        if not self.keep_products:
+            return
+        kept = self._products[pos]
+        if kept is product:
+            return
+        details = kept.get("details")
+        if details and not product.get("details"):
+            attach_details(product, details)
+        self._products[pos] = product
+
+    def products(self) -> List[Dict]:
+        with self._lock:
+            return list(self._products)
@@ -0,0 +1,415 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, nullcontext
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional
+
+try:
+    from .browser_pool import BrowserPool
+    from .metrics import Metrics, timed
+    from .records import DETAIL_FIELDS, attach_details
+    from .seen_index import fingerprint, item_id_from_url
+    from .throttle import Blocked, detect_block, retry_call
+except ImportError:
+    from browser_pool import BrowserPool
+    from metrics import Metrics, timed
+    from records import DETAIL_FIELDS, attach_details
+    from seen_index import fingerprint, item_id_from_url
+    from throttle import Blocked, detect_block, retry_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DETAILS_PATH = Path.home() / ".avito_parser" / "details.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    item_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+# Вся работа с карточкой объявления — один page.evaluate. Вместо пауз по 1,5 и
+# 0,5 с и повторных кликов старого скрипта ожидание идёт внутри страницы через
+# MutationObserver: сначала появления основных блоков, затем (если прайс-лист
+# пришлось раскрывать) — появления услуг и паузы в изменениях DOM. Поля и формат
+# прайс-листа те же, что у extract_product_details_xpath / extract_price_list_xpath.
+DETAIL_JS = """
+async ({readyMs, expandMs, settleMs}) => {
+  const SKIP = new Set(['SCRIPT', 'STYLE', 'TEMPLATE', 'NOSCRIPT']);
+  const text = (el) => {
+    if (!el) return '';
+    const parts = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, {
+      acceptNode: (n) => {
+        for (let p = n.parentNode; p && p !== el.parentNode; p = p.parentNode) {
+          if (SKIP.has(p.nodeName)) return NodeFilter.FILTER_REJECT;
+        }
+        return NodeFilter.FILTER_ACCEPT;
+      },
+    });
+    for (let n = walker.nextNode(); n; n = walker.nextNode()) parts.push(n.nodeValue);
+    return parts.join(' ').replace(/\\u00a0/g, ' ').split(/\\s+/).filter(Boolean).join(' ');
+  };
+  const q = (sel) => document.querySelector(sel);
+
+  // Ждёт, пока check() не станет истинным (или истечёт ms)
+  const waitFor = (check, ms) => new Promise((resolve) => {
+    if (check()) return resolve(true);
+    const mo = new MutationObserver(() => {
+      if (check()) finish(true);
+    });
+    const timer = setTimeout(() => finish(check()), ms);
+    function finish(ok) {
+      mo.disconnect();
+      clearTimeout(timer);
+      resolve(ok);
+    }
+    mo.observe(document.documentElement, {childList: true, subtree: true});
+  });
+  // Ждёт паузы в изменениях DOM длиной quietMs, но не дольше maxMs
+  const settle = (quietMs, maxMs) => new Promise((resolve) => {
+    let idle = setTimeout(finish, quietMs);
+    const hard = setTimeout(finish, maxMs);
+    const mo = new MutationObserver(() => {
+      clearTimeout(idle);
+      idle = setTimeout(finish, quietMs);
+    });
+    function finish() {
+      mo.disconnect();
+      clearTimeout(idle);
+      clearTimeout(hard);
+      resolve();
+    }
+    mo.observe(document.documentElement, {childList: true, subtree: true});
+  });
+
+  const started = performance.now();
+  const MAIN = '#bx_item-params, #bx_item-description, .gVNL7, [data-marker*="PRICE_LIST"]';
+  await waitFor(() => q(MAIN), readyMs);
+
+  const SERVICE = '[data-marker*="PRICE_LIST_VALUE_MARKER"]';
+  const services = () => document.querySelectorAll(SERVICE).length;
+  let expanded = false;
+  if (q('.gVNL7, [data-marker*="PRICE_LIST"]')) {
+    // Уже раскрытый список заголовком не трогаем — повторный клик его свернёт
+    const before = services();
+    let buttons = [...document.querySelectorAll(before
+      ? '.gVNL7 .button'
+      : '[data-marker*="PRICE_LIST_TITLE_MARKER"], .gVNL7 ._o8T3, .gVNL7 .button')];
+    if (!buttons.length && !before) {
+      buttons = [...document.querySelectorAll('button, [role="button"], a')]
+        .filter((el) => text(el).includes('Прайс'))
+        .slice(0, 1);
+    }
+    buttons.forEach((el) => el.click());
+    expanded = buttons.length > 0;
+    if (expanded) {
+      if (!before) await waitFor(() => services() > 0, expandMs);
+      await settle(settleMs, expandMs);
+    }
+  }
+
+  let location = '';
+  for (const h2 of document.querySelectorAll('h2')) {
+    if (!h2.textContent.includes('Расположение')) continue;
+    let sib = h2.nextElementSibling;
+    while (sib && sib.nodeName !== 'DIV') sib = sib.nextElementSibling;
+    location = text(sib);
+    if (location) break;
+  }
+  if (!location) location = text(q('[itemprop="address"]'));
+
+  const lines = [];
+  const title = text(q('.gVNL7 h2.EEPdn') || q('.gVNL7 h2'));
+  if (title) lines.push(`=== ${title} ===`);
+  document.querySelectorAll(SERVICE).forEach((el) => {
+    const name = text(el.querySelector('p.T7ujv.Tdsqf') || el.querySelector('p'));
+    const price = text(el.querySelector('strong.OVzrF') || el.querySelector('strong'));
+    if (name) lines.push(price ? `• ${name}: ${price}` : `• ${name}`);
+  });
+  if (lines.length <= 1) {
+    const full = text(q('.gVNL7'));
+    if (full.length > 20) lines.push('Полный текст прайс-листа:', full);
+  }
+
+  return {
+    location_detail: location,
+    details: text(q('#bx_item-params')),
+    price_list: lines.join('\\n'),
+    description: text(q('#bx_item-description')),
+    additional: text(q('div.UaGSK')),
+    services: services(),
+    expanded,
+    ms: Math.round(performance.now() - started),
+  };
+}
+"""
+
+
+def _item_key(product: Dict) -> Optional[str]:
+    return product.get("item_id") or item_id_from_url(product.get("url", ""))
+
+
+class DetailStore:
+    """Поля карточек объявлений из прошлых запусков, по ID объявления.
+
+    Вместе с полями хранится отпечаток объявления из ленты продавца
+    (seen_index.fingerprint): если название, цена и адрес не изменились, а
+    запись не старше ``max_age`` секунд, карточку можно не открывать заново.
+    Объект можно использовать из нескольких потоков.
+    """
+
+    def __init__(self, path=DEFAULT_DETAILS_PATH, max_age: Optional[float] = 7 * 24 * 3600):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "DetailStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, products: Iterable[Dict]) -> Dict[str, Dict]:
+        """{item_id: поля} для объявлений, карточки которых не изменились."""
+        wanted = {}
+        for product in products:
+            key = _item_key(product)
+            if key:
+                wanted[key] = fingerprint(product)
+        if not wanted:
+            return {}
+        oldest = time.time() - self.max_age if self.max_age else 0.0
+        found = {}
+        keys = list(wanted)
+        with self._lock:
+            # Не больше 500 параметров на запрос — ниже лимита старых сборок SQLite
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT item_id, fingerprint, fetched_at, data FROM details "
+                    f"WHERE item_id IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for item_id, fp, fetched_at, data in rows:
+                    if fp == wanted[item_id] and fetched_at >= oldest:
+                        found[item_id] = json.loads(data)
+        return found
+
+    def put(self, product: Dict, details: Dict):
+        key = _item_key(product)
+        if not key:
+            return
+        row = (key, fingerprint(product), time.time(), json.dumps(details, ensure_ascii=False))
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO details (item_id, fingerprint, fetched_at, data) VALUES (?, ?, ?, ?)
+                ON CONFLICT (item_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    fetched_at = excluded.fetched_at,
+                    data = excluded.data
+                """,
+                row,
+            )
+            self._conn.commit()
+
+
+def _retry_after(response) -> float:
+    if response is None:
+        return 0.0
+    try:
+        return float(response.header_value("retry-after") or 0)
+    except Exception:
+        return 0.0
+
+
+class DetailEnricher:
+    """Дополняет объявления полями их карточек: адрес, параметры, прайс-лист,
+    описание и дополнительный блок (records.DETAIL_FIELDS).
+
+    Карточки открываются в ``tabs`` вкладках ``pool`` одновременно: переходы
+    запускаются с ``wait_until="commit"``, и следующая карточка грузится, пока
+    читается текущая; все поля собираются одним page.evaluate (DETAIL_JS).
+    Пул лучше создавать с request_filter.DETAIL_PROFILE — стили и картинки
+    карточке не нужны. Объявления, которые ``store`` (DetailStore) помнит
+    неизменившимися, не открываются; без ``pool`` поля берутся только из
+    ``store``. ``limiter.slot`` охватывает только переход, а блокировка,
+    замеченная уже после него, передаётся в ``limiter.report`` — так капча
+    замедляет весь обход. Карточка, не загрузившаяся в общем потоке, повторяется
+    по одной до ``attempts`` раз через throttle.retry_call. Если и это не
+    помогло, у объявления остаются пустые поля, а в ``store`` оно не попадает и
+    будет загружено в следующий раз. Как и пул, объект используется в одном потоке.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        tabs: int = 3,
+        store: Optional[DetailStore] = None,
+        limiter=None,
+        metrics: Optional[Metrics] = None,
+        attempts: int = 2,
+        ready_timeout: float = 5.0,
+        expand_timeout: float = 5.0,
+        settle: float = 0.4,
+    ):
+        self.pool = pool
+        self.tabs = max(1, min(tabs, pool.size)) if pool is not None else 0
+        self.store = store
+        self.limiter = limiter
+        self.metrics = metrics
+        self.attempts = max(1, attempts)
+        self.js_args = {
+            "readyMs": int(ready_timeout * 1000),
+            "expandMs": int(expand_timeout * 1000),
+            "settleMs": int(settle * 1000),
+        }
+        self.loaded = 0
+        self.cached = 0
+        self.failed = 0
+
+    def enrich(self, products: List[Dict]) -> int:
+        """Заполняет поля карточек у ``products``; возвращает, сколько карточек открыто."""
+        known = self.store.lookup(products) if self.store is not None else {}
+        pending = []
+        for product in products:
+            details = known.get(_item_key(product))
+            if details is not None:
+                attach_details(product, details)
+            elif product.get("url"):
+                pending.append(product)
+        cached = len(products) - len(pending)
+        self.cached += cached
+        if not pending or self.pool is None:
+            return 0
+
+        loaded = self.loaded
+        for product in self._load_pipelined(pending):
+            self._load_one(product)
+        logger.info(f"Карточки: загружено {self.loaded - loaded} из {len(pending)}, без изменений {cached}")
+        return self.loaded - loaded
+
+    def _done(self, product: Dict, details: Dict):
+        attach_details(product, details)
+        self.loaded += 1
+        if self.store is not None:
+            self.store.put(product, details)
+
+    def _report(self, url: str, error: Optional[Exception] = None):
+        """Итог карточки для ``limiter``: успех или блокировка после перехода."""
+        if self.limiter is not None and (error is None or isinstance(error, Blocked)):
+            self.limiter.report(url, error)
+
+    def _check(self, page, url: str, response):
+        """Дожидается DOM карточки; Blocked, если открылась капча или 429."""
+        with timed(self.metrics, url, "goto"):
+            page.wait_for_load_state("domcontentloaded", timeout=60000)
+        status = response.status if response is not None else None
+        reason = detect_block(status=status, title=page.title())
+        if reason is not None:
+            raise Blocked(reason, url, _retry_after(response))
+
+    def _extract(self, page, url: str, response) -> Dict:
+        with timed(self.metrics, url, "parse"):
+            data = page.evaluate(DETAIL_JS, self.js_args)
+        details = {name: data.get(name) or "" for name in DETAIL_FIELDS}
+        if not any(details.values()):
+            # Пустая карточка — возможно, это заглушка капчи с обычным заголовком
+            reason = detect_block(page.content(), title="")
+            if reason is not None:
+                raise Blocked(reason, url, _retry_after(response))
+        if self.metrics is not None:
+            self.metrics.add(url, items=1)
+        return details
+
+    def _load_pipelined(self, products: List[Dict]) -> List[Dict]:
+        """Грузит карточки по очереди в нескольких вкладках; возвращает не загрузившиеся."""
+        pending: Deque[Dict] = deque(products)
+        in_flight: Deque = deque()
+        failed: List[Dict] = []
+
+        with ExitStack() as stack:
+            free = [stack.enter_context(self.pool.page()) for _ in range(min(self.tabs, len(pending)))]
+
+            def start_next():
+                while free and pending:
+                    tab, product = free.pop(), pending.popleft()
+                    url = product["url"]
+                    try:
+                        with self.limiter.slot(url, deferred=True) if self.limiter else nullcontext():
+                            response = tab.goto(url, timeout=60000, wait_until="commit")
+                    except Exception as e:
+                        logger.warning(f"Карточка {url} не открылась: {e}")
+                        failed.append(product)
+                        if not tab.is_closed():
+                            free.append(tab)
+                        continue
+                    in_flight.append((tab, product, response))
+
+            try:
+                start_next()
+                while in_flight:
+                    tab, product, response = in_flight.popleft()
+                    try:
+                        self._check(tab, product["url"], response)
+                        details = self._extract(tab, product["url"], response)
+                    except Exception as e:
+                        self._report(product["url"], e)
+                        logger.warning(f"Карточка {product['url']} не прочитана: {e}")
+                        failed.append(product)
+                    else:
+                        self._report(product["url"])
+                        self._done(product, details)
+                    if not tab.is_closed():
+                        free.append(tab)
+                    start_next()
+            finally:
+                for tab, _, _ in in_flight:
+                    try:
+                        tab.goto("about:blank", wait_until="commit")
+                    except Exception:
+                        pass
+        # Вкладки закончились раньше очереди (закрылись после ошибок)
+        failed.extend(pending)
+        return failed
+
+    def _load_one(self, product: Dict):
+        url = product["url"]
+
+        def attempt() -> Dict:
+            with self.pool.page() as page:
+                # Блокировку при переходе учитывает сам слот, после него — _report
+                with self.limiter.slot(url, deferred=True) if self.limiter else nullcontext():
+                    response = page.goto(url, timeout=60000, wait_until="commit")
+                    self._check(page, url, response)
+                try:
+                    details = self._extract(page, url, response)
+                except Exception as e:
+                    self._report(url, e)
+                    raise
+                self._report(url)
+                return details
+
+        try:
+            self._done(product, retry_call(attempt, url, attempts=self.attempts, metrics=self.metrics))
+        except Exception as e:
+            logger.warning(f"Карточка {url} пропущена: {e}")
+            self.failed += 1
+
+    def stats(self) -> Dict:
+        return {"loaded": self.loaded, "cached": self.cached, "failed": self.failed}
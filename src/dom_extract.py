@@ -0,0 +1,93 @@
+from typing import Dict
+from urllib.parse import urljoin
+
+try:
+    from .records import Product
+except ImportError:
+    from records import Product
+
+BASE_URL = "https://www.avito.ru"
+
+# Повторяет _parse_listing_page внутри браузера: один page.evaluate вместо
+# page.content() + BeautifulSoup. Текст собирается так же, как get_text(strip=True):
+# каждый текстовый узел обрезается, затем узлы склеиваются без разделителя.
+EXTRACT_JS = """
+({itemSelector}) => {
+  const SKIP = new Set(['SCRIPT', 'STYLE', 'TEMPLATE', 'NOSCRIPT']);
+  const text = (el) => {
+    if (!el) return '';
+    const parts = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, {
+      acceptNode: (n) => {
+        for (let p = n.parentNode; p && p !== el.parentNode; p = p.parentNode) {
+          if (SKIP.has(p.nodeName)) return NodeFilter.FILTER_REJECT;
+        }
+        return NodeFilter.FILTER_ACCEPT;
+      },
+    });
+    for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+      const t = n.nodeValue.trim();
+      if (t) parts.push(t);
+    }
+    return parts.join('');
+  };
+  const clean = (s) => s.split(/\\s+/).filter(Boolean).join(' ');
+  const attr = (el, name) => (el && el.getAttribute(name)) || '';
+
+  const products = [];
+  document.querySelectorAll(itemSelector).forEach((card, i) => {
+    const a = card.querySelector('[data-marker="item-title"]');
+    if (!a) return;
+    let price = '';
+    const meta = card.querySelector('meta[itemprop="price"]');
+    if (meta && meta.getAttribute('content')) {
+      price = meta.getAttribute('content').trim();
+    } else {
+      const p = card.querySelector('[data-marker="item-price"]');
+      if (p) price = clean(text(p));
+    }
+    const geo = card.querySelector('div[class*="geo-root"]');
+    const date = card.querySelector('[data-marker="item-date"]');
+    products.push({
+      index: i + 1,
+      name: text(a),
+      href: attr(a, 'href'),
+      title: attr(a, 'title'),
+      price,
+      location: geo ? clean(text(geo)) : '',
+      date: date ? clean(text(date)) : '',
+    });
+  });
+
+  const seller_info = {};
+  const nameWrap = document.querySelector('div[class*="AvatarNameView-name"]');
+  const h = nameWrap && nameWrap.querySelector('h1, h2');
+  if (h) seller_info.name = text(h);
+  const score = document.querySelector('span[data-marker="profile/score"]');
+  if (score) seller_info.rating = text(score);
+
+  return {products, seller_info};
+}
+"""
+
+
+def extract_listing(page, item_selector: str) -> Dict:
+    """Собирает карточки и данные продавца одним page.evaluate.
+
+    Возвращает ``{"products", "seller_info"}`` в том же виде, что и
+    parser._parse_listing_page, но без разбора HTML на стороне Python.
+    """
+    raw = page.evaluate(EXTRACT_JS, {"itemSelector": item_selector})
+    products = []
+    for item in raw["products"]:
+        href = item.pop("href")
+        products.append(Product(
+            index=item["index"],
+            name=item["name"],
+            url=urljoin(BASE_URL, href),
+            title=item["title"],
+            price=item["price"],
+            location=item["location"],
+            date=item["date"],
+        ))
+    return {"products": products, "seller_info": raw["seller_info"]}
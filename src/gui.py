@@ -1,8 +1,9 @@
+import logging
 import sys
 import os
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
     QApplication,
     QWidget,
@@ -14,72 +15,156 @@ from PyQt6.QtWidgets import (
     QLabel,
     QMessageBox,
     QProgressBar,
-    QTableWidget,
-    QTableWidgetItem,
+    QSpinBox,
+    QCheckBox,
+    QTableView,
+    QLineEdit,
 )
 
-# Import parser module regardless of execution context (package / script / PyInstaller)
+# bootstrap импортирует только стандартную библиотеку; тяжёлые модули (Playwright,
+# requests, bs4) загружаются при первом обращении или в фоне после показа окна
 try:
-    # 1. Running inside package "src"
-    from . import parser as avito_parser  # type: ignore
+    from . import bootstrap  # type: ignore
 except ImportError:
     try:
-        # 2. Running from project root (e.g. "python src/gui.py") or bundled exe
-        import src.parser as avito_parser  # type: ignore
+        import src.bootstrap as bootstrap  # type: ignore
+    except ImportError:
+        import bootstrap  # type: ignore
+
+if TYPE_CHECKING:
+    # Не выполняется: эти импорты нужны анализатору PyInstaller, который иначе не
+    # увидит модули, загружаемые ниже по имени, и не положит их в сборку
+    try:
+        from . import crawler, details, job_queue, metrics, page_cache, parser  # noqa: F401
+        from . import profiles, results_model, seen_index, sinks  # noqa: F401
     except ImportError:
         try:
-            # 3. PyInstaller bundled executable
-            import parser as avito_parser  # type: ignore
+            from src import crawler, details, job_queue, metrics, page_cache, parser  # noqa: F401
+            from src import profiles, results_model, seen_index, sinks  # noqa: F401
         except ImportError:
-            # 4. Fallback: ensure current directory on sys.path then import by module name
-            import sys
-            import os
-            from pathlib import Path
+            import crawler, details, job_queue, metrics, page_cache, parser  # noqa: F401
+            import profiles, results_model, seen_index, sinks  # noqa: F401
 
-            current_dir = Path(__file__).resolve().parent
-            if str(current_dir) not in sys.path:
-                sys.path.insert(0, str(current_dir))
+avito_parser = bootstrap.lazy("parser")
+avito_crawler = bootstrap.lazy("crawler")
+job_queue = bootstrap.lazy("job_queue")
+avito_details = bootstrap.lazy("details")
+metrics = bootstrap.lazy("metrics")
+page_cache = bootstrap.lazy("page_cache")
+profiles = bootstrap.lazy("profiles")
+seen_index = bootstrap.lazy("seen_index")
+sinks = bootstrap.lazy("sinks")
 
-            try:
-                import parser as avito_parser  # type: ignore
-            except ImportError:
-                # Last resort - try to import from parent directory
-                parent_dir = current_dir.parent
-                if str(parent_dir) not in sys.path:
-                    sys.path.insert(0, str(parent_dir))
-                import src.parser as avito_parser  # type: ignore
+_results_model = bootstrap.import_module("results_model")
+ProductsTableModel = _results_model.ProductsTableModel
+make_proxy = _results_model.make_proxy
+
+logger = logging.getLogger(__name__)
 
 
 class ParserThread(QThread):
     progress = pyqtSignal(int)
+    # Состояние партии в очереди заданий; читается в потоке обхода, а не в окне
+    queue_stats = pyqtSignal(object)
+    # New rows of every parsed page, emitted while the crawl is still running
+    batch = pyqtSignal(object)
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
 
-    def __init__(self, links: List[str]):
+    def __init__(
+        self,
+        links: List[str],
+        max_in_flight: int = 3,
+        use_cache: bool = True,
+        replay: bool = False,
+        only_new: bool = False,
+        sink_path: Optional[str] = None,
+        batch: Optional[str] = None,
+        persistent_profile: bool = False,
+        details: bool = False,
+        append: bool = False,
+    ):
         super().__init__()
         self.links = links
+        # Ссылки уже лежат в очереди заданий: прогресс переживает падение программы
+        self.job_batch = batch
+        self.max_in_flight = max_in_flight
+        self.use_cache = use_cache or replay
+        self.replay = replay
+        self.only_new = only_new
+        self.sink_path = sink_path
+        # Продолжение партии дописывает файл автосохранения, а не перезаписывает его
+        self.append = append
+        self.persistent_profile = persistent_profile
+        self.details = details
+        # Записи страниц дописываются в файл по ходу обхода, в памяти только суммы
+        self.metrics = metrics.Metrics(metrics.DEFAULT_METRICS_PATH)
+        self._jobs = None
+
+    def _on_page(self, products: list, seller_info: dict):
+        self.batch.emit(products)
+
+    def _on_seller(self, done: int, total: int, link: str, data: dict):
+        self.progress.emit(int((done / total) * 100))
+        if self._jobs is not None:
+            self.queue_stats.emit(self._jobs.stats(self.job_batch))
 
     def run(self):
+        cache = page_cache.PageCache() if self.use_cache else None
+        seen = seen_index.SeenIndex() if self.only_new else None
+        detail_store = avito_details.DetailStore() if self.details else None
+        sink = None
         try:
-            all_products = []
-            seller_info = {}
-            total_links = len(self.links)
-            for idx, link in enumerate(self.links, start=1):
-                data = avito_parser.fetch_products_for_seller(link)
-                all_products.extend(data["products"])
-                # Keep first seller info if available
-                if not seller_info and data.get("seller_info"):
-                    seller_info = data["seller_info"]
-                progress_percent = int((idx / total_links) * 100)
-                self.progress.emit(progress_percent)
-            result = {
-                "total_products": len(all_products),
-                "products": all_products,
-                "seller_info": seller_info,
-            }
+            # Autosave: every page is appended to the file as soon as it is parsed
+            if self.sink_path:
+                append = self.append and os.path.exists(self.sink_path)
+                sink = sinks.open_sink(self.sink_path, append=append, details=self.details)
+            options = dict(
+                max_in_flight=self.max_in_flight,
+                on_seller=self._on_seller,
+                on_page=self._on_page,
+                cache=cache,
+                replay=self.replay,
+                seen=seen,
+                sink=sink,
+                metrics=self.metrics,
+                profiles=profiles.ProfileStore() if self.persistent_profile else None,
+                details=self.details,
+                detail_store=detail_store,
+            )
+            if self.job_batch:
+                with job_queue.JobQueue() as jobs:
+                    self._jobs = jobs
+                    try:
+                        result = job_queue.run_worker(jobs, batch=self.job_batch, **options)
+                    finally:
+                        self._jobs = None
+            else:
+                result = avito_crawler.crawl_sellers(self.links, **options)
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            if cache is not None:
+                cache.close()
+            if seen is not None:
+                seen.close()
+            if detail_store is not None:
+                detail_store.close()
+            if sink is not None:
+                sink.close()
+            try:
+                self.metrics.close()
+            except OSError as e:
+                logger.warning(f"Не удалось сохранить метрики: {e}")
+
+
+SAVE_FILTERS = ";;".join([
+    "CSV files (*.csv)",
+    "JSON Lines (*.jsonl)",
+    "Parquet (*.parquet)",
+    "Excel (*.xlsx)",
+])
 
 
 class MainWindow(QWidget):
@@ -90,6 +175,10 @@ class MainWindow(QWidget):
         self._setup_ui()
         self.parser_thread = None
         self.parsed_data = None
+        self.batch = None
+        self.unfinished: List[str] = []
+        # Очередь (SQLite) читается уже после показа окна, а не при его создании
+        QTimer.singleShot(0, self._update_queue_label)
 
     def _setup_ui(self):
         layout = QVBoxLayout()
@@ -112,6 +201,53 @@ class MainWindow(QWidget):
         parse_btn.clicked.connect(self.start_parsing)
         buttons_layout.addWidget(parse_btn)
 
+        self.resume_btn = QPushButton("Продолжить незавершённое")
+        self.resume_btn.setToolTip("Доделать последнюю прерванную партию ссылок из очереди заданий")
+        self.resume_btn.clicked.connect(self.resume_parsing)
+        buttons_layout.addWidget(self.resume_btn)
+
+        buttons_layout.addWidget(QLabel("Потоков:"))
+        self.threads_spin = QSpinBox()
+        self.threads_spin.setRange(1, 16)
+        self.threads_spin.setValue(3)
+        buttons_layout.addWidget(self.threads_spin)
+
+        self.cache_check = QCheckBox("Кэшировать страницы")
+        self.cache_check.setChecked(True)
+        buttons_layout.addWidget(self.cache_check)
+
+        self.replay_check = QCheckBox("Только из кэша")
+        self.replay_check.setToolTip("Повторный разбор сохранённых страниц без запуска браузера")
+        buttons_layout.addWidget(self.replay_check)
+
+        self.only_new_check = QCheckBox("Только новые")
+        self.only_new_check.setToolTip("Пропускать объявления, не изменившиеся с прошлого запуска")
+        buttons_layout.addWidget(self.only_new_check)
+
+        self.autosave_check = QCheckBox("Автосохранение")
+        self.autosave_check.setToolTip("Записывать результаты в файл по ходу обхода")
+        buttons_layout.addWidget(self.autosave_check)
+
+        self.profile_check = QCheckBox("Профиль браузера")
+        self.profile_check.setChecked(True)
+        self.profile_check.setToolTip(
+            "Сохранять cookies и кэш браузера между запусками (меньше проверок и повторных загрузок)"
+        )
+        buttons_layout.addWidget(self.profile_check)
+
+        self.details_check = QCheckBox("Карточки")
+        self.details_check.setToolTip(
+            "Открывать объявления: адрес, параметры, описание и прайс-лист "
+            "(неизменившиеся берутся из прошлых запусков)"
+        )
+        buttons_layout.addWidget(self.details_check)
+
+        self.normalize_check = QCheckBox("Нормализовать")
+        self.normalize_check.setToolTip(
+            "При сохранении добавить числовую цену, дату публикации, город и район"
+        )
+        buttons_layout.addWidget(self.normalize_check)
+
         self.save_btn = QPushButton("Сохранить результаты…")
         self.save_btn.setEnabled(False)
         self.save_btn.clicked.connect(self.save_results)
@@ -125,16 +261,20 @@ class MainWindow(QWidget):
         self.progress_bar.setValue(0)
         layout.addWidget(self.progress_bar)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Название",
-            "Цена",
-            "Локация",
-            "Дата",
-            "URL",
-            "Title",
-        ])
+        self.queue_label = QLabel()
+        layout.addWidget(self.queue_label)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Фильтр по всем колонкам…")
+        layout.addWidget(self.filter_edit)
+
+        self.model = ProductsTableModel(self)
+        self.proxy = make_proxy(self.model, self)
+        self.filter_edit.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSortingEnabled(True)
         self.table.horizontalHeader().setStretchLastSection(True)
         layout.addWidget(self.table)
 
@@ -159,12 +299,68 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "Внимание", "Введите хотя бы одну ссылку.")
             return
         links = [line.strip() for line in raw_text.splitlines() if line.strip()]
+        try:
+            with job_queue.JobQueue() as jobs:
+                batch = jobs.enqueue(links)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось записать очередь заданий: {e}")
+            return
+        self._run_batch(links, batch)
+
+    def resume_parsing(self):
+        with job_queue.JobQueue() as jobs:
+            batches = jobs.unfinished_batches(failed=True)
+            if not batches:
+                QMessageBox.information(self, "Очередь", "Незавершённых заданий нет.")
+                return
+            batch = batches[0]
+            stats = jobs.stats(batch)
+        answer = QMessageBox.question(
+            self,
+            "Очередь",
+            f"Продолжить партию {batch}?\n"
+            f"Готово {stats['done']} из {stats['total']}, осталось {stats['pending'] + stats['in_progress']}, "
+            f"с ошибками {stats['failed']}.",
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            # Как в cli.main: ссылки упавшего процесса и упавшие ссылки — снова в очередь,
+            # иначе исполнитель закончит, не дождавшись конца их аренды
+            with job_queue.JobQueue() as jobs:
+                jobs.reclaim_dead(batch)
+                jobs.retry_failed(batch)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось подготовить очередь заданий: {e}")
+            return
+        self._run_batch([], batch, continuing=True)
+
+    def _run_batch(self, links: List[str], batch: str, continuing: bool = False):
+        sink_path = None
+        if self.autosave_check.isChecked():
+            sink_path = self._ask_save_path("Файл для автосохранения")
+            if not sink_path:
+                return
         self.progress_bar.setValue(0)
         self.save_btn.setEnabled(False)
-        self.table.setRowCount(0)
-
-        self.parser_thread = ParserThread(links)
+        self.model.clear()
+
+        self.parser_thread = ParserThread(
+            links,
+            max_in_flight=self.threads_spin.value(),
+            use_cache=self.cache_check.isChecked(),
+            replay=self.replay_check.isChecked(),
+            only_new=self.only_new_check.isChecked(),
+            sink_path=sink_path,
+            batch=batch,
+            persistent_profile=self.profile_check.isChecked(),
+            details=self.details_check.isChecked(),
+            append=continuing,
+        )
+        self.batch = batch
         self.parser_thread.progress.connect(self.on_progress)
+        self.parser_thread.queue_stats.connect(self._show_queue_stats)
+        self.parser_thread.batch.connect(self.model.append_rows)
         self.parser_thread.finished.connect(self.on_finished)
         self.parser_thread.error.connect(self.on_error)
         self.parser_thread.start()
@@ -172,55 +368,97 @@ class MainWindow(QWidget):
     def on_progress(self, value: int):
         self.progress_bar.setValue(value)
 
+    def _update_queue_label(self):
+        """Полное состояние очереди: при запуске окна и после окончания обхода."""
+        try:
+            with job_queue.JobQueue() as jobs:
+                stats = jobs.stats(self.batch) if self.batch else None
+                unfinished = jobs.unfinished_batches()
+        except Exception as e:
+            self.queue_label.setText(f"Очередь заданий недоступна: {e}")
+            return
+        self.unfinished = unfinished
+        self._show_queue_stats(stats)
+
+    def _show_queue_stats(self, stats: Optional[dict]):
+        """Строка состояния партии; во время обхода её присылает ParserThread.queue_stats."""
+        unfinished = self.unfinished
+        parts = []
+        if stats:
+            parts.append(
+                f"Партия {self.batch}: готово {stats['done']}, в работе {stats['in_progress']}, "
+                f"ожидает {stats['pending']}, ошибок {stats['failed']}"
+            )
+        if unfinished and unfinished != [self.batch]:
+            parts.append(f"незавершённых партий: {len(unfinished)}")
+        self.queue_label.setText("; ".join(parts))
+
     def on_error(self, message: str):
         QMessageBox.critical(self, "Ошибка", message)
         self.progress_bar.setValue(0)
+        self._update_queue_label()
 
     def on_finished(self, data: dict):
         self.parsed_data = data
-        self.populate_table(data.get("products", []))
         self.save_btn.setEnabled(True)
         self.progress_bar.setValue(100)
+        self._update_queue_label()
+        incomplete = ""
+        if data.get("errors"):
+            incomplete = f"Не полностью загружено продавцов: {len(data['errors'])} (см. журнал)\n"
         QMessageBox.information(
             self,
             "Готово",
-            f"Сбор данных завершён. Найдено объявлений: {data.get('total_products', 0)}",
+            f"Сбор данных завершён. Найдено объявлений: {data.get('total_products', 0)}\n"
+            f"{incomplete}\n"
+            f"{self.parser_thread.metrics.summary()}",
         )
 
-    def populate_table(self, products):
-        self.table.setRowCount(len(products))
-        for row_idx, item in enumerate(products):
-            self.table.setItem(row_idx, 0, QTableWidgetItem(item.get("name", "")))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(item.get("price", "")))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(item.get("location", "")))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(item.get("date", "")))
-            self.table.setItem(row_idx, 4, QTableWidgetItem(item.get("url", "")))
-            self.table.setItem(row_idx, 5, QTableWidgetItem(item.get("title", "")))
+    def _ask_save_path(self, caption: str) -> str:
+        default_path = os.path.expanduser("~/avito_products.csv")
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            caption,
+            default_path,
+            SAVE_FILTERS,
+        )
+        if not file_path:
+            return ""
+        # Add the extension of the chosen filter if the user did not type one
+        if not os.path.splitext(file_path)[1] and "(*" in selected_filter:
+            file_path += selected_filter.split("(*", 1)[1].rstrip(")")
+        return file_path
 
     def save_results(self):
         if not self.parsed_data:
             QMessageBox.warning(self, "Внимание", "Нет данных для сохранения.")
             return
-        default_path = os.path.expanduser("~/avito_products.csv")
-        file_path, _ = QFileDialog.getSaveFileName(
-            self,
-            "Сохранить результаты",
-            default_path,
-            "CSV files (*.csv)"
-        )
+        file_path = self._ask_save_path("Сохранить результаты")
         if not file_path:
             return
         try:
-            avito_parser.save_to_csv(self.parsed_data, file_path)
+            avito_parser.save_results(
+                self.parsed_data, file_path, normalized=self.normalize_check.isChecked()
+            )
             QMessageBox.information(self, "Успех", "Файл успешно сохранён.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить файл: {e}")
 
 
+def _window_shown():
+    bootstrap.mark("окно")
+    bootstrap.report()
+    # К первому нажатию «Начать» парсер уже будет импортирован
+    bootstrap.preload(avito_parser, avito_crawler)
+
+
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    bootstrap.mark("импорт Qt")
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    QTimer.singleShot(0, _window_shown)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,199 @@
+import logging
+from typing import Dict, List
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from bs4.filter import ElementFilter
+except ImportError:  # beautifulsoup4 < 4.13
+    ElementFilter = None
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    LexborHTMLParser = None
+    HAS_SELECTOLAX = False
+
+try:
+    from .records import Product
+except ImportError:
+    from records import Product
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.avito.ru"
+ITEM_SELECTOR = '[data-marker="item"], div[class*="iva-item-root"]'
+
+# "html.parser" — эталонный pure-Python разбор всей страницы;
+# "lxml" — BeautifulSoup поверх libxml2, строится только нужная часть дерева;
+# "selectolax" — lexbor без BeautifulSoup, самый быстрый.
+BACKENDS = ("html.parser", "lxml", "selectolax")
+
+# Скомпилированные один раз CSS-селекторы для карточек
+CARD_SELECTOR = soupsieve.compile(ITEM_SELECTOR)
+TITLE_SELECTOR = soupsieve.compile('[data-marker="item-title"]')
+PRICE_META_SELECTOR = soupsieve.compile('meta[itemprop="price"]')
+PRICE_SELECTOR = soupsieve.compile('[data-marker="item-price"]')
+GEO_SELECTOR = soupsieve.compile('div[class*="geo-root"]')
+DATE_SELECTOR = soupsieve.compile('[data-marker="item-date"]')
+
+
+def available_backends() -> List[str]:
+    backends = ["html.parser"]
+    if HAS_LXML:
+        backends.append("lxml")
+    if HAS_SELECTOLAX:
+        backends.append("selectolax")
+    return backends
+
+
+def default_backend() -> str:
+    return available_backends()[-1]
+
+
+def default_soup_backend() -> str:
+    """Самый быстрый бэкенд, который всё ещё возвращает дерево BeautifulSoup."""
+    return "lxml" if HAS_LXML else "html.parser"
+
+
+def resolve_backend(name: str = "auto") -> str:
+    if name == "auto":
+        return default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный HTML-бэкенд: {name}")
+    if name not in available_backends():
+        fallback = default_soup_backend()
+        logger.warning(f"HTML-бэкенд {name} не установлен, используем {fallback}")
+        return fallback
+    return name
+
+
+def _keep_tag(name: str, attrs) -> bool:
+    """Оставляет в дереве только карточки объявлений и шапку продавца."""
+    if not attrs:
+        return False
+    marker = attrs.get("data-marker")
+    if marker == "item" or (marker == "profile/score" and name == "span"):
+        return True
+    if name != "div":
+        return False
+    cls = attrs.get("class") or ""
+    if not isinstance(cls, str):
+        cls = " ".join(cls)
+    return "iva-item-root" in cls or "AvatarNameView-name" in cls
+
+
+if ElementFilter is not None:
+
+    class _ListingFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            return _keep_tag(name, attrs)
+
+        def allow_string_creation(self, string) -> bool:
+            return False
+
+    LISTING_STRAINER = _ListingFilter()
+else:
+    # bs4 4.12 вызывает функцию-имя SoupStrainer с (name, attrs) на этапе разбора
+    LISTING_STRAINER = SoupStrainer(_keep_tag)
+
+
+def make_soup(html: str, backend: str = "html.parser") -> BeautifulSoup:
+    """Строит BeautifulSoup; для "lxml" — только поддеревья карточек и продавца."""
+    if backend == "lxml":
+        return BeautifulSoup(html, "lxml", parse_only=LISTING_STRAINER)
+    return BeautifulSoup(html, "html.parser")
+
+
+# ------------------ selectolax ------------------
+
+
+def _clean_text(text: str) -> str:
+    if not text:
+        return ""
+    return " ".join(text.split()).replace("\xa0", " ")
+
+
+def _node_text(node) -> str:
+    return node.text(deep=True, separator="", strip=True) if node is not None else ""
+
+
+def parse_listing_selectolax(html: str) -> Dict:
+    """Разбор страницы продавца через lexbor; результат совпадает с _parse_listing_page."""
+    tree = LexborHTMLParser(html)
+    products = []
+    # lexbor возвращает узел по разу на каждую часть селектора через запятую
+    cards, seen = [], set()
+    for card in tree.css(ITEM_SELECTOR):
+        if card.mem_id not in seen:
+            seen.add(card.mem_id)
+            cards.append(card)
+    for idx, card in enumerate(cards, start=1):
+        title_a = card.css_first('[data-marker="item-title"]')
+        if title_a is None:
+            continue
+        attrs = title_a.attributes
+        price = ""
+        meta = card.css_first('meta[itemprop="price"]')
+        if meta is not None and meta.attributes.get("content"):
+            price = meta.attributes["content"].strip()
+        else:
+            price_p = card.css_first('[data-marker="item-price"]')
+            if price_p is not None:
+                price = _clean_text(_node_text(price_p))
+        geo = card.css_first('div[class*="geo-root"]')
+        date_p = card.css_first('[data-marker="item-date"]')
+        products.append(Product(
+            index=idx,
+            name=_node_text(title_a),
+            url=urljoin(BASE_URL, attrs.get("href") or ""),
+            title=attrs.get("title") or "",
+            price=price,
+            location=_clean_text(_node_text(geo)),
+            date=_clean_text(_node_text(date_p)),
+        ))
+
+    return {"products": products, "seller_info": _seller_info_selectolax(tree)}
+
+
+def _seller_info_selectolax(tree) -> Dict:
+    seller_info = {}
+    name_wrap = tree.css_first('div[class*="AvatarNameView-name"]')
+    if name_wrap is not None:
+        h = name_wrap.css_first("h1, h2")
+        if h is not None:
+            seller_info["name"] = _node_text(h)
+    rating_span = tree.css_first('span[data-marker="profile/score"]')
+    if rating_span is not None:
+        seller_info["rating"] = _node_text(rating_span)
+    return seller_info
+
+
+def seller_info_from_soup(soup) -> Dict:
+    seller_info = {}
+    name_wrap = soup.find("div", class_=lambda x: x and "AvatarNameView-name" in x)
+    if name_wrap:
+        h = name_wrap.find(["h1", "h2"])
+        if h:
+            seller_info["name"] = h.get_text(strip=True)
+    rating_span = soup.find("span", {"data-marker": "profile/score"})
+    if rating_span:
+        seller_info["rating"] = rating_span.get_text(strip=True)
+    return seller_info
+
+
+def parse_seller_info(html: str, backend: str = "auto") -> Dict:
+    """Только шапка продавца (имя и рейтинг), без разбора карточек."""
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        return _seller_info_selectolax(LexborHTMLParser(html))
+    return seller_info_from_soup(make_soup(html, backend))
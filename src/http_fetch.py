@@ -0,0 +1,95 @@
+import logging
+import re
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .browser_pool import CONTEXT_OPTIONS, USER_AGENT
+    from .throttle import Blocked, detect_block, parse_retry_after
+except ImportError:
+    from browser_pool import CONTEXT_OPTIONS, USER_AGENT
+    from throttle import Blocked, detect_block, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Те же заголовки и локаль, что и у контекста Playwright
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": f"{CONTEXT_OPTIONS['locale']},ru;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+# Признаки того, что серверный HTML уже содержит объявления: карточки
+# или встроенное состояние страницы, из которого их можно достать
+CARD_MARKER_RE = re.compile(r'data-marker="item"|class="[^"]*iva-item-root')
+STATE_MARKER_RE = re.compile(r"window\.__initialData__|window\.__preloadedState__|data-mfe-state=")
+
+
+def has_listing(html: str) -> bool:
+    """True, если в ответе есть карточки объявлений или встроенное состояние."""
+    return bool(html) and bool(CARD_MARKER_RE.search(html) or STATE_MARKER_RE.search(html))
+
+
+class HttpFetcher:
+    """Быстрый путь без браузера: keep-alive сессия requests с пулом соединений.
+
+    ``get`` возвращает HTML только если в нём уже есть объявления
+    (см. has_listing); иначе None — страницу нужно открывать в Playwright.
+    На капчу, страницу блокировки и 429 поднимается throttle.Blocked.
+    Объект можно использовать из нескольких потоков.
+    """
+
+    def __init__(self, timeout: float = 15.0, pool_size: int = 10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "errors": 0, "blocked": 0, "bytes": 0}
+
+    def __enter__(self) -> "HttpFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, key: str, nbytes: int = 0):
+        with self._lock:
+            self._stats[key] += 1
+            self._stats["bytes"] += nbytes
+
+    def get(self, url: str) -> Optional[str]:
+        try:
+            resp = self.session.get(url, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            logger.warning(f"HTTP-запрос не удался, открываем в браузере: {e}")
+            self._count("errors")
+            return None
+
+        if "charset" not in resp.headers.get("Content-Type", "").lower():
+            resp.encoding = "utf-8"
+        nbytes = len(resp.content)
+        # Капча или блокировка: браузер получит то же самое, так что не открываем его
+        reason = detect_block(resp.text, resp.status_code)
+        if reason is not None and not has_listing(resp.text):
+            self._count("blocked", nbytes)
+            raise Blocked(reason, url, parse_retry_after(resp.headers.get("Retry-After")))
+        if resp.status_code != 200 or not has_listing(resp.text):
+            self._count("misses", nbytes)
+            return None
+        self._count("hits", nbytes)
+        return resp.text
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,491 @@
+import argparse
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = Path.home() / ".avito_parser" / "jobs.sqlite"
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+STATES = (PENDING, IN_PROGRESS, DONE, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    link TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    last_error TEXT,
+    products INTEGER,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (batch, link)
+);
+CREATE INDEX IF NOT EXISTS jobs_batch_state ON jobs (batch, state);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    batch: str
+    link: str
+    attempts: int
+
+
+def default_owner() -> str:
+    """Имя исполнителя: хост, PID и случайный суффикс."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """Постоянная очередь ссылок продавцов в SQLite.
+
+    У каждой ссылки есть состояние (pending / in_progress / done / failed) и число
+    попыток. Исполнитель берёт ссылки в аренду (``lease``) на ``lease_seconds``;
+    если он упал и не продлил аренду, ссылки снова выдаются другим. После
+    ``max_attempts`` неудач ссылка остаётся в failed. Выдача идёт в транзакции
+    BEGIN IMMEDIATE, так что из одного файла могут брать работу несколько процессов,
+    а при общем сетевом диске — и несколько машин (для этого журнал по умолчанию
+    обычный, а не WAL: WAL требует общей памяти на одном хосте).
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_QUEUE_PATH,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+        wal: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        if wal:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def enqueue(self, links: Iterable[str], batch: Optional[str] = None) -> str:
+        """Добавляет ссылки в партию (повторы внутри партии пропускаются) и возвращает её имя."""
+        batch = batch or time.strftime("batch-%Y%m%d-%H%M%S")
+        now = time.time()
+        rows = [(batch, link.strip(), now, now) for link in links if link.strip()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (batch, link, created, updated) VALUES (?, ?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return batch
+
+    def lease(self, owner: str, limit: int = 1, batch: Optional[str] = None) -> List[Job]:
+        """Берёт до ``limit`` ссылок: ожидающие и с истёкшей арендой.
+
+        Ссылки, у которых попытки кончились, а аренда истекла (исполнитель упал на
+        последней попытке), переводятся в failed — иначе они навсегда остались бы
+        in_progress; retry_failed вернёт их в очередь.
+        """
+        now = time.time()
+        batch_sql = "AND batch = ?" if batch else ""
+        params = (now, self.max_attempts) + ((batch,) if batch else ()) + (limit,)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"""
+                    UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_until = NULL,
+                                    last_error = COALESCE(last_error, 'исполнитель пропал на последней попытке'),
+                                    updated = ?
+                    WHERE (state = 'pending' OR (state = 'in_progress' AND lease_until < ?))
+                      AND attempts >= ? {batch_sql}
+                    """,
+                    (now,) + params[:-1],
+                )
+                rows = self._conn.execute(
+                    f"""
+                    SELECT id, batch, link, attempts FROM jobs
+                    WHERE (state = 'pending' OR (state = 'in_progress' AND lease_until < ?))
+                      AND attempts < ? {batch_sql}
+                    ORDER BY id LIMIT ?
+                    """,
+                    params,
+                ).fetchall()
+                self._conn.executemany(
+                    """
+                    UPDATE jobs SET state = 'in_progress', lease_owner = ?, lease_until = ?,
+                                    attempts = attempts + 1, updated = ?
+                    WHERE id = ?
+                    """,
+                    [(owner, now + self.lease_seconds, now, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [Job(id, batch_, link, attempts + 1) for id, batch_, link, attempts in rows]
+
+    def renew(self, owner: str):
+        """Продлевает аренду всех ссылок исполнителя."""
+        now = time.time()
+        self._write(
+            "UPDATE jobs SET lease_until = ?, updated = ? WHERE lease_owner = ? AND state = 'in_progress'",
+            (now + self.lease_seconds, now, owner),
+        )
+
+    def complete(self, job: Job, owner: str, products: int = 0):
+        self._write(
+            """
+            UPDATE jobs SET state = 'done', products = ?, lease_owner = NULL, lease_until = NULL,
+                            last_error = NULL, updated = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (products, time.time(), job.id, owner),
+        )
+
+    def fail(self, job: Job, owner: str, error: str):
+        """Неудача: ссылка вернётся в очередь, пока не исчерпаны попытки."""
+        state = FAILED if job.attempts >= self.max_attempts else PENDING
+        self._write(
+            """
+            UPDATE jobs SET state = ?, last_error = ?, lease_owner = NULL, lease_until = NULL, updated = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (state, error[:1000], time.time(), job.id, owner),
+        )
+
+    def release(self, job: Job, owner: str):
+        """Возвращает ссылку в очередь, не засчитывая попытку."""
+        self._write(
+            """
+            UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL,
+                            lease_until = NULL, updated = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (time.time(), job.id, owner),
+        )
+
+    def reclaim_dead(self, batch: Optional[str] = None) -> int:
+        """Сразу возвращает в очередь ссылки, взятые упавшими процессами этой машины,
+        не дожидаясь конца аренды (владелец — ``host:pid:...``, см. default_owner).
+        Ссылки, упавшие на последней попытке, уходят в failed."""
+        try:
+            from .profiles import pid_alive
+        except ImportError:
+            from profiles import pid_alive
+
+        host = socket.gethostname()
+        batch_sql = "AND batch = ?" if batch else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT lease_owner FROM jobs WHERE state = 'in_progress' {batch_sql}",
+                (batch,) if batch else (),
+            ).fetchall()
+        reclaimed = 0
+        for (owner,) in rows:
+            parts = (owner or "").split(":")
+            if len(parts) < 2 or parts[0] != host or not parts[1].isdigit():
+                continue
+            if pid_alive(int(parts[1])) is not False:
+                continue
+            cur = self._write(
+                """
+                UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                lease_owner = NULL, lease_until = NULL, updated = ?
+                WHERE lease_owner = ? AND state = 'in_progress'
+                """,
+                (self.max_attempts, time.time(), owner),
+            )
+            reclaimed += cur.rowcount
+        return reclaimed
+
+    def retry_failed(self, batch: Optional[str] = None) -> int:
+        """Возвращает failed-ссылки в очередь со сброшенным числом попыток."""
+        batch_sql = "AND batch = ?" if batch else ""
+        cur = self._write(
+            f"UPDATE jobs SET state = 'pending', attempts = 0, updated = ? WHERE state = 'failed' {batch_sql}",
+            (time.time(),) + ((batch,) if batch else ()),
+        )
+        return cur.rowcount
+
+    def stats(self, batch: Optional[str] = None) -> Dict[str, int]:
+        """Число ссылок по состояниям (и ``total``)."""
+        batch_sql = "WHERE batch = ?" if batch else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT state, COUNT(*) FROM jobs {batch_sql} GROUP BY state",
+                (batch,) if batch else (),
+            ).fetchall()
+        stats = {state: 0 for state in STATES}
+        stats.update(dict(rows))
+        stats["total"] = sum(stats[state] for state in STATES)
+        return stats
+
+    def failures(self, batch: Optional[str] = None) -> Dict[str, str]:
+        """Последняя ошибка каждой ссылки в failed: ``{ссылка: ошибка}``."""
+        batch_sql = "AND batch = ?" if batch else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT link, last_error FROM jobs WHERE state = 'failed' {batch_sql} ORDER BY id",
+                (batch,) if batch else (),
+            ).fetchall()
+        return {link: error or "" for link, error in rows}
+
+    def unfinished_batches(self, prefix: Optional[str] = None, failed: bool = False) -> List[str]:
+        """Партии, где остались необработанные ссылки, от новых к старым.
+
+        С ``prefix`` — только партия с этим именем и партии ``<prefix>-...``;
+        с ``failed=True`` незаконченной считается и партия, где остались лишь
+        упавшие ссылки (их можно вернуть через retry_failed).
+        """
+        states = "'pending', 'in_progress', 'failed'" if failed else "'pending', 'in_progress'"
+        prefix_sql = "AND (batch = ? OR batch LIKE ?)" if prefix else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT batch FROM jobs WHERE state IN ({states}) {prefix_sql}
+                GROUP BY batch ORDER BY MAX(created) DESC
+                """,
+                (prefix, prefix + "-%") if prefix else (),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class _LeaseKeeper(threading.Thread):
+    """Фоновое продление аренды, пока исполнитель работает."""
+
+    def __init__(self, jobs: JobQueue, owner: str):
+        super().__init__(name="lease-keeper", daemon=True)
+        self.jobs = jobs
+        self.owner = owner
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.jobs.lease_seconds / 3):
+            try:
+                self.jobs.renew(self.owner)
+            except sqlite3.Error as e:
+                logger.warning(f"Не удалось продлить аренду: {e}")
+
+
+def run_worker(
+    jobs: JobQueue,
+    batch: Optional[str] = None,
+    owner: Optional[str] = None,
+    chunk: Optional[int] = None,
+    on_seller: Optional[Callable[[int, int, str, Dict], None]] = None,
+    crawl: Optional[Callable[..., Dict]] = None,
+    **crawl_options,
+) -> Dict:
+    """Обрабатывает ссылки из очереди, пока они не закончатся.
+
+    Ссылки берутся порциями по ``chunk`` (по умолчанию 10 * ``max_in_flight``) и идут в
+    crawler.crawl_sellers с ``crawl_options``; каждая ссылка отмечается done сразу
+    после своего продавца. ``on_seller(done, total, link, data)`` получает прогресс
+    по всей партии. ``crawl`` — функция обхода порции с интерфейсом crawl_sellers
+    (например, pipeline.run_pipeline); по умолчанию crawler.crawl_sellers. Если
+    она упала, недоделанные ссылки порции проходятся по одной, чтобы попытка
+    засчиталась только той, на которой она падает. Перед повтором упавшей
+    ссылки исполнитель ждёт throttle.backoff_delay по номеру её попытки.
+    Результат в формате crawl_sellers; в ``errors`` — ссылки партии, оставшиеся
+    в failed, с ошибками их последней попытки.
+    """
+    try:
+        from . import crawler as avito_crawler
+        from .dedup import DedupIndex
+        from .throttle import AdaptiveLimiter, backoff_delay
+    except ImportError:
+        import crawler as avito_crawler
+        from dedup import DedupIndex
+        from throttle import AdaptiveLimiter, backoff_delay
+
+    crawl = crawl or avito_crawler.crawl_sellers
+    owner = owner or default_owner()
+    # Порция побольше: браузеры запускаются заново на каждый вызов crawl_sellers
+    chunk = chunk or 10 * crawl_options.get("max_in_flight", crawl_options.get("fetchers", 3))
+    keeper = _LeaseKeeper(jobs, owner)
+    keeper.start()
+    single = 0
+    # Один индекс на весь запуск: повторы между порциями и при повторе упавших
+    # продавцов не попадают в sink второй раз
+    dedup = crawl_options.setdefault("dedup", DedupIndex(keep_products=crawl_options.get("collect", True)))
+    # Один limiter на все порции: скорость и пауза после блокировок не сбрасываются
+    crawl_options.setdefault(
+        "limiter",
+        AdaptiveLimiter(
+            per_host=crawl_options.pop("per_host", 2),
+            min_interval=crawl_options.pop("min_interval", 1.0),
+        ),
+    )
+    seller_info: Dict = {}
+    errors: Dict[str, List[str]] = {}
+    fetched_at = time.time()
+    # Номер попытки последней упавшей ссылки: пауза перед следующей порцией
+    retry_attempt = 0
+    try:
+        while True:
+            if retry_attempt:
+                delay = backoff_delay(retry_attempt - 1)
+                logger.info(f"Повтор упавших ссылок через {delay:.1f} с")
+                time.sleep(delay)
+                retry_attempt = 0
+            leased = jobs.lease(owner, limit=1 if single else chunk, batch=batch)
+            if not leased:
+                break
+            by_link = {job.link: job for job in leased}
+            finished = set()
+
+            def failed(job: Job, messages: List[str]):
+                nonlocal retry_attempt
+                jobs.fail(job, owner, "; ".join(messages))
+                errors[job.link] = messages
+                if job.attempts < jobs.max_attempts:
+                    retry_attempt = max(retry_attempt, job.attempts)
+
+            def seller_done(done: int, total: int, link: str, data: Dict):
+                job = by_link[link]
+                if data.get("errors"):
+                    # Продавец загружен не полностью — пусть его перезапустят
+                    failed(job, list(data["errors"]))
+                else:
+                    jobs.complete(job, owner, data.get("total_products", 0))
+                finished.add(job.id)
+                if on_seller:
+                    stats = jobs.stats(batch)
+                    on_seller(stats[DONE] + stats[FAILED], stats["total"], link, data)
+
+            try:
+                result = crawl(list(by_link), on_seller=seller_done, **crawl_options)
+            except Exception as e:
+                unfinished = [job for job in leased if job.id not in finished]
+                logger.warning(f"Ошибка обработки партии: {e}")
+                if len(unfinished) == 1:
+                    failed(unfinished[0], [str(e)])
+                else:
+                    # Виновника не видно: возвращаем ссылки без штрафа и проходим их по одной
+                    for job in unfinished:
+                        jobs.release(job, owner)
+                    single = len(unfinished)
+                continue
+            single = max(single - 1, 0)
+            if not seller_info and result.get("seller_info"):
+                seller_info = result["seller_info"]
+    finally:
+        keeper.stopped.set()
+
+    # Только ссылки, чьи попытки кончились (в этом или прошлых запусках): остальные
+    # упавшие были собраны повтором
+    errors = {link: errors.get(link, [error]) for link, error in jobs.failures(batch).items()}
+    return {
+        "total_products": len(dedup),
+        "products": dedup.products(),
+        "seller_info": seller_info,
+        "fetched_at": fetched_at,
+        "errors": errors,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Очередь ссылок продавцов Avito")
+    ap.add_argument("--db", default=str(DEFAULT_QUEUE_PATH), help="файл очереди SQLite")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("enqueue", help="добавить ссылки из файла или stdin")
+    add.add_argument("file", nargs="?", help="файл со ссылками (по умолчанию stdin)")
+    add.add_argument("--batch")
+
+    status = sub.add_parser("status", help="состояние очереди")
+    status.add_argument("--batch")
+
+    retry = sub.add_parser("retry", help="вернуть failed-ссылки в очередь")
+    retry.add_argument("--batch")
+
+    work = sub.add_parser("work", help="обрабатывать ссылки из очереди")
+    work.add_argument("--batch")
+    work.add_argument("--threads", type=int, default=3)
+    work.add_argument("--output", help="файл результатов (.csv/.jsonl/.parquet/.xlsx), дописывается по ходу")
+    work.add_argument("--headed", action="store_true", help="показывать окно браузера")
+    work.add_argument(
+        "--persistent-profile", action="store_true", help="постоянный профиль браузера (cookies и кэш между запусками)"
+    )
+
+    args = ap.parse_args(argv)
+    with JobQueue(args.db) as jobs:
+        if args.command == "enqueue":
+            source = open(args.file, encoding="utf-8") if args.file else sys.stdin
+            with source:
+                batch = jobs.enqueue(source, args.batch)
+            print(f"{batch}: {jobs.stats(batch)}")
+        elif args.command == "status":
+            batches = [args.batch] if args.batch else jobs.unfinished_batches()
+            print(f"всего: {jobs.stats()}")
+            for batch in batches:
+                print(f"{batch}: {jobs.stats(batch)}")
+        elif args.command == "retry":
+            print(f"возвращено в очередь: {jobs.retry_failed(args.batch)}")
+        elif args.command == "work":
+            try:
+                from .profiles import ProfileStore
+                from .sinks import open_sink
+            except ImportError:
+                from profiles import ProfileStore
+                from sinks import open_sink
+            sink = open_sink(args.output) if args.output else None
+            try:
+                result = run_worker(
+                    jobs,
+                    batch=args.batch,
+                    max_in_flight=args.threads,
+                    headless=not args.headed,
+                    sink=sink,
+                    collect=False,
+                    profiles=ProfileStore() if args.persistent_profile else None,
+                    on_seller=lambda done, total, link, data: print(
+                        f"[{done}/{total}] {link}: {data.get('total_products', 0)}"
+                    ),
+                )
+            finally:
+                if sink is not None:
+                    sink.close()
+            print(f"Готово, объявлений: {result['total_products']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PATH = Path.home() / ".avito_parser" / "metrics.jsonl"
+# Больше этого файл метрик переименовывается в ``<имя>.1`` (прошлый .1 удаляется)
+MAX_METRICS_BYTES = 50 * 1024 * 1024
+
+# Этапы в порядке, в котором они идут при загрузке страницы
+STAGES = ("http", "browser", "goto", "scroll", "content", "parse", "save")
+COUNTERS = ("bytes", "items", "scrolls", "retries")
+# Счётчики фильтра запросов (request_filter.RequestBlocker) за весь запуск
+REQUEST_COUNTERS = ("allowed", "blocked", "estimated_bytes_saved")
+
+# Сумма transferSize документа и всех подресурсов страницы
+TRANSFER_JS = """
+() => performance.getEntries()
+  .filter((e) => e.entryType === 'navigation' || e.entryType === 'resource')
+  .reduce((sum, e) => sum + (e.transferSize || 0), 0)
+"""
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах (пиковый, если psutil не установлен)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+    except ImportError:  # Windows без psutil
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def transferred_bytes(page) -> int:
+    """Сколько байт страница получила по сети (по Resource Timing API)."""
+    return int(page.evaluate(TRANSFER_JS) or 0)
+
+
+def _new_record(url: str) -> Dict:
+    record = {"url": url, "stages": {}}
+    record.update({name: 0 for name in COUNTERS})
+    record["peak_rss"] = 0
+    return record
+
+
+class Metrics:
+    """Время по этапам и счётчики ресурсов для каждого URL.
+
+    ``stage(url, name)`` замеряет этап (повторные замеры суммируются), ``add``
+    увеличивает счётчики (bytes, items, scrolls, retries). После каждого этапа
+    снимается RSS процесса, в записи хранится максимум. ``add_requests``
+    суммирует отменённые фильтром запросы по всем пулам браузеров. Объект можно
+    использовать из нескольких потоков.
+
+    Память не растёт с числом страниц: суммы (totals) считаются на лету, а в
+    памяти остаются только ``window`` последних URL. Более старые записи
+    дописываются в ``path`` (JSONL, по строке на URL) или, без ``path``,
+    отбрасываются; close() дописывает оставшиеся. Если файл к началу записи
+    больше ``max_bytes``, он сначала уходит в ``<path>.1``.
+    """
+
+    def __init__(self, path=None, window: int = 256, max_bytes: int = MAX_METRICS_BYTES):
+        self.path = path
+        self.window = max(1, window)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._records: "OrderedDict[str, Dict]" = OrderedDict()
+        self._file = None
+        self._totals = _new_record("")
+        del self._totals["url"]
+        self._totals["urls"] = 0
+        self._requests: Dict = {name: 0 for name in REQUEST_COUNTERS}
+        self._requests["blocked_by_type"] = {}
+
+    def _record(self, url: str) -> Dict:
+        record = self._records.get(url)
+        if record is None:
+            record = self._records[url] = _new_record(url)
+            while len(self._records) > self.window:
+                self._write(self._records.popitem(last=False)[1])
+        else:
+            self._records.move_to_end(url)
+        return record
+
+    def _write(self, record: Dict):
+        if self.path is None:
+            return
+        record["ts"] = time.time()
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(str(self.path)) or ".", exist_ok=True)
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            self._file.write("\n")
+        except OSError as e:
+            # Метрики не должны обрывать обход: дальше считаются только суммы
+            logger.warning(f"Не удалось записать метрики в {self.path}: {e}")
+            self.path = None
+
+    @contextmanager
+    def stage(self, url: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            rss = current_rss()
+            with self._lock:
+                record = self._record(url)
+                # Запись с одним этапом "save" — это файл результатов, а не страница
+                if name != "save" and not set(record["stages"]) - {"save"}:
+                    self._totals["urls"] += 1
+                record["stages"][name] = record["stages"].get(name, 0.0) + elapsed
+                record["peak_rss"] = max(record["peak_rss"], rss)
+                stages = self._totals["stages"]
+                stages[name] = stages.get(name, 0.0) + elapsed
+                self._totals["peak_rss"] = max(self._totals["peak_rss"], rss)
+
+    def add(self, url: str, **counters: int):
+        with self._lock:
+            record = self._record(url)
+            for name, value in counters.items():
+                record[name] = record.get(name, 0) + value
+                self._totals[name] = self._totals.get(name, 0) + value
+
+    def add_requests(self, stats: Dict):
+        """Добавляет RequestBlocker.stats() закрытого пула браузеров."""
+        with self._lock:
+            for name in REQUEST_COUNTERS:
+                self._requests[name] += stats.get(name, 0)
+            by_type = self._requests["blocked_by_type"]
+            for resource_type, count in stats.get("blocked_by_type", {}).items():
+                by_type[resource_type] = by_type.get(resource_type, 0) + count
+
+    def requests(self) -> Dict:
+        """Отменённые и пропущенные запросы за запуск (как у RequestBlocker.stats)."""
+        with self._lock:
+            return copy.deepcopy(self._requests)
+
+    def records(self) -> List[Dict]:
+        """Записи последних ``window`` URL (ещё не дописанные в ``path``)."""
+        with self._lock:
+            return copy.deepcopy(list(self._records.values()))
+
+    def totals(self) -> Dict:
+        """Суммы по всем URL: ``{"urls", "stages": {этап: сек}, счётчики..., "peak_rss", "requests"}``."""
+        with self._lock:
+            totals = copy.deepcopy(self._totals)
+        totals["requests"] = self.requests()
+        return totals
+
+    def close(self):
+        """Дописывает оставшиеся записи в ``path`` и закрывает файл."""
+        with self._lock:
+            while self._records:
+                self._write(self._records.popitem(last=False)[1])
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def prometheus(self) -> str:
+        """Сводные метрики в текстовом формате Prometheus."""
+        totals = self.totals()
+        lines = [
+            "# TYPE avito_stage_seconds_total counter",
+            *(
+                f'avito_stage_seconds_total{{stage="{name}"}} {seconds:.6f}'
+                for name, seconds in sorted(totals["stages"].items())
+            ),
+            "# TYPE avito_urls_total counter",
+            f"avito_urls_total {totals['urls']}",
+        ]
+        for name in COUNTERS:
+            lines.append(f"# TYPE avito_{name}_total counter")
+            lines.append(f"avito_{name}_total {totals[name]}")
+        requests = totals["requests"]
+        lines.append("# TYPE avito_requests_blocked_total counter")
+        lines.extend(
+            f'avito_requests_blocked_total{{type="{name}"}} {count}'
+            for name, count in sorted(requests["blocked_by_type"].items())
+        )
+        lines.append("# TYPE avito_requests_allowed_total counter")
+        lines.append(f"avito_requests_allowed_total {requests['allowed']}")
+        lines.append("# TYPE avito_bytes_saved_estimated_total counter")
+        lines.append(f"avito_bytes_saved_estimated_total {requests['estimated_bytes_saved']}")
+        lines.append("# TYPE avito_peak_rss_bytes gauge")
+        lines.append(f"avito_peak_rss_bytes {totals['peak_rss']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Файл для textfile-коллектора node_exporter (перезаписывается целиком)."""
+        os.makedirs(os.path.dirname(str(path)) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        """Короткая сводка для человека (показывается в GUI после обхода)."""
+        totals = self.totals()
+        if not totals["urls"]:
+            return "Нет данных о загрузке страниц."
+        lines = [f"Страниц: {totals['urls']}, объявлений: {totals['items']}"]
+        stages = totals["stages"]
+        order = [name for name in STAGES if name in stages] + sorted(set(stages) - set(STAGES))
+        for name in order:
+            lines.append(f"  {name}: {stages[name]:.2f} с")
+        lines.append(f"Получено: {totals['bytes'] / 1024 ** 2:.1f} МБ, прокруток: {totals['scrolls']}, повторов: {totals['retries']}")
+        requests = totals["requests"]
+        if requests["blocked"]:
+            lines.append(
+                f"Отменено запросов: {requests['blocked']} из {requests['blocked'] + requests['allowed']}, "
+                f"сэкономлено ~{requests['estimated_bytes_saved'] / 1024 ** 2:.1f} МБ"
+            )
+        if totals["peak_rss"]:
+            lines.append(f"Пик памяти: {totals['peak_rss'] / 1024 ** 2:.0f} МБ")
+        return "\n".join(lines)
+
+
+def timed(metrics: Optional[Metrics], url: str, name: str):
+    """``metrics.stage(url, name)`` или пустой контекст, если метрики не собираются."""
+    return metrics.stage(url, name) if metrics is not None else nullcontext()
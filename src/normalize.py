@@ -0,0 +1,200 @@
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .records import DETAIL_FIELDS, FIELDS
+except ImportError:
+    from records import DETAIL_FIELDS, FIELDS
+
+# Родительный падеж месяцев в датах вида "12 марта 14:20"
+MONTHS = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+
+# Основа слова единицы времени -> длительность одной единицы
+UNITS = {
+    "секунд": pd.Timedelta(seconds=1),
+    "минут": pd.Timedelta(minutes=1),
+    "час": pd.Timedelta(hours=1),
+    "дн": pd.Timedelta(days=1),
+    "день": pd.Timedelta(days=1),
+    "недел": pd.Timedelta(weeks=1),
+    "месяц": pd.Timedelta(days=30),
+    "год": pd.Timedelta(days=365),
+    "лет": pd.Timedelta(days=365),
+}
+
+RELATIVE_RE = r"(?:(\d+)\s+)?(" + "|".join(UNITS) + r")\w*\s+назад"
+DAY_RE = r"(сегодня|вчера)(?:\s+в\s+(\d{1,2}):(\d{2}))?"
+ABSOLUTE_RE = r"(\d{1,2})\s+(" + "|".join(MONTHS) + r")(?:\s+(\d{4}))?(?:\s+(?:в\s+)?(\d{1,2}):(\d{2}))?"
+NUMERIC_RE = r"(\d{1,2})\.(\d{1,2})\.(\d{4})(?:\s+(\d{1,2}):(\d{2}))?"
+
+COLUMNS = list(FIELDS) + ["seller_name", "seller_rating"]
+
+
+def _on_uniques(values: pd.Series, fn):
+    """Применяет ``fn`` к уникальным значениям и раскладывает результат обратно.
+
+    Цены, даты и адреса у объявлений сильно повторяются, так что разбирается
+    несколько сотен строк вместо сотен тысяч.
+    """
+    codes, uniques = pd.factorize(values.fillna("").astype(str))
+    out = fn(pd.Series(uniques, dtype=object)).take(codes)
+    out.index = values.index
+    return out
+
+
+def to_frame(
+    products: Iterable[Dict], seller_info: Optional[Dict] = None, details: bool = False
+) -> pd.DataFrame:
+    """DataFrame из списка объявлений (Product или словари) с колонками продавца
+    и, с ``details=True``, полями карточки."""
+    rows = []
+    for product in products:
+        seller = product.get("seller") or seller_info or {}
+        row = [product.get(name, "") for name in FIELDS]
+        row += [seller.get("name", ""), seller.get("rating", "")]
+        if details:
+            card = product.get("details") or {}
+            row += [card.get(name, "") for name in DETAIL_FIELDS]
+        rows.append(row)
+    return pd.DataFrame(rows, columns=COLUMNS + list(DETAIL_FIELDS) if details else COLUMNS)
+
+
+def parse_prices(price: pd.Series, price_value: Optional[pd.Series] = None) -> pd.Series:
+    """"12 500 ₽", "от 1 000 ₽", "1500" -> 12500, 1000, 1500; "Бесплатно" -> 0."""
+    def parse(text: pd.Series) -> pd.Series:
+        text = text.str.replace(r"[\s\xa0]", "", regex=True)
+        values = pd.to_numeric(text.str.extract(r"(\d+)", expand=False), errors="coerce")
+        return values.mask(text.str.lower().str.startswith("бесплатно"), 0)
+
+    values = _on_uniques(price, parse)
+    if price_value is not None:
+        known = pd.to_numeric(price_value.replace("", np.nan), errors="coerce")
+        values = known.fillna(values)
+    return values.astype("Int64")
+
+
+def _clock(hours: pd.Series, minutes: pd.Series) -> pd.Series:
+    return pd.to_timedelta(hours.astype(float), unit="h") + pd.to_timedelta(minutes.astype(float), unit="m")
+
+
+def parse_dates(date: pd.Series, fetched_at: Optional[float] = None) -> pd.Series:
+    """Относительные даты Avito в метки времени относительно момента загрузки.
+
+    Понимает "N минут/часов/дней/недель/месяцев назад", "сегодня/вчера [в ЧЧ:ММ]",
+    "12 марта [2024] [14:20]" и "дд.мм.гггг [ЧЧ:ММ]". Нераспознанное -> NaT.
+    """
+    now = pd.Timestamp(fetched_at if fetched_at is not None else time.time(), unit="s", tz="UTC")
+    now = now.tz_convert("Europe/Moscow").tz_localize(None)
+    return _on_uniques(date, lambda values: _parse_date_values(values, now))
+
+
+def _parse_date_values(values: pd.Series, now: pd.Timestamp) -> pd.Series:
+    today = now.normalize()
+    text = values.str.lower().str.replace("\xa0", " ").str.strip()
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+
+    rel = text.str.extract(RELATIVE_RE)
+    hit = rel[1].notna()
+    if hit.any():
+        count = pd.to_numeric(rel[0][hit], errors="coerce").fillna(1)
+        unit = rel[1][hit].map(UNITS)
+        result[hit] = now - unit * count
+
+    day = text.str.extract(DAY_RE)
+    hit = day[0].notna() & result.isna()
+    if hit.any():
+        base = today - pd.to_timedelta((day[0][hit] == "вчера").astype(int), unit="D")
+        result[hit] = base + _clock(day[1][hit].fillna(0), day[2][hit].fillna(0))
+
+    absolute = text.str.extract(ABSOLUTE_RE)
+    hit = absolute[0].notna() & result.isna()
+    if hit.any():
+        parts = pd.DataFrame({
+            "year": pd.to_numeric(absolute[2][hit], errors="coerce").fillna(now.year),
+            "month": absolute[1][hit].map(MONTHS),
+            "day": pd.to_numeric(absolute[0][hit]),
+        })
+        stamps = pd.to_datetime(parts, errors="coerce") + _clock(absolute[3][hit].fillna(0), absolute[4][hit].fillna(0))
+        # "28 декабря" в январе — это прошлый год
+        future = absolute[2][hit].isna() & (stamps > now)
+        stamps[future] = stamps[future] - pd.DateOffset(years=1)
+        result[hit] = stamps
+
+    numeric = text.str.extract(NUMERIC_RE)
+    hit = numeric[0].notna() & result.isna()
+    if hit.any():
+        parts = pd.DataFrame({
+            "year": pd.to_numeric(numeric[2][hit]),
+            "month": pd.to_numeric(numeric[1][hit]),
+            "day": pd.to_numeric(numeric[0][hit]),
+        })
+        result[hit] = pd.to_datetime(parts, errors="coerce") + _clock(numeric[3][hit].fillna(0), numeric[4][hit].fillna(0))
+
+    return result
+
+
+def split_locations(location: pd.Series) -> pd.DataFrame:
+    """"Москва, р-н Тверской" -> city="Москва", district="р-н Тверской"."""
+    def split(values: pd.Series) -> pd.DataFrame:
+        parts = values.str.split(r"\s*,\s*", n=1, expand=True, regex=True)
+        if parts.shape[1] == 1:
+            parts[1] = None
+        return pd.DataFrame({
+            "city": parts[0].str.strip().replace("", np.nan),
+            "district": parts[1].str.strip().replace("", np.nan),
+        })
+
+    parts = _on_uniques(location, split)
+    return parts.astype("category")
+
+
+def normalize(frame: pd.DataFrame, fetched_at: Optional[float] = None) -> pd.DataFrame:
+    """Добавляет типизированные колонки price_value (Int64), posted_at (datetime),
+    city и district (category). Исходные текстовые колонки сохраняются."""
+    frame = frame.copy()
+    frame["index"] = pd.to_numeric(frame["index"], errors="coerce").astype("Int64")
+    frame["price_value"] = parse_prices(frame["price"], frame.get("price_value"))
+    frame["posted_at"] = parse_dates(frame["date"], fetched_at)
+    locations = split_locations(frame["location"])
+    frame["city"] = locations["city"]
+    frame["district"] = locations["district"]
+    return frame
+
+
+def normalize_products(
+    products: Iterable[Dict],
+    seller_info: Optional[Dict] = None,
+    fetched_at: Optional[float] = None,
+    details: bool = False,
+) -> pd.DataFrame:
+    return normalize(to_frame(products, seller_info, details), fetched_at)
+
+
+def save_frame(frame: pd.DataFrame, filename: str, fmt: str):
+    """Пишет нормализованную таблицу с сохранением типов, где формат это позволяет."""
+    if fmt == "parquet":
+        frame.to_parquet(filename, index=False)
+    elif fmt == "csv":
+        frame.to_csv(filename, index=False, encoding="utf-8")
+    elif fmt == "jsonl":
+        frame.to_json(filename, orient="records", lines=True, force_ascii=False, date_format="iso")
+    elif fmt == "xlsx":
+        frame.to_excel(filename, index=False)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {fmt}")
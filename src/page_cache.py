@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = Path.home() / ".avito_parser" / "pages.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (url, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+"""
+
+
+class PageCache:
+    """Кэш отрендеренных страниц в SQLite: HTML сжимается zlib.
+
+    Ключ — URL и время загрузки, так что для одного URL хранится несколько
+    версий. Записи старше ``ttl`` секунд удаляются, а при превышении
+    ``max_bytes`` (по сжатому размеру) вытесняются самые старые.
+    Объект можно использовать из нескольких потоков.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 1024 ** 3,
+        level: int = 6,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.level = level
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "PageCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def put(self, url: str, html: str, fetched_at: Optional[float] = None):
+        body = zlib.compress(html.encode("utf-8"), self.level)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetched_at, size, body) VALUES (?, ?, ?, ?)",
+                (url, fetched_at, len(body), body),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def get(self, url: str, fresh_only: bool = True, as_of: Optional[float] = None) -> Optional[str]:
+        """Самая свежая версия страницы (не новее ``as_of``) или None.
+
+        ``fresh_only=False`` игнорирует TTL — так работает режим повторного разбора.
+        """
+        query = "SELECT body FROM pages WHERE url = ?"
+        params: List = [url]
+        if as_of is not None:
+            query += " AND fetched_at <= ?"
+            params.append(as_of)
+        if fresh_only and self.ttl is not None:
+            query += " AND fetched_at >= ?"
+            params.append(time.time() - self.ttl)
+        query += " ORDER BY fetched_at DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def _evict(self):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for url, fetched_at, size in self._conn.execute(
+            "SELECT url, fetched_at, size FROM pages ORDER BY fetched_at"
+        ):
+            doomed.append((url, fetched_at))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE url = ? AND fetched_at = ?", doomed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pages, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"pages": pages, "compressed_bytes": size, "hits": self.hits, "misses": self.misses}
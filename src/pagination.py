@@ -0,0 +1,85 @@
+import html as html_lib
+import re
+from typing import Dict
+from urllib.parse import parse_qs, urljoin, urlparse
+
+PAGE_SIZE = 50
+
+# План листания по первой странице: максимальный номер ?p=N среди ссылок
+# пагинации на тот же путь и, если на странице есть счётчик объявлений,
+# ceil(total / PAGE_SIZE). 0 страниц означает «план неизвестен».
+# PLAN_JS — для открытой вкладки, plan_pages_html — для HTML без браузера.
+PLAN_JS = """
+({pageSize}) => {
+  let pages = 0;
+  document.querySelectorAll('a[href*="p="]').forEach((a) => {
+    try {
+      const u = new URL(a.getAttribute('href'), location.href);
+      if (u.pathname !== location.pathname) return;
+      const p = parseInt(u.searchParams.get('p'), 10);
+      if (p > pages) pages = p;
+    } catch (e) {}
+  });
+  document.querySelectorAll('[data-marker^="pagination-button/page("]').forEach((el) => {
+    const m = /\\((\\d+)\\)/.exec(el.getAttribute('data-marker'));
+    if (m) pages = Math.max(pages, parseInt(m[1], 10));
+  });
+  let total = 0;
+  const counter = document.querySelector('[data-marker="page-title/count"], [data-marker="profile/items-count"]');
+  if (counter) {
+    const digits = counter.textContent.replace(/\\D+/g, '');
+    if (digits) total = parseInt(digits, 10);
+  }
+  if (total && pageSize) pages = Math.max(pages, Math.ceil(total / pageSize));
+  return {pages, total};
+}
+"""
+
+
+def plan_pages(page, page_size: int = PAGE_SIZE) -> Dict:
+    """``{"pages", "total"}`` для открытой первой страницы продавца."""
+    return page.evaluate(PLAN_JS, {"pageSize": page_size})
+
+
+_HREF_RE = re.compile(r'href="([^"]*[?&](?:amp;)?p=\d+[^"]*)"')
+_PAGE_MARKER_RE = re.compile(r'data-marker="pagination-button/page\((\d+)\)"')
+# Текст счётчика вместе с вложенными тегами — до первого закрывающего тега
+_COUNTER_RE = re.compile(
+    r'data-marker="(?:page-title/count|profile/items-count)"[^>]*>([^<]*(?:<(?!/)[^>]*>[^<]*)*)'
+)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def plan_pages_html(html: str, url: str, page_size: int = PAGE_SIZE) -> Dict:
+    """``{"pages", "total"}`` по HTML первой страницы (то же, что PLAN_JS, без браузера)."""
+    path = urlparse(url).path
+    pages = 0
+    for href in _HREF_RE.findall(html):
+        target = urlparse(urljoin(url, html_lib.unescape(href)))
+        if target.path != path:
+            continue
+        value = parse_qs(target.query).get("p", [""])[0]
+        if value.isdigit():
+            pages = max(pages, int(value))
+    for value in _PAGE_MARKER_RE.findall(html):
+        pages = max(pages, int(value))
+    total = 0
+    counter = _COUNTER_RE.search(html)
+    if counter:
+        digits = re.sub(r"\D+", "", _TAG_RE.sub("", counter.group(1)))
+        if digits:
+            total = int(digits)
+    if total and page_size:
+        pages = max(pages, -(-total // page_size))
+    return {"pages": pages, "total": total}
+
+
+def page_is_complete(cards: int, page: int, total: int = 0, page_size: int = PAGE_SIZE) -> bool:
+    """Все ли объявления страницы ``page`` уже есть среди ``cards`` карточек.
+
+    Полная страница — это ``page_size`` карточек; меньше бывает только на
+    последней, и это можно проверить, лишь зная счётчик объявлений ``total``.
+    """
+    if cards >= page_size:
+        return True
+    return bool(total) and cards >= total - (page - 1) * page_size
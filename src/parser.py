@@ -1,22 +1,46 @@
-import requests
-from playwright.sync_api import sync_playwright, Error as PlaywrightError
-import time
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs
-import csv
-import os
-from typing import List, Dict
-import subprocess
-import sys
-from pathlib import Path
+import logging
+from urllib.parse import urljoin
+from collections import deque
+from contextlib import ExitStack, closing, nullcontext
+from typing import Callable, Deque, List, Dict, Iterable, Iterator, Optional
+
+try:
+    from .browser_pool import BrowserPool, borrow_pool, playwright_error
+    from .scroll_loader import ITEM_SELECTOR, scroll_until_loaded
+    from .dom_extract import extract_listing
+    from . import html_backend
+    from . import state_extract
+    from .page_cache import PageCache
+    from .seen_index import SeenIndex, seller_key, split_known
+    from .sinks import format_for, open_sink
+    from .pagination import page_is_complete, plan_pages, plan_pages_html
+    from .http_fetch import HttpFetcher
+    from .metrics import Metrics, timed, transferred_bytes
+    from .records import Product
+    from .dedup import DedupIndex
+    from .throttle import Blocked, detect_block, retry_call
+    from .details import DetailEnricher
+except ImportError:
+    from browser_pool import BrowserPool, borrow_pool, playwright_error
+    from scroll_loader import ITEM_SELECTOR, scroll_until_loaded
+    from dom_extract import extract_listing
+    import html_backend
+    import state_extract
+    from page_cache import PageCache
+    from seen_index import SeenIndex, seller_key, split_known
+    from sinks import format_for, open_sink
+    from pagination import page_is_complete, plan_pages, plan_pages_html
+    from http_fetch import HttpFetcher
+    from metrics import Metrics, timed, transferred_bytes
+    from records import Product
+    from dedup import DedupIndex
+    from throttle import Blocked, detect_block, retry_call
+    from details import DetailEnricher
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://www.avito.ru"
 
-# If running from PyInstaller bundle, point Playwright to embedded browsers
-if getattr(sys, "_MEIPASS", None):
-    embedded_dir = Path(sys._MEIPASS) / "ms-playwright"
-    os.environ["PLAYWRIGHT_BROWSERS_PATH"] = str(embedded_dir)
-
 
 def _clean_text(text: str) -> str:
     if not text:
@@ -25,63 +49,78 @@ def _clean_text(text: str) -> str:
 
 
 def _extract_price(card) -> str:
-    price_span = card.select_one('meta[itemprop="price"]')
+    price_span = html_backend.PRICE_META_SELECTOR.select_one(card)
     if price_span and price_span.get("content"):
         return price_span["content"].strip()
 
-    price_p = card.select_one('[data-marker="item-price"]')
+    price_p = html_backend.PRICE_SELECTOR.select_one(card)
     if price_p:
         return _clean_text(price_p.get_text(strip=True))
     return ""
 
 
 def _extract_location(card) -> str:
-    geo = card.select_one('div[class*="geo-root"]')
+    geo = html_backend.GEO_SELECTOR.select_one(card)
     if geo:
         return _clean_text(geo.get_text(strip=True))
     return ""
 
 
 def _extract_date(card) -> str:
-    date_p = card.select_one('[data-marker="item-date"]')
+    date_p = html_backend.DATE_SELECTOR.select_one(card)
     if date_p:
         return _clean_text(date_p.get_text(strip=True))
     return ""
 
 
-def _parse_listing_page(html: str) -> Dict:
-    soup = BeautifulSoup(html, "html.parser")
+def _parse_listing_page(html: str, backend: str = "auto") -> Dict:
+    """Parse a rendered listing page with the given html_backend.
+
+    Items are taken from the embedded page state (state_extract) when it covers
+    every card on the page (the result then has ``from_state=True``); otherwise
+    the cards are scraped from the DOM.
+    "auto" picks the fastest installed backend (selectolax, then lxml);
+    "html.parser" is the reference pure-Python path.
+    Products are records.Product; the parse tree is not kept after extraction.
+    """
+    backend = html_backend.resolve_backend(backend)
+    products = state_extract.extract_products(html)
+    # После прокрутки в HTML больше карточек, чем в исходном состоянии страницы
+    if products and len(products) >= html.count('data-marker="item-title"'):
+        return {
+            "products": products,
+            "seller_info": html_backend.parse_seller_info(html, backend),
+            "from_state": True,
+        }
+
+    if backend == "selectolax":
+        return html_backend.parse_listing_selectolax(html)
+
+    soup = html_backend.make_soup(html, backend)
     products = []
-    item_cards = soup.select('[data-marker="item"], div[class*="iva-item-root"]')
+    item_cards = html_backend.CARD_SELECTOR.select(soup)
     for idx, card in enumerate(item_cards, start=1):
-        title_a = card.select_one('[data-marker="item-title"]')
+        title_a = html_backend.TITLE_SELECTOR.select_one(card)
         if not title_a:
             continue
         name = title_a.get_text(strip=True)
         href = title_a.get("href", "")
         url = urljoin(BASE_URL, href)
-        products.append({
-            "index": idx,
-            "name": name,
-            "url": url,
-            "title": title_a.get("title", ""),
-            "price": _extract_price(card),
-            "location": _extract_location(card),
-            "date": _extract_date(card),
-        })
+        products.append(Product(
+            index=idx,
+            name=name,
+            url=url,
+            title=title_a.get("title", ""),
+            price=_extract_price(card),
+            location=_extract_location(card),
+            date=_extract_date(card),
+        ))
 
     # seller info (optional)
-    seller_info = {}
-    name_wrap = soup.find("div", class_=lambda x: x and "AvatarNameView-name" in x)
-    if name_wrap:
-        h = name_wrap.find(["h1", "h2"])
-        if h:
-            seller_info["name"] = h.get_text(strip=True)
-    rating_span = soup.find("span", {"data-marker": "profile/score"})
-    if rating_span:
-        seller_info["rating"] = rating_span.get_text(strip=True)
+    seller_info = html_backend.seller_info_from_soup(soup)
 
-    return {"products": products, "seller_info": seller_info, "html": soup}
+    soup.decompose()
+    return {"products": products, "seller_info": seller_info}
 
 
 def _get_next_page_url(current_url: str, page_number: int) -> str:
@@ -91,140 +130,527 @@ def _get_next_page_url(current_url: str, page_number: int) -> str:
     return f"{current_url}?p={page_number}"
 
 
-def fetch_products_for_seller(listing_url: str, max_pages: int = 10) -> Dict:
-    """Парсит объявления продавца, прокручивая страницу через Playwright."""
-    all_products: List[Dict] = []
+def fetch_products_for_seller(
+    listing_url: str,
+    max_pages: int = 10,
+    pool: Optional[BrowserPool] = None,
+    limiter=None,
+    extract: str = "dom",
+    cache: Optional[PageCache] = None,
+    replay: bool = False,
+    seen: Optional[SeenIndex] = None,
+    stop_after_known: int = 10,
+    on_page: Optional[Callable[[List[Dict], Dict], None]] = None,
+    parallel_pages: int = 3,
+    http: Optional[HttpFetcher] = None,
+    metrics: Optional[Metrics] = None,
+    attempts: int = 3,
+    details: Optional[DetailEnricher] = None,
+) -> Dict:
+    """Парсит объявления продавца, прокручивая страницу через Playwright.
+
+    Если ``pool`` не передан, на время обхода продавца создаётся собственный пул,
+    так что браузер запускается один раз на продавца, а не на каждую страницу.
+    ``limiter`` (например, throttle.AdaptiveLimiter) ограничивает частоту запросов к хосту.
+    ``extract``: "dom" — поля собираются в браузере одним page.evaluate,
+    "html" — page.content() + BeautifulSoup (прежний путь).
+    С ``cache`` загруженные страницы сохраняются в PageCache; с ``replay=True``
+    страницы берутся только из кэша и браузер не запускается вовсе.
+    С ``seen`` (SeenIndex) обход инкрементальный: возвращаются только новые или
+    изменившиеся объявления, а прокрутка и листание прекращаются после
+    ``stop_after_known`` уже известных объявлений подряд.
+    ``on_page(products, seller_info)`` вызывается после каждой страницы — например,
+    чтобы сразу дописать её в sinks.ResultSink.
+    Если по первой странице известно число страниц, остальные ``?p=N`` грузятся
+    одновременно в ``parallel_pages`` вкладках; пустая страница отменяет остальные.
+    С ``http`` (HttpFetcher) каждая страница сначала запрашивается без браузера,
+    а Playwright открывается, если в ответе нет объявлений или нельзя доказать,
+    что страница полная: объявления взяты из встроенного состояния, карточек
+    PAGE_SIZE или столько, сколько обещает счётчик (pagination.page_is_complete).
+    Число страниц тогда берётся из того же HTML (pagination.plan_pages_html), и
+    остальные страницы тоже сначала запрашиваются по HTTP, по одной.
+    В ``metrics`` (metrics.Metrics) записывается время этапов и счётчики по каждой странице.
+    Объявления склеиваются по ID (dedup.DedupIndex): в ``on_page`` попадают только
+    новые, а в результате остаётся самая свежая копия каждого.
+    Каждая страница загружается до ``attempts`` раз с экспоненциальной паузой
+    (throttle.retry_call); капча, блокировка и 429 сообщаются ``limiter`` через
+    throttle.Blocked. Если страницу так и не удалось получить, обход продавца
+    обрывается, а причина попадает в ``errors`` результата — пустой или неполный
+    продавец больше не выглядит как успешный.
+    С ``details`` (details.DetailEnricher) новые объявления каждой страницы
+    дополняются полями своих карточек до ``on_page``; карточки, не изменившиеся
+    с прошлого запуска, берутся из его DetailStore без загрузки.
+    """
+    found = DedupIndex()
+    errors: List[str] = []
+    seen_products: List[Dict] = []
     seller_info: Dict = {}
 
-    for page in range(1, max_pages + 1):
+    if replay and cache is None:
+        raise ValueError("Для повторного разбора нужен кэш страниц")
+
+    seller = seller_key(listing_url)
+    known = seen.known(seller) if seen is not None else {}
+    read_options = {
+        "extract": extract,
+        "cache": cache,
+        "known_ids": known.keys(),
+        "stop_after_known": stop_after_known,
+        "metrics": metrics,
+    }
+
+    def parse_html(page_url: str, html_text: str) -> Dict:
+        with timed(metrics, page_url, "parse"):
+            parsed = _parse_listing_page(html_text)
+        if metrics is not None:
+            metrics.add(page_url, items=len(parsed["products"]))
+        return parsed
+
+    def fetch_page(page: int) -> Optional[Dict]:
         page_url = listing_url if page == 1 else _get_next_page_url(listing_url, page)
+        if replay:
+            html_text = cache.get(page_url, fresh_only=False)
+            if html_text is None:
+                return None
+            parsed = parse_html(page_url, html_text)
+            if page == 1:
+                parsed["page_count"] = plan_pages_html(html_text, page_url)["pages"]
+            return parsed
+
+        def attempt() -> Dict:
+            html_text = None
+            if http is not None:
+                with limiter.slot(page_url) if limiter else nullcontext(), timed(metrics, page_url, "http"):
+                    html_text = http.get(page_url)
+            if html_text is not None:
+                if metrics is not None:
+                    metrics.add(page_url, bytes=len(html_text.encode("utf-8")))
+                parsed = parse_html(page_url, html_text)
+                cards = len(parsed["products"])
+                plan = plan_pages_html(html_text, page_url)
+                # Без прокрутки в HTML может быть только начало ленты: такой
+                # ответ берём, лишь если страница заведомо полная
+                if cards and (parsed.get("from_state") or page_is_complete(cards, page, plan["total"])):
+                    if cache is not None:
+                        cache.put(page_url, html_text)
+                    if page == 1:
+                        # План листания тот же, что у Playwright-пути (plan=True)
+                        parsed["page_count"] = plan["pages"]
+                        parsed["via_http"] = True
+                    return parsed
+                if cards:
+                    logger.info(f"В HTML страницы {page_url} только {cards} объявлений, открываем в браузере")
+            # limiter.slot держится только на время перехода (см. _open_listing)
+            return _fetch_listing_playwright(
+                page_url, pool=pool, plan=page == 1, limiter=limiter, **read_options
+            )
 
         try:
-            html_text = _fetch_html_playwright(page_url)
-        except Exception:
-            # Если Playwright не смог, прекращаем
-            break
-
-        parsed = _parse_listing_page(html_text)
-
+            return retry_call(attempt, page_url, attempts=attempts, metrics=metrics)
+        except Exception as e:
+            logger.warning(f"Страница {page} продавца {listing_url} не загружена, обход продавца прерван: {e}")
+            errors.append(f"{page_url}: {e}")
+            return None
+
+    def handle_page(page: int, parsed: Dict) -> bool:
+        """Учитывает страницу; False — дальше листать не нужно."""
+        nonlocal seller_info
         if page == 1:
             seller_info = parsed["seller_info"]
 
         products = parsed["products"]
         if not products:
-            break
-
-        all_products.extend(products)
+            return False
+        # Один словарь продавца на все его объявления
+        for product in products:
+            product.seller = seller_info
+
+        known_run = 0
+        if seen is not None:
+            seen_products.extend(products)
+            products, known_run = split_known(products, known)
+
+        fresh = found.add_many(products)
+        if details is not None and fresh:
+            details.enrich(fresh)
+        if on_page and fresh:
+            on_page(fresh, seller_info)
+        if products and not fresh and page > 1:
+            # Avito отдаёт последнюю страницу повторно, если ?p=N больше числа страниц
+            logger.info(f"Страница {page} повторяет уже собранные объявления, стоп")
+            return False
+
+        if stop_after_known and known_run >= stop_after_known:
+            logger.info(f"Дальше идут уже известные объявления, стоп на странице {page}")
+            return False
+        return True
+
+    with nullcontext(pool) if replay else borrow_pool(pool, size=parallel_pages, metrics=metrics) as pool:
+        first = fetch_page(1)
+        if first is not None and handle_page(1, first):
+            page_count = min(first.get("page_count", 0), max_pages)
+            tabs = min(parallel_pages, pool.size) if pool is not None else 1
+            if first.get("via_http"):
+                # Сайт отдаёт страницы без браузера: остальные тоже сначала по HTTP
+                tabs = 1
+            if page_count > 1 and tabs > 1:
+                urls = [_get_next_page_url(listing_url, page) for page in range(2, page_count + 1)]
+                next_page = 2
+                try:
+                    with closing(_prefetch_listings(urls, pool, tabs, limiter, **read_options)) as pages:
+                        for page, parsed in enumerate(pages, start=2):
+                            next_page = page + 1
+                            if not handle_page(page, parsed):
+                                next_page = page_count + 1
+                                break
+                except Exception as e:
+                    logger.warning(f"Ошибка параллельной загрузки страниц, дальше по одной: {e}")
+                # Страницы, которые не дошли из-за ошибки, догружаются с повторами
+                for page in range(next_page, page_count + 1):
+                    parsed = fetch_page(page)
+                    if parsed is None or not handle_page(page, parsed):
+                        break
+            elif page_count > 1 or (page_count == 0 and len(first["products"]) >= 50):
+                # Без плана листаем по одной, пока страницы полные.
+                # Avito обычно показывает не более 50 объявлений на страницу.
+                for page in range(2, (page_count or max_pages) + 1):
+                    parsed = fetch_page(page)
+                    if parsed is None or not handle_page(page, parsed):
+                        break
+                    if not page_count and len(parsed["products"]) < 50:
+                        break
 
-        # Avito обычно показывает не более 50 объявлений на страницу.
-        if len(products) < 50:
-            break
+    if seen is not None:
+        seen.update(seller, seen_products)
 
-    return {"total_products": len(all_products), "products": all_products, "seller_info": seller_info}
+    all_products = found.products()
+    return {
+        "total_products": len(all_products),
+        "products": all_products,
+        "seller_info": seller_info,
+        "errors": errors,
+    }
 
 
 # ------------------ Playwright helper ------------------
 
 
-def _fetch_html_playwright(url: str, scroll_pause: float = 0.5, max_scroll_attempts: int = 50, headless: bool = False) -> str:
-    """Load page with Playwright, fast-scroll until all items rendered and return HTML."""
-    _ensure_browsers_installed()
-    try:
-        with sync_playwright() as p:
+def _open_listing(
+    page,
+    url: str,
+    idle_timeout: float,
+    max_scroll_time: float,
+    known_ids: Iterable[str] = (),
+    stop_after_known: int = 0,
+    metrics: Optional[Metrics] = None,
+    limiter=None,
+):
+    """Open ``url`` in ``page`` and scroll until the item count stops growing
+    (or until a run of ``stop_after_known`` already known items).
+
+    Only the navigation and the block check run inside ``limiter.slot``, so the
+    limiter sees the site's response time, not the scrolling.
+    """
+    with limiter.slot(url) if limiter else nullcontext():
+        try:
+            with timed(metrics, url, "goto"):
+                response = page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        except Exception as e:
+            logger.warning(f"Ошибка загрузки страницы: {e}")
+            raise playwright_error(f"Не удалось загрузить страницу: {e}")
+        _check_blocked(page, url, response)
+
+    _scroll_listing(page, url, idle_timeout, max_scroll_time, known_ids, stop_after_known, metrics)
+
+
+def _check_blocked(page, url: str, response=None):
+    """Raise throttle.Blocked if the loaded page is a captcha / block page or a 429."""
+    status = response.status if response is not None else None
+    reason = detect_block(status=status, title=page.title())
+    if reason is None and page.locator(ITEM_SELECTOR).count() == 0:
+        # Заголовок обычный, а карточек нет — ищем разметку заглушки
+        reason = detect_block(page.content(), title="")
+    if reason is not None:
+        retry_after = 0.0
+        if response is not None:
             try:
-                browser = p.chromium.launch(headless=headless)
-            except Exception as e:
-                print(f"Ошибка запуска браузера: {e}")
-                raise PlaywrightError(f"Не удалось запустить браузер Chromium: {e}")
-            
-            context = browser.new_context(
-                viewport={"width": 1280, "height": 800},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
-                locale="ru-RU",
-                timezone_id="Europe/Moscow",
+                retry_after = float(response.header_value("retry-after") or 0)
+            except Exception:
+                pass
+        raise Blocked(reason, url, retry_after)
+
+
+def _scroll_listing(
+    page,
+    url: str,
+    idle_timeout: float,
+    max_scroll_time: float,
+    known_ids: Iterable[str] = (),
+    stop_after_known: int = 0,
+    metrics: Optional[Metrics] = None,
+):
+    try:
+        with timed(metrics, url, "scroll"):
+            loaded = scroll_until_loaded(
+                page,
+                idle_timeout=idle_timeout,
+                max_wait=max_scroll_time,
+                known_ids=known_ids,
+                stop_after_known=stop_after_known,
             )
-            page = context.new_page()
-            
-            # Avoid detection
-            page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined});")
-
-            try:
-                page.goto(url, timeout=60000, wait_until="domcontentloaded")
-                page.wait_for_timeout(4000)
-            except Exception as e:
-                print(f"Ошибка загрузки страницы: {e}")
-                browser.close()
-                raise PlaywrightError(f"Не удалось загрузить страницу: {e}")
-
-            scroll_attempts = 0
-            while scroll_attempts < max_scroll_attempts:
+        logger.info(f"Загружено товаров: {loaded['count']} ({loaded['reason']}, {loaded['ms']} мс)")
+        if metrics is not None:
+            metrics.add(url, scrolls=loaded["scrolls"])
+    except Exception as e:
+        logger.warning(f"Ошибка во время скроллинга: {e}")
+
+
+def _read_listing(
+    page,
+    url: str,
+    extract: str,
+    cache: Optional[PageCache],
+    metrics: Optional[Metrics] = None,
+) -> Dict:
+    """Extract ``{"products", "seller_info"}`` from an already loaded listing page."""
+    html_text = None
+    if cache is not None:
+        with timed(metrics, url, "content"):
+            html_text = page.content()
+        cache.put(url, html_text)
+    parsed = None
+    if extract == "dom":
+        try:
+            with timed(metrics, url, "parse"):
+                parsed = extract_listing(page, ITEM_SELECTOR)
+        except Exception as e:
+            logger.warning(f"Ошибка извлечения в браузере, используем BeautifulSoup: {e}")
+    if parsed is None:
+        if html_text is None:
+            with timed(metrics, url, "content"):
+                html_text = page.content()
+        with timed(metrics, url, "parse"):
+            parsed = _parse_listing_page(html_text)
+    if metrics is not None:
+        try:
+            metrics.add(url, bytes=transferred_bytes(page))
+        except Exception:
+            pass
+        metrics.add(url, items=len(parsed["products"]))
+    return parsed
+
+
+def fetch_html(
+    url: str,
+    http: Optional[HttpFetcher] = None,
+    pool: Optional[BrowserPool] = None,
+    headless: bool = False,
+    limiter=None,
+    metrics: Optional[Metrics] = None,
+    page: int = 1,
+) -> str:
+    """HTML страницы ``page`` списка: сначала обычным HTTP-запросом, а если
+    ответ не содержит всю страницу — через _fetch_html_playwright.
+
+    HTTP-ответ принимается со встроенным состоянием или с полной по
+    pagination.page_is_complete лентой карточек (они считаются по разметке, без
+    разбора). ``limiter.slot`` охватывает только сам запрос или переход.
+    """
+    if http is not None:
+        with limiter.slot(url) if limiter else nullcontext(), timed(metrics, url, "http"):
+            html_text = http.get(url)
+        if html_text is not None:
+            if metrics is not None:
+                metrics.add(url, bytes=len(html_text.encode("utf-8")))
+            cards = html_text.count('data-marker="item-title"')
+            if state_extract.has_state(html_text) or page_is_complete(
+                cards, page, plan_pages_html(html_text, url)["total"]
+            ):
+                return html_text
+            logger.info(f"В HTML страницы {url} только {cards} объявлений, открываем в браузере")
+    return _fetch_html_playwright(url, headless=headless, pool=pool, metrics=metrics, limiter=limiter)
+
+
+def _fetch_html_playwright(
+    url: str,
+    idle_timeout: float = 1.5,
+    max_scroll_time: float = 60.0,
+    headless: bool = False,
+    pool: Optional[BrowserPool] = None,
+    metrics: Optional[Metrics] = None,
+    limiter=None,
+) -> str:
+    """Load page with Playwright, scroll until the item count stops growing and return HTML.
+
+    The page is borrowed from ``pool``; without a pool a one-off browser is launched.
+    Scrolling is driven by an in-page observer (see scroll_loader), so there are no
+    fixed sleeps between iterations.
+    """
+    try:
+        with borrow_pool(pool, headless=headless) as pool, ExitStack() as stack:
+            with timed(metrics, url, "browser"):
+                page = stack.enter_context(pool.page())
+            _open_listing(page, url, idle_timeout, max_scroll_time, metrics=metrics, limiter=limiter)
+            with timed(metrics, url, "content"):
+                html_text = page.content()
+            if metrics is not None:
                 try:
-                    current_items = len(page.query_selector_all('[data-marker="item"], div[class*="iva-item-root"]'))
-                    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    page.wait_for_timeout(int(scroll_pause * 1000))
-                    new_items = len(page.query_selector_all('[data-marker="item"], div[class*="iva-item-root"]'))
+                    metrics.add(url, bytes=transferred_bytes(page))
+                except Exception:
+                    pass
+            return html_text
 
-                    if new_items == current_items:
-                        scroll_attempts += 1
-                    else:
-                        scroll_attempts = 0
-
-                    print(f"Загружено товаров: {new_items}")
-
-                    if scroll_attempts >= 3:
-                        break
+    except Blocked:
+        raise
+    except Exception as e:
+        logger.warning(f"Критическая ошибка Playwright: {e}")
+        raise playwright_error(f"Playwright не смог обработать страницу: {e}")
+
+
+def _fetch_listing_playwright(
+    url: str,
+    extract: str = "dom",
+    idle_timeout: float = 1.5,
+    max_scroll_time: float = 60.0,
+    headless: bool = False,
+    pool: Optional[BrowserPool] = None,
+    cache: Optional[PageCache] = None,
+    known_ids: Iterable[str] = (),
+    stop_after_known: int = 0,
+    plan: bool = False,
+    metrics: Optional[Metrics] = None,
+    limiter=None,
+) -> Dict:
+    """Load a listing page and return ``{"products", "seller_info"}``.
+
+    With ``extract="dom"`` the cards are collected in the browser (dom_extract);
+    if that fails, or with ``extract="html"``, the rendered HTML goes through
+    _parse_listing_page. With ``cache`` the rendered HTML is also stored for replay.
+    With ``plan=True`` the result also has ``page_count`` (0 when unknown).
+    """
+    try:
+        with borrow_pool(pool, headless=headless) as pool, ExitStack() as stack:
+            # Включает запуск браузера, если это первая вкладка пула
+            with timed(metrics, url, "browser"):
+                page = stack.enter_context(pool.page())
+            _open_listing(
+                page, url, idle_timeout, max_scroll_time, known_ids, stop_after_known, metrics, limiter
+            )
+            page_count = 0
+            if plan:
+                try:
+                    page_count = plan_pages(page)["pages"]
                 except Exception as e:
-                    print(f"Ошибка во время скроллинга: {e}")
-                    break
-
-            html = page.content()
-            browser.close()
-            return html
-            
+                    logger.warning(f"Не удалось определить число страниц: {e}")
+            parsed = _read_listing(page, url, extract, cache, metrics)
+            if plan:
+                parsed["page_count"] = page_count
+            return parsed
+
+    except Blocked:
+        raise
     except Exception as e:
-        print(f"Критическая ошибка Playwright: {e}")
-        raise PlaywrightError(f"Playwright не смог обработать страницу: {e}")
+        logger.warning(f"Критическая ошибка Playwright: {e}")
+        raise playwright_error(f"Playwright не смог обработать страницу: {e}")
+
+
+def _prefetch_listings(
+    urls: List[str],
+    pool: BrowserPool,
+    tabs: int,
+    limiter=None,
+    extract: str = "dom",
+    cache: Optional[PageCache] = None,
+    known_ids: Iterable[str] = (),
+    stop_after_known: int = 0,
+    idle_timeout: float = 1.5,
+    max_scroll_time: float = 60.0,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[Dict]:
+    """Yield parsed listing pages in order while up to ``tabs`` pages load at once.
+
+    Navigations are started with ``wait_until="commit"`` so the browser loads the
+    next pages while the current one is being scrolled and read. Closing the
+    generator early aborts the navigations that are still in flight.
+    ``limiter.slot`` covers only the start of each navigation; the block check
+    made once the page has loaded is passed on through ``limiter.report``.
+    """
+    pending = deque(urls)
+    in_flight: Deque = deque()
+
+    with ExitStack() as stack:
+        free = [stack.enter_context(pool.page()) for _ in range(min(tabs, len(urls)))]
+
+        def start_next():
+            while free and pending:
+                tab, url = free.pop(), pending.popleft()
+                with limiter.slot(url, deferred=True) if limiter else nullcontext():
+                    response = tab.goto(url, timeout=60000, wait_until="commit")
+                in_flight.append((tab, url, response))
 
+        try:
+            start_next()
+            while in_flight:
+                tab, url, response = in_flight.popleft()
+                # Навигация уже идёт: в "goto" попадает только оставшееся ожидание
+                with timed(metrics, url, "goto"):
+                    tab.wait_for_load_state("domcontentloaded", timeout=60000)
+                try:
+                    _check_blocked(tab, url, response)
+                except Blocked as e:
+                    if limiter is not None:
+                        limiter.report(url, e)
+                    raise
+                if limiter is not None:
+                    limiter.report(url)
+                _scroll_listing(tab, url, idle_timeout, max_scroll_time, known_ids, stop_after_known, metrics)
+                parsed = _read_listing(tab, url, extract, cache, metrics)
+                free.append(tab)
+                start_next()
+                yield parsed
+        finally:
+            for tab, _, _ in in_flight:
+                try:
+                    tab.goto("about:blank", wait_until="commit")
+                except Exception:
+                    pass
+
+
+def save_results(
+    data: Dict,
+    filename: str,
+    fmt: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    normalized: bool = False,
+):
+    """Save parsed data to CSV / JSONL / Parquet / XLSX (format from the extension).
+
+    With ``normalized=True`` the rows go through the pandas stage (normalize.py)
+    first and get typed price_value, posted_at, city and district columns.
+    Detail columns (records.DETAIL_FIELDS) are added when any product has them.
+    """
+    if not data or not data.get("products"):
+        raise ValueError("No product data to save")
+    details = any(p.get("details") for p in data["products"])
 
-def _ensure_browsers_installed():
-    """Check if Playwright browsers are installed; if not, install chromium."""
-    # If embedded via PyInstaller and env var points to it – nothing to do
-    if os.environ.get("PLAYWRIGHT_BROWSERS_PATH"):
-        pth = Path(os.environ["PLAYWRIGHT_BROWSERS_PATH"])
-        if pth.exists():
-            return
-    try:
-        print("Installing Playwright chromium browsers, please wait…")
-        subprocess.run([sys.executable, "-m", "playwright", "install", "chromium"], check=True)
-    except Exception as e:
-        print("Failed to install Playwright browsers:", e)
+    if normalized:
+        try:
+            from . import normalize
+        except ImportError:
+            import normalize
+        with timed(metrics, filename, "save"):
+            frame = normalize.normalize_products(
+                data["products"], data.get("seller_info"), data.get("fetched_at"), details
+            )
+            normalize.save_frame(frame, filename, fmt or format_for(filename))
+        return
+
+    with timed(metrics, filename, "save"), open_sink(filename, fmt, details=details) as sink:
+        # Продавец присоединяется к каждой строке здесь; у Product он свой, а
+        # data["seller_info"] — запасной вариант для словарей
+        sink.write(data["products"], data.get("seller_info", {}))
 
 
 def save_to_csv(data: Dict, filename: str):
     """Save parsed data to CSV file"""
-    if not data or not data.get("products"):
-        raise ValueError("No product data to save")
-
-    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
-    fieldnames = [
-        "index",
-        "name",
-        "url",
-        "title",
-        "price",
-        "location",
-        "date",
-        "seller_name",
-        "seller_rating",
-    ]
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        s = data.get("seller_info", {})
-        for row in data["products"]:
-            row_out = dict(row)
-            row_out.update({
-                "seller_name": s.get("name", ""),
-                "seller_rating": s.get("rating", ""),
-            })
-            writer.writerow(row_out)
\ No newline at end of file
+    save_results(data, filename, fmt="csv")
@@ -0,0 +1,338 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+
+try:
+    from . import parser as avito_parser
+    from . import state_extract
+    from .browser_pool import BrowserPool
+    from .dedup import DedupIndex
+    from .http_fetch import HttpFetcher
+    from .metrics import Metrics
+    from .page_cache import PageCache
+    from .pagination import PAGE_SIZE, plan_pages_html
+    from .sinks import ResultSink
+    from .throttle import AdaptiveLimiter, retry_call
+    from .profiles import ProfileStore
+except ImportError:
+    import parser as avito_parser
+    import state_extract
+    from browser_pool import BrowserPool
+    from dedup import DedupIndex
+    from http_fetch import HttpFetcher
+    from metrics import Metrics
+    from page_cache import PageCache
+    from pagination import PAGE_SIZE, plan_pages_html
+    from sinks import ResultSink
+    from throttle import AdaptiveLimiter, retry_call
+    from profiles import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _parse_job(html: str) -> Dict:
+    """Выполняется в процессе-разборщике; результат возвращается через pickle."""
+    return avito_parser._parse_listing_page(html)
+
+
+def run_pipeline(
+    links: List[str],
+    fetchers: int = 3,
+    parsers: Optional[int] = None,
+    queue_size: int = 8,
+    per_host: int = 2,
+    min_interval: float = 1.0,
+    max_pages: int = 10,
+    headless: bool = False,
+    http_first: bool = True,
+    cache: Optional[PageCache] = None,
+    replay: bool = False,
+    sink: Optional[ResultSink] = None,
+    on_page: Optional[Callable[[List[Dict], Dict], None]] = None,
+    on_seller: Optional[Callable[[int, int, str, Dict], None]] = None,
+    collect: bool = True,
+    attempts: int = 3,
+    profiles: Optional[ProfileStore] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    dedup: Optional[DedupIndex] = None,
+    metrics: Optional[Metrics] = None,
+) -> Dict:
+    """Обход продавцов конвейером: загрузка → разбор в процессах → запись.
+
+    ``fetchers`` потоков (у каждого свой BrowserPool) только получают HTML и кладут
+    его в очередь на ``queue_size`` страниц; разбор _parse_listing_page идёт в
+    ProcessPoolExecutor на ``parsers`` процессах (по умолчанию — по числу ядер),
+    одновременно в работе не больше ``2 * parsers`` страниц. Когда очередь полна,
+    загрузчики ждут, так что память ограничена, а браузер не простаивает, пока
+    разбирается большая страница. Разобранные страницы склеиваются по ID
+    (``dedup`` или новый DedupIndex) и уходят в ``sink`` и ``on_page``; страницы,
+    разобранные раньше первой страницы продавца, ждут её, чтобы получить продавца.
+    Следующая страница продавца загружается, пока на текущей не меньше PAGE_SIZE
+    карточек. Обычно они считаются по разметке, без разбора; если карточек в
+    разметке меньше, а у страницы есть встроенное состояние, загрузчик ждёт число
+    объявлений от разборщика. Если по пагинации первой страницы страниц больше,
+    неполная страница не обрывает продавца молча: она попадает в ``errors``, а
+    листание идёт дальше. Инкрементальный режим (seen) и карточки объявлений
+    здесь не поддерживаются — для них есть crawler.crawl_sellers.
+    Страница загружается до ``attempts`` раз (throttle.retry_call) через
+    ``limiter`` (по умолчанию новый throttle.AdaptiveLimiter). ``profiles`` —
+    постоянные профили браузера для загрузчиков (см. BrowserPool). В ``metrics``
+    попадают время загрузки, байты, повторы и число объявлений по страницам. Результат в том же формате,
+    что у crawl_sellers, так что функцию можно передать в job_queue.run_worker.
+    """
+    parsers = parsers or os.cpu_count() or 1
+    total = len(links)
+    fetched_at = time.time()
+    raw: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    tasks: "queue.Queue[int]" = queue.Queue()
+    for idx in range(total):
+        tasks.put(idx)
+
+    if limiter is None:
+        limiter = AdaptiveLimiter(per_host=per_host, min_interval=min_interval)
+    http = HttpFetcher(pool_size=max(1, fetchers)) if http_first and not replay else None
+    if dedup is None:
+        dedup = DedupIndex(keep_products=collect)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    failures: Dict[str, List[str]] = {}
+    # Один словарь продавца на все страницы: заполняется, когда разобрана первая
+    sellers: List[Dict] = [{} for _ in links]
+    # Число объявлений по разобранным страницам (idx, page) — для решения о листании;
+    # записи продавца удаляются, когда он разобран целиком (seller_progress)
+    counted: Dict = {}
+    counted_cond = threading.Condition()
+
+    def page_url(idx: int, page: int) -> str:
+        return links[idx] if page == 1 else avito_parser._get_next_page_url(links[idx], page)
+
+    def page_is_full(idx: int, page: int, html: str) -> bool:
+        if html.count('data-marker="item-title"') >= PAGE_SIZE:
+            return True
+        if not state_extract.has_state(html):
+            return False
+        # Объявления могут быть только во встроенном состоянии: ждём разбора
+        key = (idx, page)
+        with counted_cond:
+            while key not in counted and not stop.is_set():
+                counted_cond.wait(0.5)
+            return counted.get(key, 0) >= PAGE_SIZE
+
+    def put(item) -> bool:
+        """Кладёт в raw, пока обход не остановлен; False — остановлен.
+
+        Очередь ограничена, а после ошибки её никто не читает: без таймаута
+        загрузчик навсегда повис бы на put вместе со своим браузером.
+        """
+        while not stop.is_set():
+            try:
+                raw.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_page(pool, url: str, page: int) -> Optional[str]:
+        if replay:
+            return cache.get(url, fresh_only=False)
+
+        def attempt() -> str:
+            # Слот лимитера fetch_html держит только на время запроса/перехода
+            return avito_parser.fetch_html(
+                url, http=http, pool=pool, headless=headless, limiter=limiter, metrics=metrics, page=page
+            )
+
+        html = retry_call(attempt, url, attempts=attempts, metrics=metrics)
+        if cache is not None:
+            cache.put(url, html)
+        return html
+
+    def fetcher():
+        try:
+            own_pool = None if replay else BrowserPool(size=1, headless=headless, profiles=profiles, metrics=metrics)
+            with nullcontext() if own_pool is None else own_pool as pool:
+                while not stop.is_set():
+                    try:
+                        idx = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    link = links[idx]
+                    pages = 0
+                    planned = 0
+                    for page in range(1, max_pages + 1):
+                        url = page_url(idx, page)
+                        try:
+                            html = fetch_page(pool, url, page)
+                        except Exception as e:
+                            logger.warning(f"Не удалось загрузить {url}, продавец прерван: {e}")
+                            failures.setdefault(link, []).append(f"{url}: {e}")
+                            break
+                        if html is None:
+                            break
+                        if not put(("page", idx, page, html)):
+                            return
+                        pages += 1
+                        if page == 1:
+                            planned = min(plan_pages_html(html, url)["pages"], max_pages)
+                        if page_is_full(idx, page, html):
+                            continue
+                        if page >= planned:
+                            break
+                        # По пагинации страниц больше: короткая страница — это недогруженная
+                        # лента, а не конец продавца
+                        logger.warning(f"Страница {url} неполная, продавец будет собран не полностью")
+                        failures.setdefault(link, []).append(f"{url}: неполная страница")
+                    if not put(("seller", idx, pages, None)):
+                        return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [
+        threading.Thread(target=fetcher, name=f"fetcher-{n}", daemon=True)
+        for n in range(max(1, min(fetchers, total)))
+    ]
+
+    def close_queue():
+        for t in threads:
+            t.join()
+        # Без проверки stop: если загрузчик упал сам, цикл разбора ждёт именно _DONE
+        raw.put(_DONE)
+
+    expected: Dict[int, int] = {}
+    parsed_pages: Dict[int, int] = {}
+    counts: Dict[int, int] = {}
+    done = [0]
+
+    def seller_progress(idx: int):
+        if idx in expected and parsed_pages.get(idx, 0) >= expected[idx]:
+            done[0] += 1
+            with counted_cond:
+                for page in range(1, expected[idx] + 1):
+                    counted.pop((idx, page), None)
+            if on_seller:
+                data = {
+                    "total_products": counts.get(idx, 0),
+                    "products": [],
+                    "seller_info": sellers[idx],
+                    "errors": failures.get(links[idx], []),
+                }
+                on_seller(done[0], total, links[idx], data)
+
+    # Страницы, разобранные раньше первой страницы своего продавца
+    waiting: Dict[int, List[Dict]] = {}
+    ready = set()
+
+    def emit(idx: int, parsed: Dict):
+        seller_info = sellers[idx]
+        for product in parsed["products"]:
+            product.seller = seller_info
+        fresh = dedup.add_many(parsed["products"])
+        counts[idx] = counts.get(idx, 0) + len(fresh)
+        if fresh:
+            if sink is not None:
+                sink.write(fresh, seller_info)
+            if on_page:
+                on_page(fresh, seller_info)
+
+    def page_parsed(idx: int, page: int, parsed: Optional[Dict]):
+        """Учитывает разобранную страницу; ``parsed`` None — разбор не удался."""
+        with counted_cond:
+            counted[(idx, page)] = len(parsed["products"]) if parsed else 0
+            counted_cond.notify_all()
+        if parsed is not None and metrics is not None:
+            metrics.add(page_url(idx, page), items=len(parsed["products"]))
+        if page == 1:
+            if parsed is not None:
+                sellers[idx].update(parsed["seller_info"])
+                emit(idx, parsed)
+            ready.add(idx)
+            for early in waiting.pop(idx, []):
+                emit(idx, early)
+        elif parsed is not None:
+            if idx in ready:
+                emit(idx, parsed)
+            else:
+                waiting.setdefault(idx, []).append(parsed)
+        parsed_pages[idx] = parsed_pages.get(idx, 0) + 1
+        seller_progress(idx)
+
+    for t in threads:
+        t.start()
+    closer = threading.Thread(target=close_queue, name="fetchers-join", daemon=True)
+    closer.start()
+
+    with ProcessPoolExecutor(max_workers=parsers) as executor:
+        pending: Dict = {}
+
+        def drain(block: bool):
+            if not pending:
+                return
+            finished, _ = wait(list(pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idx, page = pending.pop(future)
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    logger.warning(f"Ошибка разбора страницы {page} продавца {links[idx]}: {e}")
+                    parsed = None
+                # Ошибки записи (sink, on_page) не глушатся — обход прерывается
+                page_parsed(idx, page, parsed)
+
+        try:
+            while True:
+                # Не больше 2 * parsers страниц в работе: остальные ждут в очереди raw
+                while len(pending) >= 2 * parsers:
+                    drain(block=True)
+                try:
+                    item = raw.get(timeout=0.05)
+                except queue.Empty:
+                    drain(block=False)
+                    continue
+                if item is _DONE:
+                    break
+                kind, idx, value, html = item
+                if kind == "page":
+                    pending[executor.submit(_parse_job, html)] = (idx, value)
+                else:
+                    expected[idx] = value
+                    seller_progress(idx)
+                drain(block=False)
+
+            while pending:
+                drain(block=True)
+        except BaseException:
+            # Загрузчики перестают брать новых продавцов и бросают очередь raw;
+            # вычитываем её, пока они не выйдут и не закроют свои браузеры
+            stop.set()
+            while closer.is_alive():
+                try:
+                    raw.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if http is not None:
+                http.close()
+            raise
+
+    closer.join()
+    if http is not None:
+        http.close()
+    if errors:
+        raise errors[0]
+
+    seller_info = next((s for s in sellers if s), {})
+    products = dedup.products()
+    return {
+        "total_products": len(dedup),
+        "products": products,
+        "seller_info": seller_info,
+        "fetched_at": fetched_at,
+        "errors": failures,
+    }
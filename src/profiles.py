@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILES_DIR = Path.home() / ".avito_parser" / "profiles"
+
+LOCK_NAME = "avito-parser.lock"
+META_NAME = "avito-parser.json"
+
+# Кэши Chromium внутри профиля: их можно удалить, не трогая cookies и localStorage
+CACHE_DIRS = (
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/Service Worker/CacheStorage",
+    "Default/Service Worker/ScriptCache",
+    "GrShaderCache",
+    "ShaderCache",
+    "GraphiteDawnCache",
+)
+
+# Профили, занятые пулами этого процесса (у всех один PID). Замок реентерабельный:
+# claim держит его, пока проверяет и создаёт файл-замок, а _lock_is_stale берёт снова
+_claimed: Set[str] = set()
+_claimed_lock = threading.RLock()
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def pid_alive(pid: int) -> Optional[bool]:
+    """Жив ли процесс на этой машине; None — узнать нельзя (Windows без psutil)."""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "posix":
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    return None
+
+
+def _lock_is_stale(lock_path: Path) -> bool:
+    try:
+        text = lock_path.read_text().strip()
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+    if not text:
+        # Замок только что создан, PID ещё не записан
+        return False
+    try:
+        pid = int(text)
+    except ValueError:
+        return True
+    if pid == os.getpid():
+        with _claimed_lock:
+            return str(lock_path.parent) not in _claimed
+    alive = pid_alive(pid)
+    if alive is not None:
+        return not alive
+    # Windows без psutil: файл, открытый живым процессом, удалить нельзя
+    try:
+        lock_path.unlink()
+        return True
+    except OSError:
+        return False
+
+
+def _create_lock(lock_path: Path) -> Optional[int]:
+    """Атомарно создаёт файл-замок; None — каталог занят другим процессом."""
+    for _ in range(2):
+        try:
+            return os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Чужой замок удаляется, только если он устарел; если его успел
+            # пересоздать другой процесс, повторный O_EXCL снова не пройдёт
+            if not _lock_is_stale(lock_path):
+                return None
+            try:
+                lock_path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return None
+    return None
+
+
+class Profile:
+    """Каталог профиля Chromium, захваченный одним пулом (см. ProfileStore.claim)."""
+
+    def __init__(self, store: "ProfileStore", path: Path, lock_file):
+        self.store = store
+        self.path = path
+        self._lock_file = lock_file
+        self.meta = self._read_meta()
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(self.path / META_NAME, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"created": time.time(), "launches": 0}
+
+    def _write_meta(self):
+        try:
+            with open(self.path / META_NAME, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+        except OSError as e:
+            logger.warning(f"Не удалось записать метаданные профиля {self.path}: {e}")
+
+    def prepare(self):
+        """Перед запуском браузера: ротация по возрасту/числу запусков и лимит размера."""
+        store = self.store
+        age = time.time() - self.meta.get("created", time.time())
+        if age > store.max_age or self.meta.get("launches", 0) >= store.max_launches:
+            self.rotate("профиль устарел")
+        elif store.max_bytes and dir_size(self.path) > store.max_bytes:
+            self.trim()
+            if dir_size(self.path) > store.max_bytes:
+                self.rotate("профиль больше лимита и без кэша")
+        self.meta["launches"] = self.meta.get("launches", 0) + 1
+        self.meta["last_used"] = time.time()
+        self._write_meta()
+
+    def trim(self):
+        """Удаляет дисковые кэши Chromium, сохраняя cookies и токены."""
+        for name in CACHE_DIRS:
+            shutil.rmtree(self.path / name, ignore_errors=True)
+
+    def rotate(self, reason: str = ""):
+        """Начинает профиль заново: новые cookies, пустой кэш. Браузер должен быть закрыт."""
+        logger.info(f"Ротация профиля {self.path.name}" + (f": {reason}" if reason else ""))
+        for entry in self.path.iterdir():
+            if entry.name == LOCK_NAME:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                try:
+                    entry.unlink()
+                except OSError:
+                    pass
+        self.meta = {"created": time.time(), "launches": 0}
+
+    def release(self):
+        self.meta["last_used"] = time.time()
+        self._write_meta()
+        try:
+            self._lock_file.close()
+            (self.path / LOCK_NAME).unlink()
+        except OSError:
+            pass
+        with _claimed_lock:
+            _claimed.discard(str(self.path))
+
+
+class ProfileStore:
+    """Постоянные профили Chromium для BrowserPool: cookies, токены антибота и
+    дисковый кэш JS/CSS переживают перезапуск программы.
+
+    Каждый пул захватывает свободный каталог ``worker-N`` (файл-замок с PID, так что
+    два процесса не откроют один профиль). Дисковый кэш ограничен ``cache_bytes``
+    (--disk-cache-size). Перед каждым запуском профиль, которому больше
+    ``max_age`` секунд или который запускался ``max_launches`` раз, начинается
+    заново; если он больше ``max_bytes``, сначала удаляются кэши, а если и это
+    не помогло — тоже ротация.
+    """
+
+    def __init__(
+        self,
+        root=DEFAULT_PROFILES_DIR,
+        max_bytes: int = 512 * 1024 * 1024,
+        cache_bytes: int = 256 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+        max_launches: int = 200,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.cache_bytes = cache_bytes
+        self.max_age = max_age
+        self.max_launches = max(1, max_launches)
+
+    def claim(self) -> Profile:
+        """Захватывает первый свободный каталог профиля."""
+        n = 0
+        while True:
+            path = self.root / f"worker-{n}"
+            path.mkdir(parents=True, exist_ok=True)
+            # Проверка, создание замка и запись в _claimed — под одним замком,
+            # чтобы два потока процесса не получили один каталог
+            with _claimed_lock:
+                fd = None if str(path) in _claimed else _create_lock(path / LOCK_NAME)
+                if fd is not None:
+                    _claimed.add(str(path))
+            if fd is not None:
+                lock_file = os.fdopen(fd, "w")
+                lock_file.write(str(os.getpid()))
+                lock_file.flush()
+                return Profile(self, path, lock_file)
+            n += 1
+
+    def launch_args(self):
+        return [f"--disk-cache-size={self.cache_bytes}"] if self.cache_bytes else []
+
+    def stats(self) -> Dict[str, Dict]:
+        """Размер, возраст и число запусков каждого профиля."""
+        stats = {}
+        for path in sorted(self.root.glob("worker-*")):
+            try:
+                with open(path / META_NAME, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            stats[path.name] = {
+                "bytes": dir_size(path),
+                "launches": meta.get("launches", 0),
+                "age": round(time.time() - meta["created"]) if "created" in meta else None,
+                "in_use": (path / LOCK_NAME).exists(),
+            }
+        return stats
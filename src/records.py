@@ -0,0 +1,126 @@
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+FIELDS = (
+    "index",
+    "item_id",
+    "name",
+    "url",
+    "title",
+    "price",
+    "price_value",
+    "location",
+    "date",
+)
+
+# Поля карточки объявления (details.DetailEnricher); хранятся словарём в Product.details
+DETAIL_FIELDS = (
+    "location_detail",
+    "details",
+    "price_list",
+    "description",
+    "additional",
+)
+
+_DEFAULTS = {"index": 0, "price_value": None}
+
+
+def _intern(value) -> str:
+    return sys.intern(value) if isinstance(value, str) else ""
+
+
+class Product:
+    """Компактная запись объявления вместо словаря из 7–9 ключей.
+
+    Поля хранятся в ``__slots__``; ``location`` и ``date`` интернируются — у
+    продавца они почти всегда повторяются. ``seller`` ссылается на общий для всех
+    объявлений продавца словарь seller_info и присоединяется только при записи
+    (см. sinks). ``details`` — словарь полей карточки объявления (DETAIL_FIELDS),
+    если обход открывал карточки, иначе None. Для совместимости запись ведёт себя
+    как словарь: ``p["price"]``, ``p.get("url")``, ``"date" in p``,
+    ``keys()``/``items()``, ``dict(p)``.
+    """
+
+    __slots__ = FIELDS + ("seller", "details")
+
+    def __init__(
+        self,
+        index: int = 0,
+        item_id: str = "",
+        name: str = "",
+        url: str = "",
+        title: str = "",
+        price: str = "",
+        price_value: Optional[int] = None,
+        location: str = "",
+        date: str = "",
+        seller: Optional[Dict] = None,
+        details: Optional[Dict] = None,
+    ):
+        self.index = index
+        self.item_id = item_id
+        self.name = name
+        self.url = url
+        self.title = title
+        self.price = price
+        self.price_value = price_value
+        self.location = _intern(location)
+        self.date = _intern(date)
+        self.seller = seller
+        self.details = details
+
+    @classmethod
+    def from_dict(cls, data: Dict, seller: Optional[Dict] = None) -> "Product":
+        return cls(**{k: data[k] for k in FIELDS if k in data}, seller=seller)
+
+    def __getitem__(self, key: str):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, _intern(value) if key in ("location", "date") else value)
+
+    def __contains__(self, key) -> bool:
+        return key in FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Product, dict)):
+            return all(self.get(k) == other.get(k, _DEFAULTS.get(k, "")) for k in FIELDS)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Product({', '.join(f'{k}={getattr(self, k)!r}' for k in FIELDS)})"
+
+    def get(self, key: str, default=None):
+        if key in FIELDS or key in ("seller", "details"):
+            return getattr(self, key)
+        return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return FIELDS
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in FIELDS]
+
+    def values(self):
+        return [getattr(self, k) for k in FIELDS]
+
+    def as_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in FIELDS}
+
+
+def attach_details(product: Dict, details: Optional[Dict]):
+    """Присоединяет поля карточки к объявлению (Product или словарю)."""
+    if isinstance(product, Product):
+        product.details = details
+    else:
+        product["details"] = details
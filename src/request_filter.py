@@ -0,0 +1,154 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Tuple
+
+# Примерный размер ответа по типу ресурса: Playwright не знает размер
+# отменённого запроса, поэтому экономию трафика можно только оценить.
+TYPICAL_SIZES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 60_000,
+    "stylesheet": 30_000,
+    "script": 80_000,
+    "ping": 500,
+}
+
+TRACKER_PATTERNS = (
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"mc\.yandex\.ru",
+    r"an\.yandex\.ru",
+    r"yandex\.ru/ads",
+    r"ads\.adfox\.ru",
+    r"top-fwz1\.mail\.ru",
+    r"vk\.com/rtrg",
+    r"/stat(?:istics)?/",
+)
+
+# Те же правила в виде шаблонов Network.setBlockedURLs (см. RequestBlocker.install_blocklist)
+TRACKER_GLOBS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*mc.yandex.ru*",
+    "*an.yandex.ru*",
+    "*yandex.ru/ads*",
+    "*ads.adfox.ru*",
+    "*top-fwz1.mail.ru*",
+    "*vk.com/rtrg*",
+)
+IMAGE_GLOBS = ("*img.avito.st*", "*.jpg*", "*.jpeg*", "*.png*", "*.webp*", "*.gif*", "*.avif*")
+FONT_GLOBS = ("*.woff*", "*.ttf*", "*.otf*")
+MEDIA_GLOBS = ("*.mp4*", "*.webm*")
+
+
+@dataclass(frozen=True)
+class RoutingProfile:
+    """Правила для page.route: какие запросы пропускать, а какие отменять.
+
+    Разрешающий шаблон URL имеет приоритет над запрещающими правилами.
+    ``deny_globs`` — приближение тех же запретов шаблонами URL для режима без
+    перехвата запросов (постоянный профиль браузера с дисковым кэшем).
+    """
+
+    deny_types: FrozenSet[str] = frozenset()
+    allow_types: FrozenSet[str] = frozenset()
+    deny_patterns: Tuple[str, ...] = ()
+    allow_patterns: Tuple[str, ...] = ()
+    deny_globs: Tuple[str, ...] = ()
+    _deny_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+    _allow_re: Optional[re.Pattern] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_deny_re", _compile(self.deny_patterns))
+        object.__setattr__(self, "_allow_re", _compile(self.allow_patterns))
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if self._allow_re and self._allow_re.search(url):
+            return False
+        if self.allow_types and resource_type not in self.allow_types:
+            return True
+        if resource_type in self.deny_types:
+            return True
+        return bool(self._deny_re and self._deny_re.search(url))
+
+
+def _compile(patterns: Tuple[str, ...]) -> Optional[re.Pattern]:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+# Страницы продавца: нужны только разметка, скрипты и стили (лента подгружается JS)
+LISTING_PROFILE = RoutingProfile(
+    deny_types=frozenset({"image", "media", "font", "ping"}),
+    deny_patterns=TRACKER_PATTERNS,
+    deny_globs=IMAGE_GLOBS + FONT_GLOBS + MEDIA_GLOBS + TRACKER_GLOBS,
+)
+
+# Карточки объявлений: поля читаются через textContent, вёрстка не нужна — режем и стили
+DETAIL_PROFILE = RoutingProfile(
+    deny_types=frozenset({"image", "media", "font", "ping", "stylesheet"}),
+    deny_patterns=TRACKER_PATTERNS,
+    deny_globs=IMAGE_GLOBS + FONT_GLOBS + MEDIA_GLOBS + TRACKER_GLOBS + ("*.css*",),
+)
+
+
+class RequestBlocker:
+    """Отменяет лишние запросы по RoutingProfile и считает, сколько отменено."""
+
+    def __init__(self, profile: RoutingProfile = LISTING_PROFILE):
+        self.profile = profile
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.estimated_bytes_saved = 0
+
+    def install(self, target):
+        """Подключает правила к странице или контексту Playwright."""
+        target.route("**/*", self._handle)
+
+    def install_blocklist(self, page):
+        """Отменяет запросы по ``deny_globs`` через CDP, без page.route.
+
+        Перехват запросов в Playwright отключает HTTP-кэш Chromium, а у постоянного
+        профиля ради этого кэша всё и затевается. Поэтому здесь запросы режет сам
+        браузер (Network.setBlockedURLs), а отменённые считаются по requestfailed.
+        """
+        session = page.context.new_cdp_session(page)
+        session.send("Network.enable")
+        session.send("Network.setBlockedURLs", {"urls": list(self.profile.deny_globs)})
+        page.on("requestfailed", self._count_failed)
+        page.on("requestfinished", self._count_allowed)
+
+    def _count_allowed(self, request):
+        self.allowed += 1
+
+    def _count_failed(self, request):
+        if "ERR_BLOCKED_BY_CLIENT" not in (request.failure or ""):
+            return
+        self._count_blocked(request.resource_type)
+
+    def _count_blocked(self, resource_type: str):
+        self.blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.estimated_bytes_saved += TYPICAL_SIZES.get(resource_type, 5_000)
+
+    def _handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        if self.profile.blocks(resource_type, request.url):
+            self._count_blocked(resource_type)
+            route.abort("blockedbyclient")
+            return
+        self.allowed += 1
+        route.continue_()
+
+    def stats(self) -> Dict:
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+        }
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, List
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+COLUMNS = [
+    ("Название", "name"),
+    ("Цена", "price"),
+    ("Локация", "location"),
+    ("Дата", "date"),
+    ("URL", "url"),
+    ("Title", "title"),
+]
+
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+_DIGITS_RE = re.compile(r"\D+")
+
+
+def _price_key(value: str):
+    digits = _DIGITS_RE.sub("", value or "")
+    return int(digits) if digits else -1
+
+
+class ProductsTableModel(QAbstractTableModel):
+    """Модель таблицы результатов: строки хранятся одним списком словарей,
+    ячейки отдаются представлению по запросу, так что QTableView рисует только
+    видимую часть, а новые страницы добавляются пачками без перестройки таблицы."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Dict] = []
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        key = COLUMNS[index.column()][1]
+        value = self._rows[index.row()].get(key, "")
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return str(value)
+        if role == SORT_ROLE:
+            return _price_key(value) if key == "price" else str(value).lower()
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][0]
+        return section + 1
+
+    def append_rows(self, products: List[Dict]):
+        if not products:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(products) - 1)
+        self._rows.extend(products)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self.endResetModel()
+
+    def products(self) -> List[Dict]:
+        return self._rows
+
+
+def make_proxy(model: ProductsTableModel, parent=None) -> QSortFilterProxyModel:
+    """Прокси для сортировки (цена — как число) и фильтра по всем колонкам."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    proxy.setFilterKeyColumn(-1)
+    return proxy
@@ -0,0 +1,133 @@
+from typing import Dict, Iterable, Optional
+
+ITEM_SELECTOR = '[data-marker="item"], div[class*="iva-item-root"]'
+# Пагинация под списком: если она видна и список не растёт, дальше грузить нечего
+END_SELECTOR = '[data-marker="pagination-button"], nav[aria-label="Пагинация"]'
+
+# Всё ожидание происходит внутри страницы одним page.evaluate: MutationObserver
+# пересчитывает карточки при изменениях DOM, IntersectionObserver следит за
+# маркером конца списка. Промис разрешается, как только список перестал расти.
+LOADER_JS = """
+async ({selector, endSelector, idleMs, endGraceMs, readyMs, maxMs, knownIds, stopAfterKnown}) => {
+  const count = () => document.querySelectorAll(selector).length;
+  const toBottom = () => window.scrollTo(0, document.body.scrollHeight);
+
+  // Инкрементальный режим: серия из stopAfterKnown уже известных объявлений
+  // подряд означает, что дальше лента состоит из старых объявлений.
+  const known = new Set(knownIds || []);
+  let scanned = 0;
+  let knownRun = 0;
+  const hitKnownRun = () => {
+    if (!known.size || !stopAfterKnown) return false;
+    const cards = document.querySelectorAll(selector);
+    for (; scanned < cards.length; scanned++) {
+      const a = cards[scanned].querySelector('[data-marker="item-title"]');
+      if (!a) continue;
+      const m = /_(\\d+)\\/?$/.exec((a.getAttribute('href') || '').split(/[?#]/)[0]);
+      knownRun = m && known.has(m[1]) ? knownRun + 1 : 0;
+      if (knownRun >= stopAfterKnown) return true;
+    }
+    return false;
+  };
+
+  return await new Promise((resolve) => {
+    const started = performance.now();
+    let last = count();
+    let scrolls = 0;
+    let endVisible = false;
+    let idleTimer = null;
+    let checkScheduled = false;
+    let finished = false;
+
+    const io = new IntersectionObserver((entries) => {
+      endVisible = entries.some((e) => e.isIntersecting);
+      if (endVisible && last > 0) armIdle();
+    });
+    const watchEnd = () => {
+      io.disconnect();
+      document.querySelectorAll(endSelector).forEach((el) => io.observe(el));
+    };
+
+    const finish = (reason) => {
+      if (finished) return;
+      finished = true;
+      mo.disconnect();
+      io.disconnect();
+      clearTimeout(idleTimer);
+      clearTimeout(hardTimer);
+      resolve({count: count(), reason, scrolls, ms: Math.round(performance.now() - started)});
+    };
+
+    const armIdle = () => {
+      clearTimeout(idleTimer);
+      const wait = last === 0 ? readyMs : (endVisible ? Math.min(idleMs, endGraceMs) : idleMs);
+      idleTimer = setTimeout(() => finish(last === 0 ? 'empty' : (endVisible ? 'end' : 'idle')), wait);
+    };
+
+    const check = () => {
+      checkScheduled = false;
+      const now = count();
+      if (now !== last) {
+        last = now;
+        if (hitKnownRun()) return finish('known');
+        watchEnd();
+        toBottom();
+        scrolls += 1;
+        armIdle();
+      }
+    };
+
+    const mo = new MutationObserver(() => {
+      if (!checkScheduled) {
+        checkScheduled = true;
+        setTimeout(check, 50);
+      }
+    });
+    mo.observe(document.body, {childList: true, subtree: true});
+
+    const hardTimer = setTimeout(() => finish('timeout'), maxMs);
+    if (last > 0 && hitKnownRun()) return finish('known');
+    watchEnd();
+    if (last > 0) {
+      toBottom();
+      scrolls += 1;
+    }
+    armIdle();
+  });
+}
+"""
+
+
+def scroll_until_loaded(
+    page,
+    selector: str = ITEM_SELECTOR,
+    end_selector: str = END_SELECTOR,
+    idle_timeout: float = 1.5,
+    end_grace: float = 0.3,
+    ready_timeout: float = 10.0,
+    max_wait: float = 60.0,
+    known_ids: Optional[Iterable[str]] = None,
+    stop_after_known: int = 0,
+) -> Dict:
+    """Прокручивает ленту, пока число карточек растёт, и возвращает статистику.
+
+    Ожидание завершается, когда за ``idle_timeout`` секунд не появилось новых
+    карточек (``end_grace``, если виден маркер конца списка), когда карточки так
+    и не появились за ``ready_timeout`` или по общему лимиту ``max_wait``.
+    Если переданы ``known_ids``, прокрутка останавливается после
+    ``stop_after_known`` известных объявлений подряд (reason == "known").
+    Результат: ``{"count", "reason", "scrolls", "ms"}``.
+    """
+    return page.evaluate(
+        LOADER_JS,
+        {
+            "selector": selector,
+            "endSelector": end_selector,
+            "idleMs": int(idle_timeout * 1000),
+            "endGraceMs": int(end_grace * 1000),
+            "readyMs": int(ready_timeout * 1000),
+            "maxMs": int(max_wait * 1000),
+            "knownIds": list(known_ids or ()),
+            "stopAfterKnown": stop_after_known,
+        },
+    )
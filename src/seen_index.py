@@ -0,0 +1,122 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_INDEX_PATH = Path.home() / ".avito_parser" / "seen.sqlite"
+
+# Ссылка на объявление заканчивается числовым ID: /moskva/uslugi/remont_kvartir_1234567890
+ITEM_ID_RE = re.compile(r"_(\d+)/?$")
+NON_DIGITS_RE = re.compile(r"\D+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    seller TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (seller, item_id)
+);
+"""
+
+
+def item_id_from_url(url: str) -> Optional[str]:
+    """Числовой ID объявления из его URL или None."""
+    m = ITEM_ID_RE.search(urlparse(url).path) if url else None
+    return m.group(1) if m else None
+
+
+def seller_key(listing_url: str) -> str:
+    """Ключ продавца: путь страницы без параметров (в т.ч. без ?p=N)."""
+    parsed = urlparse(listing_url)
+    return f"{parsed.netloc}{parsed.path.rstrip('/')}"
+
+
+def fingerprint(product: Dict) -> str:
+    """Отпечаток значимых полей, одинаковый для строк из DOM и из состояния страницы.
+
+    Дата не входит — она относительная и меняется сама; title тоже — в DOM это
+    атрибут ссылки с городом, а в состоянии его нет. Цена сводится к цифрам
+    ("12 500 ₽" и "12500"), адрес — без пробелов (get_text(strip=True) их теряет).
+    """
+    price = product.get("price_value")
+    if price is None:
+        price = NON_DIGITS_RE.sub("", str(product.get("price") or ""))
+    location = "".join(str(product.get("location") or "").split())
+    raw = "\x1f".join((str(product.get("name") or ""), str(price), location))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class SeenIndex:
+    """Постоянный индекс уже виденных объявлений по продавцу и ID объявления.
+
+    Позволяет инкрементальному обходу отдавать только новые или изменившиеся
+    объявления и прекращать листание, когда пошли уже известные.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "SeenIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def known(self, seller: str) -> Dict[str, str]:
+        """{item_id: fingerprint} для всех известных объявлений продавца."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, fingerprint FROM items WHERE seller = ?", (seller,)
+            ).fetchall()
+        return dict(rows)
+
+    def update(self, seller: str, products: Iterable[Dict]):
+        now = time.time()
+        rows = []
+        for product in products:
+            item_id = item_id_from_url(product.get("url", ""))
+            if item_id:
+                rows.append((seller, item_id, fingerprint(product), now, now))
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO items (seller, item_id, fingerprint, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (seller, item_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    last_seen = excluded.last_seen
+                """,
+                rows,
+            )
+            self._conn.commit()
+
+
+def split_known(products: List[Dict], known: Dict[str, str]) -> Tuple[List[Dict], int]:
+    """Делит страницу на новые/изменившиеся объявления и длину самой длинной
+    серии подряд идущих известных и не изменившихся объявлений."""
+    fresh = []
+    run = longest = 0
+    for product in products:
+        item_id = item_id_from_url(product.get("url", ""))
+        if item_id and known.get(item_id) == fingerprint(product):
+            run += 1
+            longest = max(longest, run)
+        else:
+            run = 0
+            fresh.append(product)
+    return fresh, longest
@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import threading
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .records import DETAIL_FIELDS
+    from .seen_index import item_id_from_url
+except ImportError:
+    from records import DETAIL_FIELDS
+    from seen_index import item_id_from_url
+
+FIELDNAMES = [
+    "index",
+    "item_id",
+    "name",
+    "url",
+    "title",
+    "price",
+    "price_value",
+    "location",
+    "date",
+    "seller_name",
+    "seller_rating",
+]
+
+# С полями карточек (details=True) они идут перед колонками продавца, как в старом скрипте
+DETAIL_FIELDNAMES = FIELDNAMES[:-2] + list(DETAIL_FIELDS) + FIELDNAMES[-2:]
+
+WRITE_BATCH = 1000
+
+# Колонки, которые в Parquet пишутся как int64
+INT_FIELDS = ("index", "price_value")
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".xlsx": "xlsx",
+}
+
+
+def _row(product: Dict, seller_info: Dict, details: bool = False) -> Dict:
+    seller_info = product.get("seller") or seller_info
+    row = {name: product.get(name, "") for name in FIELDNAMES[:-2]}
+    # Из DOM ID объявления не извлекается — берём его из URL
+    row["item_id"] = row["item_id"] or item_id_from_url(row["url"]) or ""
+    if row["price_value"] is None:
+        row["price_value"] = ""
+    if details:
+        card = product.get("details") or {}
+        for name in DETAIL_FIELDS:
+            row[name] = card.get(name, "")
+    row["seller_name"] = seller_info.get("name", "")
+    row["seller_rating"] = seller_info.get("rating", "")
+    return row
+
+
+class ResultSink:
+    """Приёмник результатов: строки дописываются по мере обхода, а не в конце.
+
+    ``write`` можно вызывать из нескольких потоков; память не растёт с числом
+    записанных строк (кроме небольшого буфера у Parquet). С ``append=True``
+    строки дописываются к существующему файлу (для продолжения прерванного
+    обхода); это умеют только построчные форматы — CSV и JSONL. С ``details=True``
+    добавляются колонки полей карточки (records.DETAIL_FIELDS).
+    """
+
+    appendable = False
+
+    def __init__(self, filename: str, details: bool = False):
+        self.filename = filename
+        self.details = details
+        self.fieldnames = DETAIL_FIELDNAMES if details else FIELDNAMES
+        self.rows = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, products: Iterable[Dict], seller_info: Optional[Dict] = None):
+        # Строки собираются пачками, чтобы save_results для всего обхода
+        # не держал в памяти вторую копию всех объявлений
+        products = iter(products)
+        while True:
+            rows = [_row(p, seller_info or {}, self.details) for p in islice(products, WRITE_BATCH)]
+            if not rows:
+                return
+            with self._lock:
+                self._write_rows(rows)
+                self.rows += len(rows)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _write_rows(self, rows: List[Dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(ResultSink):
+    appendable = True
+
+    def __init__(self, filename: str, append: bool = False, details: bool = False):
+        super().__init__(filename, details)
+        has_header = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+        self._file = open(filename, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if not has_header:
+            self._writer.writeheader()
+
+    def _write_rows(self, rows: List[Dict]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    appendable = True
+
+    def __init__(self, filename: str, append: bool = False, details: bool = False):
+        super().__init__(filename, details)
+        self._file = open(filename, "a" if append else "w", encoding="utf-8")
+
+    def _write_rows(self, rows: List[Dict]):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False))
+            self._file.write("\n")
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """Пишет row group'ами по ``row_group_size`` строк (нужен pyarrow)."""
+
+    def __init__(self, filename: str, row_group_size: int = 5000, details: bool = False):
+        super().__init__(filename, details)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Для сохранения в Parquet установите pyarrow") from e
+        self._pa = pa
+        self._schema = pa.schema(
+            [(name, pa.int64() if name in INT_FIELDS else pa.string()) for name in self.fieldnames]
+        )
+        self._writer = pq.ParquetWriter(filename, self._schema)
+        self._buffer: List[Dict] = []
+        self.row_group_size = row_group_size
+
+    def _flush(self):
+        if self._buffer:
+            table = self._pa.Table.from_pylist(self._buffer, schema=self._schema)
+            self._writer.write_table(table)
+            self._buffer = []
+
+    def _write_rows(self, rows: List[Dict]):
+        for row in rows:
+            for name in INT_FIELDS:
+                row[name] = int(row[name]) if str(row[name]).isdigit() else None
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _close(self):
+        self._flush()
+        self._writer.close()
+
+
+class XlsxSink(ResultSink):
+    """openpyxl в режиме write-only: строки не держатся в памяти,
+    но сам файл формата xlsx появляется на диске только при закрытии."""
+
+    def __init__(self, filename: str, details: bool = False):
+        super().__init__(filename, details)
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("products")
+        self._sheet.append(self.fieldnames)
+
+    def _write_rows(self, rows: List[Dict]):
+        for row in rows:
+            self._sheet.append([row[name] for name in self.fieldnames])
+
+    def _close(self):
+        self._workbook.save(self.filename)
+
+
+SINKS = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "parquet": ParquetSink,
+    "xlsx": XlsxSink,
+}
+
+
+def format_for(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат файла: {ext or filename}")
+    return FORMATS[ext]
+
+
+def open_sink(
+    filename: str, fmt: Optional[str] = None, append: bool = False, details: bool = False
+) -> ResultSink:
+    """Создаёт приёмник по явному формату или по расширению файла."""
+    sink_class = SINKS[fmt or format_for(filename)]
+    if not append:
+        return sink_class(filename, details=details)
+    if not sink_class.appendable:
+        raise ValueError(f"Дозапись не поддерживается для формата {fmt or format_for(filename)}: используйте csv или jsonl")
+    return sink_class(filename, append=True, details=details)
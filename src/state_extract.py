@@ -0,0 +1,157 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import unquote, urljoin
+
+try:
+    from .records import Product
+except ImportError:
+    from records import Product
+
+BASE_URL = "https://www.avito.ru"
+
+# Где Avito кладёт сериализованное состояние страницы:
+#   <script type="mime/invalid" data-mfe-state="true">{...}</script>
+#   window.__preloadedState__ = {...};
+#   window.__initialData__ = "<JSON, закодированный encodeURIComponent>";
+JSON_MARKERS = ('data-mfe-state="true">', "window.__preloadedState__ =")
+ENCODED_MARKER = "window.__initialData__ ="
+
+# Даты в карточках Avito — московское время; смещение постоянное (без перехода на летнее)
+MOSCOW_TZ = timezone(timedelta(hours=3), "MSK")
+
+# Объявления ленты лежат в списке items внутри блока каталога; в остальном
+# состоянии встречаются похожие словари (рекомендации, баннеры, хлебные крошки)
+CATALOG_KEYS = ("catalog",)
+
+_decoder = json.JSONDecoder()
+
+
+def _skip_spaces(html: str, pos: int) -> int:
+    while pos < len(html) and html[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def iter_states(html: str) -> Iterator[object]:
+    """Все найденные на странице блоки состояния, уже декодированные.
+
+    JSON разбирается прямо из строки страницы с нужной позиции (raw_decode),
+    без регулярных выражений по всему документу и без копии многомегабайтного блока.
+    Повреждённые блоки пропускаются.
+    """
+    for marker in JSON_MARKERS:
+        start = html.find(marker)
+        while start != -1:
+            pos = _skip_spaces(html, start + len(marker))
+            try:
+                yield _decoder.raw_decode(html, pos)[0]
+            except ValueError:
+                pass
+            start = html.find(marker, pos)
+
+    start = html.find(ENCODED_MARKER)
+    if start != -1:
+        pos = _skip_spaces(html, start + len(ENCODED_MARKER))
+        try:
+            encoded = _decoder.raw_decode(html, pos)[0]
+            if isinstance(encoded, str):
+                yield json.loads(unquote(encoded))
+        except ValueError:
+            pass
+
+
+def has_state(html: str) -> bool:
+    """Есть ли на странице встроенное состояние (без его разбора)."""
+    return ENCODED_MARKER in html or any(marker in html for marker in JSON_MARKERS)
+
+
+def _is_item(node: Dict) -> bool:
+    return isinstance(node.get("id"), int) and isinstance(node.get("urlPath"), str) and "title" in node
+
+
+def iter_items(state: object) -> Iterator[Dict]:
+    """Обходит состояние без рекурсии и отдаёт объявления из ``catalog.items``."""
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            children = []
+            for key, value in node.items():
+                items = value.get("items") if key in CATALOG_KEYS and isinstance(value, dict) else None
+                if isinstance(items, list):
+                    yield from (item for item in items if isinstance(item, dict) and _is_item(item))
+                else:
+                    children.append(value)
+            stack.extend(reversed(children))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _clean_text(text: str) -> str:
+    if not text:
+        return ""
+    return " ".join(str(text).split()).replace("\xa0", " ")
+
+
+def _price(item: Dict):
+    detailed = item.get("priceDetailed") or {}
+    value = detailed.get("value")
+    if value is None and isinstance(item.get("price"), (int, float)):
+        value = item["price"]
+    if isinstance(value, (int, float)):
+        # Как meta[itemprop=price] в карточке: само число без валюты
+        return str(int(value)), int(value)
+    return _clean_text(detailed.get("fullString") or detailed.get("string") or ""), None
+
+
+def _location(item: Dict) -> str:
+    geo = item.get("geo") or {}
+    address = geo.get("formattedAddress")
+    if address:
+        return _clean_text(address)
+    location = item.get("location") or {}
+    return _clean_text(location.get("name", "")) if isinstance(location, dict) else ""
+
+
+def _date(item: Dict) -> str:
+    ts = item.get("sortTimeStamp")
+    if not isinstance(ts, (int, float)):
+        return ""
+    return datetime.fromtimestamp(ts / 1000, MOSCOW_TZ).strftime("%d.%m.%Y %H:%M")
+
+
+def item_to_product(item: Dict, index: int) -> Product:
+    price, price_value = _price(item)
+    title = _clean_text(item.get("title", ""))
+    return Product(
+        index=index,
+        item_id=str(item["id"]),
+        name=title,
+        url=urljoin(BASE_URL, item["urlPath"]),
+        title=title,
+        price=price,
+        price_value=price_value,
+        location=_location(item),
+        date=_date(item),
+    )
+
+
+def extract_products(html: str) -> Optional[List[Product]]:
+    """Объявления из встроенного состояния страницы или None, если его нет.
+
+    Поля те же, что у _parse_listing_page, плюс ``item_id`` и числовая
+    ``price_value``. Одно объявление может встречаться в состоянии несколько раз —
+    берётся первое вхождение.
+    """
+    products: List[Product] = []
+    seen = set()
+    found = False
+    for state in iter_states(html):
+        found = True
+        for item in iter_items(state):
+            if item["id"] in seen:
+                continue
+            seen.add(item["id"])
+            products.append(item_to_product(item, len(products) + 1))
+    return products if found else None
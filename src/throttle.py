@@ -0,0 +1,274 @@
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Страницы-заглушки Avito: капча и блокировка по IP. Проверяются заголовок и
+# разметка самой заглушки — обычные страницы тоже подключают скрипты капчи
+TITLE_MARKERS = {
+    "captcha": re.compile(r"captcha|не робот", re.I),
+    "blocked": re.compile(r"доступ ограничен|доступ временно заблокирован|проблема с ip", re.I),
+}
+HTML_MARKERS = {
+    "captcha": re.compile(r'class="[^"]*captcha-(?:form|container)|id="captcha'),
+    "blocked": re.compile(r'class="[^"]*firewall-(?:container|title)'),
+}
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+BLOCK_STATUSES = {429: "429", 403: "blocked"}
+
+
+class Blocked(Exception):
+    """Avito отдал капчу, страницу блокировки или 429 вместо объявлений."""
+
+    def __init__(self, reason: str, url: str = "", retry_after: float = 0.0):
+        super().__init__(f"{reason}: {url}" if url else reason)
+        self.reason = reason
+        self.url = url
+        self.retry_after = retry_after
+
+
+def detect_block(html: Optional[str] = None, status: Optional[int] = None, title: Optional[str] = None) -> Optional[str]:
+    """Причина блокировки ("429", "captcha", "blocked") или None."""
+    if status in BLOCK_STATUSES:
+        return BLOCK_STATUSES[status]
+    if title is None and html:
+        match = TITLE_RE.search(html)
+        title = match.group(1) if match else ""
+    for reason, marker in TITLE_MARKERS.items():
+        if title and marker.search(title):
+            return reason
+    for reason, marker in HTML_MARKERS.items():
+        if html and marker.search(html):
+            return reason
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    try:
+        return max(0.0, float(value)) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Экспоненциальная пауза с полным джиттером: случайно в [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_call(
+    fn: Callable[[], T],
+    url: str = "",
+    attempts: int = 4,
+    base: float = 1.0,
+    cap: float = 60.0,
+    metrics=None,
+) -> T:
+    """Вызывает ``fn`` до ``attempts`` раз с паузами backoff_delay между попытками.
+
+    После Blocked пауза не короче Retry-After. Последняя ошибка пробрасывается.
+    Повторы учитываются в счётчике ``retries`` у ``metrics``.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = backoff_delay(attempt, base, cap)
+            if isinstance(e, Blocked):
+                delay = max(delay, e.retry_after)
+            logger.warning(f"Попытка {attempt + 1} не удалась ({e}), повтор через {delay:.1f} с")
+            if metrics is not None:
+                metrics.add(url, retries=1)
+            time.sleep(delay)
+    raise RuntimeError("attempts must be positive")
+
+
+class _HostState:
+    __slots__ = (
+        "semaphore", "rate", "tokens", "updated", "latency",
+        "failures", "open_until", "trips", "probing",
+    )
+
+    def __init__(self, per_host: int, rate: float, burst: float):
+        self.semaphore = threading.Semaphore(per_host)
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.latency = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        self.probing = False
+
+
+class AdaptiveLimiter:
+    """Token bucket на хост, скорость которого подстраивается под ответы сайта.
+
+    Использование: ``with limiter.slot(url): ...`` вокруг перехода на страницу
+    (без прокрутки и чтения) и ``report`` для исхода, известного только после
+    него; не больше ``per_host`` запросов к хосту одновременно.
+    Скорость начинается с ``1 / min_interval`` запросов в секунду и меняется по
+    AIMD: после быстрого успешного ответа растёт на ``increase`` (до
+    ``max_rate``), после ответа дольше ``target_latency`` или ошибки —
+    умножается на ``decrease`` (до ``min_rate``).
+    Исключение Blocked внутри слота режет скорость вдвое сильнее и считается
+    подряд: после ``trip_after`` блокировок хост закрывается (circuit breaker) на
+    ``cooldown`` секунд, удваиваемых при каждом следующем срабатывании до
+    ``max_cooldown`` — все потоки ждут вместо того, чтобы жечь запросы. После паузы
+    проходит один пробный запрос; успех открывает хост, блокировка закрывает снова.
+    """
+
+    def __init__(
+        self,
+        per_host: int = 2,
+        min_interval: float = 1.0,
+        burst: float = 2.0,
+        min_rate: float = 0.05,
+        max_rate: float = 4.0,
+        increase: float = 0.05,
+        decrease: float = 0.7,
+        target_latency: float = 8.0,
+        trip_after: int = 3,
+        cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+    ):
+        self.per_host = max(1, per_host)
+        self.initial_rate = 1.0 / min_interval if min_interval > 0 else max_rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, self.initial_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.trip_after = max(1, trip_after)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self.per_host, self.initial_rate, self.burst)
+            return state
+
+    def _wait_time(self, state: _HostState) -> float:
+        """Резервирует токен; возвращает, сколько ждать (0 — можно идти)."""
+        with self._lock:
+            now = time.monotonic()
+            if now < state.open_until:
+                return state.open_until - now
+            # Полуоткрытое состояние: после паузы проходит один пробный запрос
+            half_open = bool(state.open_until) and state.failures >= self.trip_after
+            if half_open and state.probing:
+                return 1.0
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            if state.tokens >= 1.0:
+                state.tokens -= 1.0
+                state.probing = half_open
+                return 0.0
+            return (1.0 - state.tokens) / state.rate
+
+    def _record(
+        self,
+        host: str,
+        state: _HostState,
+        latency: float,
+        error: Optional[BaseException],
+        final: bool = True,
+    ):
+        with self._lock:
+            state.probing = False
+            if error is None:
+                state.latency = latency if not state.latency else 0.8 * state.latency + 0.2 * latency
+                if final:
+                    state.failures = 0
+                    state.open_until = 0.0
+                    state.trips = 0
+                if state.latency > self.target_latency:
+                    state.rate = max(self.min_rate, state.rate * self.decrease)
+                else:
+                    state.rate = min(self.max_rate, state.rate + self.increase)
+                return
+            factor = self.decrease ** 2 if isinstance(error, Blocked) else self.decrease
+            state.rate = max(self.min_rate, state.rate * factor)
+            if not isinstance(error, Blocked):
+                return
+            state.failures += 1
+            if state.failures >= self.trip_after:
+                pause = min(self.max_cooldown, max(self.cooldown * (2 ** state.trips), error.retry_after))
+                state.trips += 1
+                state.open_until = time.monotonic() + pause
+                logger.warning(f"{host}: {state.failures} блокировок подряд ({error.reason}), пауза {pause:.0f} с")
+
+    @contextmanager
+    def slot(self, url: str, deferred: bool = False):
+        """Ждёт очереди к хосту и учитывает время и исход блока ``with``.
+
+        С ``deferred=True`` успешный выход из слота не сбрасывает счётчик
+        блокировок: страница ещё не проверена, и вызывающий код обязан сообщить
+        итог через ``report``.
+        """
+        host = urlparse(url).netloc
+        state = self._state(host)
+        with state.semaphore:
+            while True:
+                delay = self._wait_time(state)
+                if delay <= 0:
+                    break
+                time.sleep(min(delay, 5.0))
+            started = time.monotonic()
+            try:
+                yield
+            except Exception as e:
+                self._record(host, state, time.monotonic() - started, e)
+                raise
+            except BaseException:
+                with self._lock:
+                    state.probing = False
+                raise
+            self._record(host, state, time.monotonic() - started, None, final=not deferred)
+
+    def report(self, url: str, error: Optional[BaseException] = None):
+        """Сообщает исход страницы, известный только после выхода из ``slot``.
+
+        В слоте держится только переход на страницу; капча, распознанная позже
+        (после конвейерной загрузки или при чтении карточки), передаётся сюда,
+        чтобы она так же снижала скорость и взводила circuit breaker. Без
+        ``error`` страница считается прошедшей проверку, и счётчик блокировок
+        подряд сбрасывается.
+        """
+        host = urlparse(url).netloc
+        state = self._state(host)
+        if error is None:
+            with self._lock:
+                state.failures = 0
+                state.open_until = 0.0
+                state.trips = 0
+        elif isinstance(error, Exception):
+            self._record(host, state, 0.0, error)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Текущая скорость, средняя задержка и состояние паузы по хостам."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "rate": round(state.rate, 3),
+                    "latency": round(state.latency, 3),
+                    "failures": state.failures,
+                    "paused_for": round(max(0.0, state.open_until - now), 1),
+                }
+                for host, state in self._hosts.items()
+            }